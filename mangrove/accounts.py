@@ -0,0 +1,283 @@
+import time
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from mangrove.executors import AdaptiveThreadPoolExecutor
+from mangrove.constants import ASSUMED_ROLE_DURATION, ASSUMED_ROLE_RENEWAL_MARGIN
+
+
+class ConnectionCache(object):
+    """Thread-safe region connections cache keyed by
+    (account, service, region), and boto retries when overridden
+
+    Concurrent lookups of a missing key make a single connection.
+    Entries made out of temporary credentials expire along with them.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, connect, expires_at=None):
+        """Gets a cached connection, or makes it
+
+        :param  key: (account name, service name, region name),
+                     followed by boto retries when overridden
+        :type   key: tuple
+
+        :param  connect: callable making the connection
+        :type   connect: callable
+
+        :param  expires_at: timestamp after which the connection
+                            should be made again, never if None
+        :type   expires_at: float
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                future, owner = entry[0], False
+            else:
+                future, owner = Future(), True
+                self._entries[key] = (future, expires_at)
+
+        if owner:
+            try:
+                future.set_result(connect())
+            except Exception as e:
+                with self._lock:
+                    self._entries.pop(key, None)
+                future.set_exception(e)
+
+        return future.result()
+
+    def invalidate(self, account_name=None):
+        """Drops cached connections, of a single account if provided"""
+        with self._lock:
+            for key in list(self._entries):
+                if account_name is None or key[0] == account_name:
+                    del self._entries[key]
+
+
+# Process-wide connection cache shared by every accounts which
+# were not given their own.
+shared_connection_cache = ConnectionCache()
+
+
+class Account(object):
+    """AWS account credentials set
+
+    Credentials are either static keys (or environment ones if
+    not provided), or temporary ones obtained by assuming role_arn
+    through sts_pool. Assumed role credentials are renewed before
+    they expire.
+
+    :param  name: account name, used as cache key
+    :type   name: string
+
+    :param  aws_access_key_id: aws access key token
+    :type   aws_access_key_id: string
+
+    :param  aws_secret_access_key: aws secret access key
+    :type   aws_secret_access_key: string
+
+    :param  role_arn: arn of the role to assume in the account
+    :type   role_arn: string
+
+    :param  sts_pool: connected pool to assume the role through
+    :type   sts_pool: mangrove.services.StsPool
+
+    :param  session_name: assumed role session name
+    :type   session_name: string
+
+    :param  cache: connection cache, the process-wide one as a default
+    :type   cache: ConnectionCache
+    """
+    def __init__(self, name, aws_access_key_id=None, aws_secret_access_key=None,
+                 role_arn=None, sts_pool=None, session_name='mangrove',
+                 cache=None):
+        if role_arn is not None and sts_pool is None:
+            raise ValueError("An sts_pool is required to assume role_arn")
+
+        self.name = name
+        self.aws_access_key_id = aws_access_key_id
+        self.aws_secret_access_key = aws_secret_access_key
+        self.role_arn = role_arn
+        self.sts_pool = sts_pool
+        self.session_name = session_name
+        self.cache = cache if cache is not None else shared_connection_cache
+
+        self._credentials = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<Account {}>'.format(self.name)
+
+    def credentials(self):
+        """Access the account credentials, as connect_to_region
+        keyword arguments
+
+        :returns: credentials, and the timestamp they expire at
+                  (None for static credentials)
+        :rtype: tuple
+        """
+        if self.role_arn is None:
+            credentials = {
+                'aws_access_key_id': self.aws_access_key_id,
+                'aws_secret_access_key': self.aws_secret_access_key,
+            }
+            return dict((k, v) for k, v in credentials.items() if v), None
+
+        with self._lock:
+            if (self._credentials is None or
+                    self._expires_at - ASSUMED_ROLE_RENEWAL_MARGIN < time.time()):
+                self._assume_role()
+            return self._credentials, self._expires_at
+
+    def _assume_role(self):
+        client = self.sts_pool.regions.default
+        if client is None:
+            client = self.sts_pool.region(next(iter(self.sts_pool.regions)))
+
+        requested_at = time.time()
+        role = client.assume_role(
+            self.role_arn,
+            self.session_name,
+            duration_seconds=ASSUMED_ROLE_DURATION
+        )
+
+        self._credentials = {
+            'aws_access_key_id': role.credentials.access_key,
+            'aws_secret_access_key': role.credentials.secret_key,
+            'security_token': role.credentials.session_token,
+        }
+        self._expires_at = requested_at + ASSUMED_ROLE_DURATION
+
+    def connect(self, module, service_name, region_name, num_retries=None):
+        """Access the account connection to a service region, out of
+        the connection cache
+
+        :param  module: boto service module to connect with
+        :type   module: module
+
+        :param  service_name: name of the service
+        :type   service_name: string
+
+        :param  region_name: name of the region
+        :type   region_name: string
+
+        :param  num_retries: boto retries of the connection, its
+                             default if None
+        :type   num_retries: int
+        """
+        credentials, expires_at = self.credentials()
+
+        # Cached connections expire when their credentials get renewed
+        if expires_at is not None:
+            expires_at -= ASSUMED_ROLE_RENEWAL_MARGIN
+
+        # Connections are shared by every pools of the account: those
+        # retrying differently get their own.
+        key = (self.name, service_name, region_name)
+        if num_retries is not None:
+            key += (num_retries,)
+
+        def connect():
+            connection = module.connect_to_region(region_name, **credentials)
+            if connection is not None and num_retries is not None:
+                connection.num_retries = num_retries
+            return connection
+
+        return self.cache.get(key, connect, expires_at=expires_at)
+
+
+class AccountPool(object):
+    """Service connection pool spanning multiple accounts
+
+    An AccountPool holds one pool_class instance per account, all of
+    them sharing the same executor and the accounts connection caches.
+
+    ::code-block: python
+        pool = AccountPool(Ec2Pool, [
+            Account('production', role_arn='arn:aws:iam::1234:role/ops', sts_pool=sts),
+            Account('staging', role_arn='arn:aws:iam::5678:role/ops', sts_pool=sts),
+        ], connect=True, regions=['us-east-1', 'eu-west-1'])
+
+        pool['production'].regions['us-east-1'].get_all_instances()
+        futures = pool.fan_out('get_all_instances')  # accounts x regions
+
+    :param  pool_class: ServicePool subclass to instantiate per account
+    :type   pool_class: type
+
+    :param  accounts: accounts to connect to
+    :type   accounts: list of Account
+
+    :param  executor: executor shared by accounts pools, an
+                      AdaptiveThreadPoolExecutor as a default
+    :type   executor: concurrent.futures.Executor
+
+    Other keyword arguments are handed to every pool_class instances.
+    """
+    def __init__(self, pool_class, accounts, executor=None, **pool_options):
+        self._executor = executor or AdaptiveThreadPoolExecutor()
+        self._pools = OrderedDict(
+            (account.name, pool_class(
+                account=account,
+                executor=self._executor,
+                **pool_options
+            ))
+            for account in accounts
+        )
+
+    def __getitem__(self, account_name):
+        return self._pools[account_name]
+
+    def __iter__(self):
+        return iter(self._pools)
+
+    def __len__(self):
+        return len(self._pools)
+
+    def account(self, account_name):
+        """Access an account pool
+
+        :param  account_name: name of the account
+        :type   account_name: string
+        """
+        return self._pools[account_name]
+
+    def connect(self):
+        """Connects every accounts pools"""
+        for pool in self._pools.itervalues():
+            pool.connect()
+
+    def fan_out(self, method_name, args=None, kwargs=None, accounts=None,
+                regions=None):
+        """Concurrently calls a method over multiple accounts and regions
+
+        :param  accounts: names of the accounts to call the method over,
+                          every accounts as a default
+        :type   accounts: list of strings
+
+        :param  regions: regions to call the method over, as a default
+                         every accounts pools connected regions.
+        :type   regions: list of strings
+
+        :returns: (account name, region name) to call result Future mapping
+        :rtype: dict
+        """
+        futures = {}
+        for account_name in accounts or self._pools.keys():
+            pool = self._pools[account_name]
+            account_futures = pool.fan_out(method_name, args, kwargs, regions=regions)
+            for region_name, future in account_futures.iteritems():
+                futures[(account_name, region_name)] = future
+
+        return futures
@@ -0,0 +1,164 @@
+import time
+import threading
+
+from boto.exception import BotoServerError
+
+from mangrove.exceptions import CircuitOpenError
+from mangrove.constants import (
+    BREAKER_CLOSED,
+    BREAKER_OPEN,
+    BREAKER_HALF_OPEN,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    THROTTLING_ERROR_CODES
+)
+
+
+def is_region_failure(error):
+    """Tells whether an error raised by a region connection call
+    denotes a region failure
+
+    Client side errors (4xx statuses) are the caller's fault and
+    do not say anything about the region health, throttling
+    errors excepted.
+
+    :param  error: exception raised by the call
+    :type   error: Exception
+    """
+    if isinstance(error, BotoServerError):
+        if error.error_code in THROTTLING_ERROR_CODES:
+            return True
+        if error.status is not None and error.status < 500:
+            return False
+
+    return True
+
+
+class CircuitBreaker(object):
+    """Region connection circuit breaker
+
+    The breaker is closed as long as calls succeed. Once
+    failure_threshold consecutive calls failed (or were slower
+    than latency_threshold), it opens and calls fail fast with a
+    CircuitOpenError. After reset_timeout seconds it half-opens and
+    lets a single probe call through: its success closes the
+    breaker, its failure opens it again.
+
+    :param  failure_threshold: consecutive failures opening the breaker
+    :type   failure_threshold: int
+
+    :param  reset_timeout: seconds to stay open before half-opening
+    :type   reset_timeout: float
+
+    :param  latency_threshold: seconds after which a successful call
+                               is counted as a failure, disabled if None
+    :type   latency_threshold: float
+
+    :param  is_failure: callable telling whether an exception raised
+                        by a call should be counted as a failure
+    :type   is_failure: callable
+    """
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, latency_threshold=None,
+                 is_failure=is_region_failure):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_threshold = latency_threshold
+        self.is_failure = is_failure
+
+        self._state = BREAKER_CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<CircuitBreaker {}>'.format(self.state)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def failures(self):
+        return self._failures
+
+    def _current_state(self):
+        if (self._state == BREAKER_OPEN and
+                time.time() - self._opened_at >= self.reset_timeout):
+            self._state = BREAKER_HALF_OPEN
+            self._probing = False
+
+        return self._state
+
+    def allow(self):
+        """Tells whether a call should be let through
+
+        While half-open, only one probe call at a time is allowed.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == BREAKER_CLOSED:
+                return True
+            if state == BREAKER_HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def before_call(self):
+        """Raises a CircuitOpenError if the call should not be made"""
+        if not self.allow():
+            raise CircuitOpenError(
+                "Circuit breaker is {}, call rejected".format(self.state)
+            )
+
+    def release(self):
+        """Releases the probe reserved by a call which was let
+        through, but eventually not made"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self, latency=None):
+        """Records a successful call
+
+        :param  latency: call duration, in seconds
+        :type   latency: float
+        """
+        if (self.latency_threshold is not None and
+                latency is not None and latency > self.latency_threshold):
+            return self.record_failure()
+
+        with self._lock:
+            self._state = BREAKER_CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Records a failed call, opening the breaker if needed"""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if (self._state == BREAKER_HALF_OPEN or
+                    self._failures >= self.failure_threshold):
+                self._state = BREAKER_OPEN
+                self._opened_at = time.time()
+
+    def record_error(self, error):
+        """Records a call which raised, if error denotes a failure
+
+        :param  error: exception raised by the call
+        :type   error: Exception
+        """
+        if self.is_failure(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def reset(self):
+        """Forces the breaker back to the closed state"""
+        with self._lock:
+            self._state = BREAKER_CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
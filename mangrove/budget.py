@@ -0,0 +1,144 @@
+import time
+import weakref
+import threading
+
+from collections import OrderedDict
+
+from mangrove.constants import BUDGET_SWEEP_MIN_INTERVAL
+
+
+class ConnectionBudget(object):
+    """Bounds the number of live region connections shared
+    by a set of pools
+
+    Region connections are tracked in least recently used order.
+    Whenever the budget is exceeded, or a connection stayed unused
+    for longer than idle_timeout, the least recently used connections
+    are evicted from their pool. Evicted connections are transparently
+    made again by their pool on next access.
+
+    With an idle_timeout, a background thread sweeps idle connections
+    every half idle_timeout, so that pools which went quiet release
+    them too, until the budget is closed or collected.
+
+    :param  max_connections: maximum number of live connections,
+                             unbounded if None
+    :type   max_connections: int
+
+    :param  idle_timeout: seconds after which an unused connection
+                          is evicted, never if None
+    :type   idle_timeout: float
+    """
+    def __init__(self, max_connections=None, idle_timeout=None):
+        if max_connections is not None and max_connections < 1:
+            raise ValueError(
+                "max_connections should be a positive integer, "
+                "got {} instead.".format(max_connections)
+            )
+
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+
+        self._entries = OrderedDict()
+        self._evictions = 0
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+
+        if idle_timeout is not None:
+            self._start_sweeper()
+
+    def _start_sweeper(self):
+        # The sweeper only holds a weak reference to the budget,
+        # so that it does not keep it alive.
+        budget = weakref.ref(self)
+        closed = self._closed
+        interval = max(self.idle_timeout / 2.0, BUDGET_SWEEP_MIN_INTERVAL)
+
+        def sweep():
+            while not closed.wait(interval):
+                instance = budget()
+                if instance is None:
+                    return
+                instance.evict_idle()
+                del instance
+
+        thread = threading.Thread(target=sweep)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        """Stops sweeping idle connections"""
+        self._closed.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entry):
+        return entry in self._entries
+
+    @property
+    def evictions(self):
+        """Count of connections evicted so far"""
+        return self._evictions
+
+    def has_room(self):
+        """Tells whether a new connection can be made without
+        evicting another one"""
+        return (self.max_connections is None or
+                len(self._entries) < self.max_connections)
+
+    def touch(self, pool, region_name):
+        """Marks a pool region connection as just used, evicting
+        least recently used connections if needed
+
+        :param  pool: pool holding the connection
+        :type   pool: mangrove.pool.ServicePool
+
+        :param  region_name: name of the connection region
+        :type   region_name: string
+        """
+        key = (pool, region_name)
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = time.time()
+            self._evict_idle()
+
+            while (self.max_connections is not None and
+                   len(self._entries) > self.max_connections):
+                self._evict(next(iter(self._entries)))
+
+    def discard(self, pool, region_name):
+        """Stops tracking a pool region connection"""
+        with self._lock:
+            self._entries.pop((pool, region_name), None)
+
+    def evict_idle(self):
+        """Evicts every connection unused for longer than idle_timeout
+
+        :returns: count of evicted connections
+        :rtype: int
+        """
+        with self._lock:
+            return self._evict_idle()
+
+    def _evict_idle(self):
+        if self.idle_timeout is None:
+            return 0
+
+        deadline = time.time() - self.idle_timeout
+        evicted = 0
+        # Entries are ordered by last use, oldest first
+        for key, last_used in list(self._entries.items()):
+            if last_used > deadline:
+                break
+            self._evict(key)
+            evicted += 1
+
+        return evicted
+
+    def _evict(self, key):
+        pool, region_name = key
+        self._entries.pop(key, None)
+        pool._evict(region_name)
+        self._evictions += 1
@@ -0,0 +1,270 @@
+import os
+import mmap
+import zlib
+import time
+import struct
+import hashlib
+import threading
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from cStringIO import StringIO
+
+from boto.connection import AWSAuthConnection
+
+from mangrove.constants import (
+    CASSETTE_RECORD,
+    CASSETTE_REPLAY,
+    CASSETTE_KEY_ATTRIBUTES
+)
+from mangrove.exceptions import CassetteMissError
+
+
+# Cassette files start with a magic string and a format version,
+# followed by entries made of a (key length, payload length) header,
+# the key, and the zlib compressed pickled payload.
+CASSETTE_MAGIC = 'MGCS\x01'
+ENTRY_HEADER = struct.Struct('>HI')
+
+
+def _key_argument(value):
+    """Normalizes a call argument into a value which repr is stable
+    across processes. Boto objects, such as messages, queues or
+    buckets, are identified by their receipt handle, name or id.
+    """
+    if value is None or isinstance(value, (bool, int, long, float, basestring)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_key_argument(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _key_argument(v)) for k, v in value.iteritems()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_key_argument(item) for item in value))
+
+    for attribute in CASSETTE_KEY_ATTRIBUTES:
+        identifier = getattr(value, attribute, None)
+        if isinstance(identifier, basestring):
+            return (type(value).__name__, attribute, identifier)
+
+    raise TypeError(
+        "Cassette calls arguments should be plain values, or objects "
+        "having a {}: got {!r}".format(' or '.join(CASSETTE_KEY_ATTRIBUTES), value)
+    )
+
+
+def call_key(service_name, region_name, method_name, args=None, kwargs=None):
+    """Builds the key identifying a call in a cassette
+
+    Raises a TypeError if an argument can not be identified
+    across processes, see _key_argument.
+
+    :param  service_name: name of the called service
+    :type   service_name: string
+
+    :param  region_name: name of the called region
+    :type   region_name: string
+
+    :param  method_name: name of the called connection method
+    :type   method_name: string
+
+    :param  args: call positional arguments
+    :type   args: tuple
+
+    :param  kwargs: call keyword arguments
+    :type   kwargs: dict
+    """
+    arguments = repr((_key_argument(args or ()), _key_argument(kwargs or {})))
+    return '\x00'.join((
+        service_name,
+        region_name,
+        method_name,
+        hashlib.md5(arguments).hexdigest(),
+    ))
+
+
+def _persistent_id(obj):
+    # Boto connections hold sockets and locks, and are referenced
+    # by most of boto's results objects: they are not recorded.
+    if isinstance(obj, AWSAuthConnection):
+        return 'connection'
+    return None
+
+
+def _persistent_load(persistent_id):
+    return None
+
+
+def dumps(value):
+    buf = StringIO()
+    pickler = pickle.Pickler(buf, pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = _persistent_id
+    pickler.dump(value)
+    return zlib.compress(buf.getvalue())
+
+
+def loads(payload):
+    unpickler = pickle.Unpickler(StringIO(zlib.decompress(payload)))
+    unpickler.persistent_load = _persistent_load
+    return unpickler.load()
+
+
+class Cassette(object):
+    """Records region connections calls to disk, and replays them
+
+    In record mode, calls made through the pools using the cassette
+    are appended to the cassette file, along with their result
+    (or raised exception) and latency.
+
+    In replay mode, the cassette file is memory-mapped and indexed,
+    and pools using it serve calls out of it without any network
+    access. A call recorded multiple times is replayed in recording
+    order, cycling over the recordings. Calls which were not
+    recorded raise a CassetteMissError.
+
+    Calls which could not be recorded, and calls not found while
+    replaying, are counted as misses.
+
+    Note that boto connections referenced by recorded results
+    are replayed as None.
+
+    :param  path: path of the cassette file
+    :type   path: string
+
+    :param  mode: CASSETTE_RECORD or CASSETTE_REPLAY
+    :type   mode: string
+
+    :param  latency_scale: factor applied to recorded latencies when
+                           replaying calls, no latency is simulated
+                           if None.
+    :type   latency_scale: float
+    """
+    def __init__(self, path, mode=CASSETTE_REPLAY, latency_scale=None):
+        if mode not in (CASSETTE_RECORD, CASSETTE_REPLAY):
+            raise ValueError("Invalid cassette mode: {}".format(mode))
+
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._index = {}
+        self._cursors = {}
+        self._misses = 0
+
+        if mode == CASSETTE_RECORD:
+            self._file = open(path, 'wb')
+            self._file.write(CASSETTE_MAGIC)
+        else:
+            self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return sum(len(offsets) for offsets in self._index.itervalues())
+
+    @property
+    def misses(self):
+        """Count of calls which could not be recorded, or replayed"""
+        return self._misses
+
+    def count_miss(self):
+        with self._lock:
+            self._misses += 1
+
+    @property
+    def replaying(self):
+        return self.mode == CASSETTE_REPLAY
+
+    def _load(self):
+        """Memory-maps the cassette file and indexes its entries"""
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size <= len(CASSETTE_MAGIC):
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(CASSETTE_MAGIC)] != CASSETTE_MAGIC:
+            raise ValueError("{} is not a cassette file".format(self.path))
+
+        offset, size = len(CASSETTE_MAGIC), len(self._mmap)
+        while offset < size:
+            key_length, payload_length = ENTRY_HEADER.unpack_from(self._mmap, offset)
+            offset += ENTRY_HEADER.size
+            key = self._mmap[offset:offset + key_length]
+            offset += key_length
+            self._index.setdefault(key, []).append((offset, payload_length))
+            offset += payload_length
+
+    def record(self, service_name, region_name, method_name, args=None,
+               kwargs=None, latency=0, result=None, error=None):
+        """Appends a call to the cassette
+
+        :param  latency: call duration, in seconds
+        :type   latency: float
+
+        :param  result: value returned by the call
+        :type   result: object
+
+        :param  error: exception raised by the call, if any
+        :type   error: Exception
+        """
+        if self.mode != CASSETTE_RECORD:
+            raise ValueError("Cassette is not in record mode")
+
+        key = call_key(service_name, region_name, method_name, args, kwargs)
+        payload = dumps((latency, error, None if error is not None else result))
+
+        with self._lock:
+            self._file.write(ENTRY_HEADER.pack(len(key), len(payload)))
+            self._file.write(key)
+            self._file.write(payload)
+
+    def play(self, service_name, region_name, method_name, args=None,
+             kwargs=None):
+        """Replays a recorded call, returning its recorded result or
+        raising its recorded exception
+        """
+        try:
+            key = call_key(service_name, region_name, method_name, args, kwargs)
+        except TypeError:
+            self.count_miss()
+            raise
+        entries = self._index.get(key)
+        if not entries:
+            self.count_miss()
+            raise CassetteMissError(
+                "No recorded {} call found for {} {}".format(
+                    method_name, service_name, region_name
+                )
+            )
+
+        with self._lock:
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+
+        offset, length = entries[cursor % len(entries)]
+        latency, error, result = loads(self._mmap[offset:offset + length])
+
+        if self.latency_scale is not None:
+            time.sleep(latency * self.latency_scale)
+
+        if error is not None:
+            raise error
+
+        return result
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
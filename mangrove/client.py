@@ -0,0 +1,53 @@
+import time
+
+
+class RegionClient(object):
+    """Proxies a pool's region connection
+
+    Attributes are read from the underlying boto connection,
+    but methods calls go through the pool, so they benefit from
+    its latency tracking and circuit breakers.
+
+    :param  pool: pool the region connection belongs to
+    :type   pool: mangrove.pool.ServicePool
+
+    :param  region_name: name of the proxied region connection
+    :type   region_name: string
+    """
+    def __init__(self, pool, region_name):
+        self._pool = pool
+        self.region_name = region_name
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self._pool).__name__, self.region_name)
+
+    @property
+    def connection(self):
+        """Underlying boto connection. Be aware it could potentially
+        block if the connection is still being made."""
+        return self._pool._connection(self.region_name)
+
+    def __getattr__(self, name):
+        # Replaying pools have no connection to inspect, and open
+        # regions calls should fail fast rather than wait for theirs:
+        # every attributes are then considered to be methods.
+        attribute = None
+        resolving = [0.0]
+        if not self._pool._replaying() and not self._pool._is_open(self.region_name):
+            start = time.time()
+            attribute = getattr(self.connection, name)
+            if not callable(attribute):
+                return attribute
+            resolving[0] = time.time() - start
+
+        pool, region_name = self._pool, self.region_name
+
+        def method(*args, **kwargs):
+            # Only the first call waited for the connection to be
+            # resolved here, later ones resolve it on their own.
+            elapsed, resolving[0] = resolving[0], 0.0
+            return pool._call(region_name, name, args, kwargs, resolving=elapsed)
+
+        method.__name__ = name
+        method.__doc__ = getattr(attribute, '__doc__', None)
+        return method
@@ -1 +1,124 @@
 WILDCARD_ALL_REGIONS = '*'
+
+# Number of latency samples kept per region to compute percentiles
+LATENCY_WINDOW_SIZE = 1000
+
+# Hedged requests: percentile of the primary region latency to wait
+# for before issuing the secondary request, and the delay (in seconds)
+# to be used until enough samples were observed to compute it.
+HEDGE_DEFAULT_PERCENTILE = 95
+HEDGE_DEFAULT_DELAY = 0.05
+HEDGE_MIN_SAMPLES = 20
+
+# Hedged calls spend most of their time waiting on the network,
+# their executor is thus sized way beyond the cpu count.
+HEDGE_WORKERS_PER_CPU = 5
+
+# AWS error codes signaling a region is throttling requests
+THROTTLING_ERROR_CODES = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'SlowDown',
+])
+
+# Circuit breakers states
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+# Circuit breakers defaults: consecutive failures before opening, and
+# seconds to wait while open before probing the region again.
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+
+# Number of virtual nodes per unit of weight placed on
+# consistent hash rings for each region
+HASH_RING_REPLICAS = 100
+
+# Minimum interval, in seconds, between connection budgets sweeps
+# of idle connections.
+BUDGET_SWEEP_MIN_INTERVAL = 0.1
+
+# Retry policies defaults: attempts per call (the original one included),
+# and bounds, in seconds, of the jittered exponential backoff.
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 5
+
+# Retry budget defaults: retry tokens earned per original call, tokens
+# earned per second whatever the traffic, and maximum tokens stored.
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MIN_PER_SECOND = 1
+RETRY_BUDGET_CAPACITY = 10
+
+# Cassettes modes
+CASSETTE_RECORD = 'record'
+CASSETTE_REPLAY = 'replay'
+
+# Attributes identifying boto objects passed as cassette calls
+# arguments, by order of preference
+CASSETTE_KEY_ATTRIBUTES = ('receipt_handle', 'name', 'id')
+
+# Assumed roles credentials: requested duration, and seconds before
+# their expiration after which they are renewed.
+ASSUMED_ROLE_DURATION = 3600
+ASSUMED_ROLE_RENEWAL_MARGIN = 300
+
+# SQS consumers defaults. Receive and delete calls handle at most
+# 10 messages per batch, and long polls last at most 20 seconds.
+# Failed receives are retried after a delay, and messages failing
+# to be deleted server side are acknowledged up to 3 times.
+SQS_MAX_BATCH_SIZE = 10
+SQS_WAIT_TIME = 20
+SQS_PREFETCH = 100
+SQS_VISIBILITY_TIMEOUT = 30
+SQS_ACK_INTERVAL = 1
+SQS_RECEIVE_ERROR_DELAY = 1
+SQS_DELETE_ATTEMPTS = 3
+
+# S3 listings defaults: keys buffered, partitions listed ahead of
+# the one being consumed in ordered listings, and key ranges the
+# listed keyspace is split in, on the character following its prefix.
+S3_LIST_BUFFER_SIZE = 1000
+S3_LIST_CONCURRENCY = 8
+S3_LIST_SPLITS = 8
+S3_LIST_SPLIT_CHARACTERS = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+)
+
+# SWF pollers defaults: kinds of tasks, concurrent long polls, polled
+# tasks waiting to be handled, and seconds to wait after a failed poll.
+SWF_DECISION_TASK = 'decision'
+SWF_ACTIVITY_TASK = 'activity'
+SWF_POLL_CONCURRENCY = 16
+SWF_DISPATCH_SIZE = 10
+SWF_POLL_ERROR_DELAY = 1
+
+# Adaptive executors defaults: maximum number of workers, seconds after
+# which idle workers retire, submissions the rate is computed over, and
+# sizing decisions kept.
+ADAPTIVE_MAX_WORKERS = 64
+ADAPTIVE_IDLE_TIMEOUT = 30
+ADAPTIVE_RATE_WINDOW_SIZE = 100
+ADAPTIVE_DECISIONS_SIZE = 100
+
+EXECUTOR_GROW = 'grow'
+EXECUTOR_SHRINK = 'shrink'
+
+# SNS publishers: publish batch calls handle at most 10 messages.
+SNS_MAX_BATCH_SIZE = 10
+
+# Calls profiling: number of slowest calls kept, and phases calls
+# durations are broken into.
+PROFILER_SLOWEST_SIZE = 100
+PHASE_QUEUE = 'queue'
+PHASE_CONNECTION = 'connection'
+PHASE_REQUEST = 'request'
+PHASE_PARSING = 'parsing'
+PHASE_BACKOFF = 'backoff'
+PHASES = (PHASE_QUEUE, PHASE_CONNECTION, PHASE_REQUEST, PHASE_PARSING, PHASE_BACKOFF)
@@ -0,0 +1,279 @@
+import time
+import logging
+import threading
+
+from mangrove.dispatch import BoundedDispatcher
+from mangrove.constants import (
+    SQS_MAX_BATCH_SIZE,
+    SQS_WAIT_TIME,
+    SQS_PREFETCH,
+    SQS_VISIBILITY_TIMEOUT,
+    SQS_ACK_INTERVAL,
+    SQS_RECEIVE_ERROR_DELAY,
+    SQS_DELETE_ATTEMPTS
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def chunks(items, size):
+    for index in xrange(0, len(items), size):
+        yield items[index:index + size]
+
+
+class SqsConsumer(BoundedDispatcher):
+    """Consumes messages out of queues spread across regions
+
+    Every queue is long-polled by its own thread, messages being
+    received in batches and buffered up to prefetch messages: pollers
+    stop receiving while the buffer is full. Messages received but
+    not yet acknowledged get their visibility timeout extended until
+    they are, and acknowledgements are deleted in batches. Messages
+    which deletion failed on the server side are acknowledged again,
+    up to SQS_DELETE_ATTEMPTS times.
+
+    ::code-block: python
+        consumer = pool.consume({'us-east-1': ['jobs'], 'eu-west-1': ['jobs']})
+        for message in consumer:
+            process(message)
+            consumer.ack(message)
+
+    :param  pool: pool to consume the queues through
+    :type   pool: mangrove.services.SqsPool
+
+    :param  queues: region name to queues names mapping
+    :type   queues: dict
+
+    :param  batch_size: maximum number of messages per receive call,
+                        up to 10
+    :type   batch_size: int
+
+    :param  wait_time: long polling duration, in seconds
+    :type   wait_time: int
+
+    :param  prefetch: maximum number of buffered messages
+    :type   prefetch: int
+
+    :param  visibility_timeout: visibility timeout of received messages,
+                                in seconds, extended until they are
+                                acknowledged
+    :type   visibility_timeout: int
+
+    :param  ack_interval: maximum delay, in seconds, before pending
+                          acknowledgements are deleted
+    :type   ack_interval: float
+    """
+    def __init__(self, pool, queues, batch_size=SQS_MAX_BATCH_SIZE,
+                 wait_time=SQS_WAIT_TIME, prefetch=SQS_PREFETCH,
+                 visibility_timeout=SQS_VISIBILITY_TIMEOUT,
+                 ack_interval=SQS_ACK_INTERVAL):
+        if not 1 <= batch_size <= SQS_MAX_BATCH_SIZE:
+            raise ValueError(
+                "batch_size should be between 1 and {}, "
+                "got {} instead.".format(SQS_MAX_BATCH_SIZE, batch_size)
+            )
+
+        super(SqsConsumer, self).__init__(pool)
+
+        self.queues = queues
+        self.batch_size = batch_size
+        self.wait_time = wait_time
+        self.prefetch = prefetch
+        self.visibility_timeout = visibility_timeout
+        self.ack_interval = ack_interval
+
+        self._in_progress = {}
+        self._pending_acks = {}
+        self._delete_attempts = {}
+        self._threads = []
+
+    @property
+    def capacity(self):
+        return self.prefetch
+
+    def _start(self):
+        """Starts polling every queues"""
+        for region_name, queue_names in self.queues.iteritems():
+            client = self._pool.region(region_name)
+            for queue_name in queue_names:
+                queue = client.get_queue(queue_name)
+                if queue is None:
+                    raise ValueError(
+                        "{} queue not found in {} region".format(queue_name, region_name)
+                    )
+                self._spawn(self._poll, region_name, queue)
+
+        self._spawn(self._maintain)
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def _poll(self, region_name, queue):
+        client = self._pool.region(region_name)
+
+        while self._running:
+            count = self._reserve(self.batch_size)
+            if not count:
+                return
+
+            messages = []
+            try:
+                messages = client.receive_message(
+                    queue,
+                    number_messages=count,
+                    visibility_timeout=self.visibility_timeout,
+                    wait_time_seconds=self.wait_time
+                )
+            except Exception:
+                logger.exception("Receiving from %s %s failed", region_name, queue.name)
+                self._stopped.wait(SQS_RECEIVE_ERROR_DELAY)
+            finally:
+                now = time.time()
+                with self._condition:
+                    for message in messages:
+                        self._in_progress[message.receipt_handle] = (
+                            region_name, queue, message, now
+                        )
+                    self._dispatch(count, messages)
+
+    def ack(self, message):
+        """Acknowledges a processed message, it will be deleted
+        along with other acknowledged messages of its queue
+
+        :param  message: message to acknowledge
+        :type   message: boto.sqs.message.Message
+        """
+        with self._condition:
+            entry = self._in_progress.pop(message.receipt_handle, None)
+            if entry is None:
+                return
+            region_name, queue, _, _ = entry
+            pending = self._pending_acks.setdefault((region_name, queue), [])
+            pending.append(message)
+            full = len(pending) >= SQS_MAX_BATCH_SIZE
+
+        if full:
+            self._delete(region_name, queue)
+
+    def _delete(self, region_name, queue):
+        with self._condition:
+            messages = self._pending_acks.pop((region_name, queue), [])
+
+        client = self._pool.region(region_name)
+        for batch in chunks(messages, SQS_MAX_BATCH_SIZE):
+            try:
+                results = client.delete_message_batch(queue, batch)
+            except Exception:
+                logger.exception("Deleting from %s %s failed", region_name, queue.name)
+                continue
+            self._handle_delete_errors(region_name, queue, batch, results)
+
+    def _handle_delete_errors(self, region_name, queue, batch, results):
+        """Acknowledges again the messages of a deleted batch which
+        failed on the server side, logging the others failures
+
+        :param  results: delete_message_batch call results
+        :type   results: boto.sqs.batchresults.BatchResults
+        """
+        errors = dict(
+            (error.get('id'), error) for error in getattr(results, 'errors', None) or []
+        )
+
+        failed = []
+        with self._condition:
+            for message in batch:
+                attempts = self._delete_attempts.pop(message.receipt_handle, 1)
+                error = errors.get(message.id)
+                if error is None:
+                    continue
+
+                sender_fault = str(error.get('sender_fault')).lower() == 'true'
+                if not sender_fault and attempts < SQS_DELETE_ATTEMPTS:
+                    self._delete_attempts[message.receipt_handle] = attempts + 1
+                    pending = self._pending_acks.setdefault((region_name, queue), [])
+                    pending.append(message)
+                else:
+                    failed.append((message, error))
+
+        for message, error in failed:
+            logger.error(
+                "Deleting message %s from %s %s failed: %s %s", message.id,
+                region_name, queue.name, error.get('error_code'),
+                error.get('error_message')
+            )
+
+    def flush(self):
+        """Deletes every pending acknowledgements"""
+        with self._condition:
+            keys = list(self._pending_acks)
+
+        for region_name, queue in keys:
+            self._delete(region_name, queue)
+
+    def _change_visibility(self, entries, visibility_timeout):
+        """Changes in progress messages visibility, in batches per queue"""
+        by_queue = {}
+        for region_name, queue, message, _ in entries:
+            by_queue.setdefault((region_name, queue), []).append(message)
+
+        for (region_name, queue), messages in by_queue.iteritems():
+            client = self._pool.region(region_name)
+            for batch in chunks(messages, SQS_MAX_BATCH_SIZE):
+                try:
+                    client.change_message_visibility_batch(
+                        queue, [(m, visibility_timeout) for m in batch]
+                    )
+                except Exception:
+                    logger.exception(
+                        "Changing visibility in %s %s failed", region_name, queue.name
+                    )
+
+    def extend(self):
+        """Extends the visibility timeout of the in progress messages
+        which received or last extended more than half a visibility
+        timeout ago"""
+        now = time.time()
+        threshold = now - self.visibility_timeout / 2.0
+
+        with self._condition:
+            expiring = [
+                entry for entry in self._in_progress.itervalues()
+                if entry[3] <= threshold
+            ]
+            for region_name, queue, message, _ in expiring:
+                self._in_progress[message.receipt_handle] = (
+                    region_name, queue, message, now
+                )
+
+        self._change_visibility(expiring, self.visibility_timeout)
+
+    def _maintain(self):
+        while not self._stopped.wait(self.ack_interval):
+            self.flush()
+            self.extend()
+
+    def close(self):
+        """Stops polling, deletes pending acknowledgements, and makes
+        buffered messages visible again to other consumers"""
+        self._stop()
+
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self._threads = []
+
+        self.flush()
+
+        with self._condition:
+            buffered = [
+                self._in_progress.pop(message.receipt_handle)
+                for message in self._buffer
+                if message.receipt_handle in self._in_progress
+            ]
+            self._buffer.clear()
+
+        self._change_visibility(buffered, 0)
@@ -1,5 +1,6 @@
 import types
 
+from mangrove.retry import RetryPolicy
 from mangrove.utils import get_boto_module
 from mangrove.constants import WILDCARD_ALL_REGIONS
 from mangrove.exceptions import InvalidServiceError, DoesNotExistError
@@ -11,6 +12,7 @@ class ServiceDeclaration(object):
         self._service_name = None
         self._regions = []
         self._default_region = None
+        self._retry = None
 
         if declaration is not None:
             self.load(declaration)
@@ -46,7 +48,7 @@ class ServiceDeclaration(object):
         self.service_name = declaration.keys()[0]
         self.regions = declaration[self.service_name].get('regions')
         self.default_region = declaration[self.service_name].get('default_region')
-        
+        self.retry = declaration[self.service_name].get('retry')
 
     @property
     def module(self):
@@ -110,6 +112,14 @@ class ServiceDeclaration(object):
 
         self._default_region = value
 
+    @property
+    def retry(self):
+        return self._retry
+
+    @retry.setter
+    def retry(self, value):
+        self._retry = RetryPolicy.load(value)
+
 class ServicePoolDeclaration(dict):
     def __init__(self, declaration=None):
         super(ServicePoolDeclaration, self).__init__()
@@ -0,0 +1,132 @@
+import time
+import threading
+
+from collections import deque
+
+
+class BoundedDispatcher(object):
+    """Hands items fetched in the background, by long-polling workers,
+    over to consumers through a bounded buffer
+
+    Workers reserve buffer room before fetching items, so that no
+    more than capacity items are ever fetched ahead of consumers.
+    Subclasses start their workers in _start, reserve room with
+    _reserve, and hand the fetched items over with _dispatch.
+
+    Calls are made through the pool region clients, and thus
+    benefit from its retry policy and circuit breakers.
+
+    :param  pool: pool to make the calls through
+    :type   pool: mangrove.pool.ServicePool
+    """
+    def __init__(self, pool):
+        self._pool = pool
+
+        self._buffer = deque()
+        self._reserved = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def capacity(self):
+        """Maximum number of items buffered, or being fetched"""
+        raise NotImplementedError
+
+    def start(self):
+        """Starts the workers"""
+        self._running = True
+        self._stopped.clear()
+        self._start()
+        return self
+
+    def _start(self):
+        raise NotImplementedError
+
+    def _room(self):
+        return self.capacity - len(self._buffer) - self._reserved
+
+    def _reserve(self, count, wait=True):
+        """Reserves buffer room for up to count items, waiting for some
+        to be released if wait is set
+
+        :returns: number of reserved items, 0 if stopped, or if no
+                  room was left and wait is not set
+        :rtype: int
+        """
+        with self._condition:
+            while self._running:
+                room = self._room()
+                if room > 0:
+                    count = min(count, room)
+                    self._reserved += count
+                    return count
+                if not wait:
+                    break
+                self._condition.wait(0.5)
+        return 0
+
+    def _dispatch(self, reserved, items):
+        """Hands fetched items over to consumers, releasing the room
+        reserved to fetch them"""
+        with self._condition:
+            self._reserved -= reserved
+            self._buffer.extend(items)
+            self._condition.notify_all()
+
+    def _released(self):
+        """Called once an item was taken out of the buffer"""
+        pass
+
+    def get(self, timeout=None):
+        """Gets the next item, waiting for one if needed
+
+        :param  timeout: seconds to wait for an item, forever if None
+        :type   timeout: float
+
+        :returns: the next item, or None if the dispatcher was closed,
+                  or no item was fetched within timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._condition:
+            while not self._buffer:
+                if not self._running:
+                    return None
+                remaining = 0.5 if deadline is None else deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(min(remaining, 0.5))
+
+            item = self._buffer.popleft()
+            self._condition.notify_all()
+
+        self._released()
+        return item
+
+    def _stop(self):
+        """Stops the workers, and wakes up the waiting consumers"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._stopped.set()
+
+    def close(self):
+        raise NotImplementedError
@@ -11,3 +11,11 @@ class NotConnectedError(Exception):
 
 class InvalidServiceError(Exception):
     pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CassetteMissError(Exception):
+    pass
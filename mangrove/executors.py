@@ -0,0 +1,324 @@
+import sys
+import math
+import time
+import Queue
+import atexit
+import logging
+import weakref
+import threading
+
+from collections import deque
+from multiprocessing import cpu_count
+
+from concurrent.futures import Executor, Future
+
+from mangrove.stats import LatencyWindow
+from mangrove.constants import (
+    ADAPTIVE_MAX_WORKERS,
+    ADAPTIVE_IDLE_TIMEOUT,
+    ADAPTIVE_RATE_WINDOW_SIZE,
+    ADAPTIVE_DECISIONS_SIZE,
+    EXECUTOR_GROW,
+    EXECUTOR_SHRINK
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Workers threads, and the queue they take work items from. Those
+# still running at exit are stopped and joined before the interpreter
+# tears modules down under their feet.
+_workers_queues = weakref.WeakKeyDictionary()
+_exiting = False
+
+
+def _python_exit():
+    global _exiting
+    _exiting = True
+    items = list(_workers_queues.items())
+    for _, queue in items:
+        queue.put(None)
+    for thread, _ in items:
+        thread.join()
+
+atexit.register(_python_exit)
+
+
+class _WorkItem(object):
+    __slots__ = ('future', 'fn', 'args', 'kwargs')
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except BaseException:
+            self.future.set_exception_info(*sys.exc_info()[1:])
+        else:
+            self.future.set_result(result)
+
+
+def _work(executor_ref, queue, idle_timeout):
+    """Runs an executor work items, until it retires, the executor
+    shuts down or is garbage collected, or the interpreter exits
+
+    Workers only hold a weak reference to their executor, for it to
+    be collected, along with its workers, once dropped.
+    """
+    while True:
+        try:
+            item = queue.get(timeout=idle_timeout)
+        except Queue.Empty:
+            executor = executor_ref()
+            if executor is None or executor._retire():
+                return
+            del executor
+            continue
+
+        if item is not None:
+            start = time.time()
+            item.run()
+            latency = time.time() - start
+            del item
+
+            executor = executor_ref()
+            if executor is not None:
+                executor._done(latency)
+            del executor
+            continue
+
+        # Stop sentinel, put back for other workers to stop too
+        executor = executor_ref()
+        if _exiting or executor is None or executor._shutdown:
+            queue.put(None)
+            if executor is not None:
+                executor._stopped()
+            return
+        del executor
+
+
+class SizingDecision(object):
+    """Record of an executor resizing
+
+    :param  action: EXECUTOR_GROW or EXECUTOR_SHRINK
+    :type   action: string
+
+    :param  previous: number of workers before resizing
+    :type   previous: int
+
+    :param  workers: number of workers after resizing
+    :type   workers: int
+
+    :param  queued: number of queued work items when resizing
+    :type   queued: int
+
+    :param  demand: number of workers the submission rate and
+                    work items latency call for, Little's law wise
+    :type   demand: int
+
+    :param  latency: mean work items latency, in seconds
+    :type   latency: float
+    """
+    __slots__ = ('time', 'action', 'previous', 'workers', 'queued', 'demand', 'latency')
+
+    def __init__(self, action, previous, workers, queued, demand, latency):
+        self.time = time.time()
+        self.action = action
+        self.previous = previous
+        self.workers = workers
+        self.queued = queued
+        self.demand = demand
+        self.latency = latency
+
+    def __repr__(self):
+        return '<SizingDecision {} {}->{} queued={} demand={}>'.format(
+            self.action, self.previous, self.workers, self.queued, self.demand
+        )
+
+
+class AdaptiveThreadPoolExecutor(Executor):
+    """Thread pool executor sizing itself to the work it is handed
+
+    AWS calls are I/O bound: the number of threads able to keep them
+    flowing depends on their latency rather than on the host cores.
+    Workers are thus spawned as long as outstanding work, submitted
+    but not completed yet, exceeds them, or as long as the submission
+    rate times the observed work latency (the concurrency needed to
+    sustain it, as per Little's law) does. Workers idle for idle_timeout
+    seconds retire, unless that concurrency still calls for them.
+
+    Like concurrent.futures ones, executors dropped without being shut
+    down have their workers stopped once garbage collected, and running
+    workers are stopped at interpreter exit.
+
+    Every resizing is recorded, the latest ones being exposed by
+    ``decisions``.
+
+    :param  min_workers: number of workers never retired, the host
+                         cpu count as a default
+    :type   min_workers: int
+
+    :param  max_workers: maximum number of workers
+    :type   max_workers: int
+
+    :param  idle_timeout: seconds after which an idle worker retires
+    :type   idle_timeout: float
+    """
+    def __init__(self, min_workers=None, max_workers=ADAPTIVE_MAX_WORKERS,
+                 idle_timeout=ADAPTIVE_IDLE_TIMEOUT):
+        if min_workers is None:
+            min_workers = min(cpu_count(), max_workers)
+
+        if not 0 <= min_workers <= max_workers or max_workers < 1:
+            raise ValueError(
+                "min_workers should be between 0 and max_workers, and max_workers "
+                "positive, got {} and {} instead.".format(min_workers, max_workers)
+            )
+
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+
+        self._queue = Queue.Queue()
+        self._threads = set()
+        self._outstanding = 0
+        self._submissions = deque(maxlen=ADAPTIVE_RATE_WINDOW_SIZE)
+        self._latencies = LatencyWindow()
+        self._decisions = deque(maxlen=ADAPTIVE_DECISIONS_SIZE)
+        self._shutdown = False
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        """Number of running workers"""
+        return len(self._threads)
+
+    @property
+    def latencies(self):
+        return self._latencies
+
+    def decisions(self):
+        """Latest sizing decisions, oldest first
+
+        :rtype: list of SizingDecision
+        """
+        with self._lock:
+            return list(self._decisions)
+
+    def _demand(self, now):
+        """Computes the number of workers needed to sustain the recent
+        submission rate given the observed latency
+
+        Has to be called with the lock held.
+        """
+        latency = self._latencies.mean()
+        if latency is None or not self._submissions:
+            return 0, latency
+
+        span = now - self._submissions[0]
+        if span <= 0:
+            return 0, latency
+
+        rate = len(self._submissions) / span
+        return int(math.ceil(rate * latency)), latency
+
+    def _record(self, action, previous, demand, latency):
+        decision = SizingDecision(
+            action, previous, len(self._threads), self._queue.qsize(), demand, latency
+        )
+        self._decisions.append(decision)
+        logger.debug("Executor resized: %r", decision)
+
+    def _adjust(self, now):
+        """Spawns the workers the backlog and demand call for
+
+        Has to be called with the lock held.
+        """
+        workers = len(self._threads)
+        demand, latency = self._demand(now)
+        target = min(max(self._outstanding, demand, self.min_workers),
+                     self.max_workers)
+
+        if target <= workers:
+            return
+
+        # Workers get a weak reference to the executor, waking them
+        # up to stop once it is garbage collected
+        executor_ref = weakref.ref(self, lambda _, queue=self._queue: queue.put(None))
+        for _ in xrange(target - workers):
+            thread = threading.Thread(
+                target=_work, args=(executor_ref, self._queue, self.idle_timeout)
+            )
+            thread.daemon = True
+            self._threads.add(thread)
+            _workers_queues[thread] = self._queue
+            thread.start()
+
+        self._record(EXECUTOR_GROW, workers, demand, latency)
+
+    def _retire(self):
+        """Tells whether the calling idle worker should retire,
+        recording so"""
+        with self._lock:
+            workers = len(self._threads)
+            if self._shutdown:
+                self._threads.discard(threading.current_thread())
+                return True
+
+            demand, latency = self._demand(time.time())
+            if workers <= max(self.min_workers, demand, self._outstanding):
+                return False
+
+            self._threads.discard(threading.current_thread())
+            self._record(EXECUTOR_SHRINK, workers, demand, latency)
+            return True
+
+    def _done(self, latency):
+        """Accounts for a work item completed by a worker"""
+        self._latencies.add(latency)
+        with self._lock:
+            self._outstanding -= 1
+
+    def _stopped(self):
+        """Forgets the calling worker, stopped on shutdown"""
+        with self._lock:
+            self._threads.discard(threading.current_thread())
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+            future = Future()
+            self._queue.put(_WorkItem(future, fn, args, kwargs))
+            self._outstanding += 1
+
+            now = time.time()
+            self._submissions.append(now)
+            self._adjust(now)
+
+        return future
+
+    submit.__doc__ = Executor.submit.__doc__
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+
+        # Queued work items are run before workers get the sentinel
+        self._queue.put(None)
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    shutdown.__doc__ = Executor.shutdown.__doc__
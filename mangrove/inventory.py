@@ -0,0 +1,250 @@
+import threading
+
+from concurrent.futures import as_completed
+
+
+class InstanceRecord(object):
+    """Compact snapshot of an EC2 instance
+
+    Only the attributes relevant to change detection are kept,
+    in a slots-backed record, rather than the whole boto Instance
+    object and its connection.
+    """
+    __slots__ = (
+        'id',
+        'region',
+        'state',
+        'instance_type',
+        'image_id',
+        'private_ip_address',
+        'ip_address',
+        'launch_time',
+        'tags',
+    )
+
+    def __init__(self, id, region, state=None, instance_type=None,
+                 image_id=None, private_ip_address=None, ip_address=None,
+                 launch_time=None, tags=()):
+        self.id = id
+        self.region = region
+        self.state = state
+        self.instance_type = instance_type
+        self.image_id = image_id
+        self.private_ip_address = private_ip_address
+        self.ip_address = ip_address
+        self.launch_time = launch_time
+        self.tags = tags
+
+    @classmethod
+    def from_instance(cls, region, instance):
+        """Builds a record out of a boto Instance object
+
+        :param  region: name of the region the instance runs in
+        :type   region: string
+
+        :param  instance: instance to build the record from
+        :type   instance: boto.ec2.instance.Instance
+        """
+        return cls(
+            instance.id,
+            region,
+            state=instance.state,
+            instance_type=instance.instance_type,
+            image_id=instance.image_id,
+            private_ip_address=instance.private_ip_address,
+            ip_address=instance.ip_address,
+            launch_time=instance.launch_time,
+            tags=tuple(sorted((getattr(instance, 'tags', None) or {}).items())),
+        )
+
+    def __repr__(self):
+        return '<InstanceRecord {} {} {}>'.format(self.region, self.id, self.state)
+
+    def __eq__(self, other):
+        if not isinstance(other, InstanceRecord):
+            return NotImplemented
+        return all(
+            getattr(self, attr) == getattr(other, attr)
+            for attr in self.__slots__
+        )
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def changes(self, other):
+        """Lists the attributes which value differs from another record
+
+        :param  other: record to compare with
+        :type   other: InstanceRecord
+        """
+        return [
+            attr for attr in self.__slots__
+            if getattr(self, attr) != getattr(other, attr)
+        ]
+
+
+class InventoryDiff(object):
+    """Changes observed in a region between two inventory snapshots
+
+    :param  region: name of the region
+    :type   region: string
+
+    :param  added: records of the instances which appeared
+    :type   added: list of InstanceRecord
+
+    :param  removed: records of the instances which disappeared
+    :type   removed: list of InstanceRecord
+
+    :param  changed: (previous, current) records of the instances
+                     which attributes changed
+    :type   changed: list of tuples
+    """
+    __slots__ = ('region', 'added', 'removed', 'changed')
+
+    def __init__(self, region, added=None, removed=None, changed=None):
+        self.region = region
+        self.added = added or []
+        self.removed = removed or []
+        self.changed = changed or []
+
+    def __repr__(self):
+        return '<InventoryDiff {} +{} -{} ~{}>'.format(
+            self.region, len(self.added), len(self.removed), len(self.changed)
+        )
+
+    def __nonzero__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    @classmethod
+    def compute(cls, region, previous, current):
+        """Computes the diff between two region snapshots
+
+        :param  previous: instance id to record mapping
+        :type   previous: dict
+
+        :param  current: instance id to record mapping
+        :type   current: dict
+        """
+        diff = cls(region)
+        for instance_id, record in current.iteritems():
+            old = previous.get(instance_id)
+            if old is None:
+                diff.added.append(record)
+            elif old != record:
+                diff.changed.append((old, record))
+
+        diff.removed = [
+            record for instance_id, record in previous.iteritems()
+            if instance_id not in current
+        ]
+
+        return diff
+
+
+class Ec2Inventory(object):
+    """Incremental cross-region EC2 instances inventory
+
+    The inventory keeps a compact snapshot of every region instances.
+    Each refresh concurrently lists the regions instances through the
+    pool, and computes the diff with the previous snapshot, which is
+    handed to subscribers. Note that the first refresh of a region
+    reports all of its instances as added.
+
+    Regions which listing failed keep their previous snapshot, the
+    raised exceptions being exposed through the errors attribute.
+
+    :param  pool: pool to list the instances through
+    :type   pool: mangrove.services.Ec2Pool
+
+    :param  regions: regions to inventory, as a default every
+                     pool connected regions.
+    :type   regions: list of strings
+
+    :param  filters: filters to list instances with, as supported
+                     by boto's get_all_instances
+    :type   filters: dict
+    """
+    def __init__(self, pool, regions=None, filters=None):
+        self._pool = pool
+        self.regions = regions
+        self.filters = filters
+
+        self._snapshots = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self.errors = {}
+
+    def __len__(self):
+        return sum(len(s) for s in self._snapshots.itervalues())
+
+    def __iter__(self):
+        for snapshot in self._snapshots.values():
+            for record in snapshot.itervalues():
+                yield record
+
+    def snapshot(self, region):
+        """Access a region latest snapshot, as an instance id to
+        InstanceRecord mapping
+
+        :param  region: name of the region
+        :type   region: string
+        """
+        return dict(self._snapshots.get(region, {}))
+
+    def subscribe(self, callback):
+        """Registers a callable to be called with every non empty
+        InventoryDiff computed by refresh
+
+        :param  callback: callable accepting an InventoryDiff
+        :type   callback: callable
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def refresh(self, regions=None):
+        """Lists regions instances concurrently and updates their
+        snapshot
+
+        :param  regions: regions to refresh, as a default the
+                         inventory regions.
+        :type   regions: list of strings
+
+        :returns: non empty diffs, by region
+        :rtype: dict
+        """
+        kwargs = {'filters': self.filters} if self.filters else None
+        futures = self._pool.fan_out(
+            'get_all_instances',
+            kwargs=kwargs,
+            regions=regions or self.regions
+        )
+        regions_by_future = dict((f, r) for r, f in futures.iteritems())
+
+        diffs = {}
+        for future in as_completed(regions_by_future):
+            region = regions_by_future[future]
+            if future.exception() is not None:
+                self.errors[region] = future.exception()
+                continue
+            self.errors.pop(region, None)
+
+            current = dict(
+                (instance.id, InstanceRecord.from_instance(region, instance))
+                for reservation in future.result()
+                for instance in reservation.instances
+            )
+
+            with self._lock:
+                previous = self._snapshots.get(region, {})
+                self._snapshots[region] = current
+
+            diff = InventoryDiff.compute(region, previous, current)
+            if diff:
+                diffs[region] = diff
+                for callback in list(self._subscribers):
+                    callback(diff)
+
+        return diffs
@@ -0,0 +1,340 @@
+import Queue
+import threading
+
+from operator import attrgetter
+from collections import deque
+
+from boto.s3.prefix import Prefix
+
+from mangrove import executors
+from mangrove.constants import (
+    S3_LIST_BUFFER_SIZE,
+    S3_LIST_CONCURRENCY,
+    S3_LIST_SPLITS,
+    S3_LIST_SPLIT_CHARACTERS
+)
+
+
+# Queues markers: end of a partition listing, and failed listing
+_DONE = object()
+
+
+class _Failure(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class _KeyRange(object):
+    """Keys of a prefix listed after a marker, up to (and including)
+    an upper bound, both of them excluded when None"""
+    __slots__ = ('prefix', 'after', 'until')
+
+    def __init__(self, prefix, after=None, until=None):
+        self.prefix = prefix
+        self.after = after
+        self.until = until
+
+
+class _Walks(object):
+    """Key ranges left to walk in an unordered listing, at most
+    concurrency of them being walked at once"""
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self._queued = deque()
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def queue(self, key_range, level):
+        with self._lock:
+            self._queued.append((key_range, level))
+
+    def start(self):
+        """Pops the queued key ranges which walks can be started"""
+        started = []
+        with self._lock:
+            while self._queued and self._running < self.concurrency:
+                started.append(self._queued.popleft())
+                self._running += 1
+        return started
+
+    def done(self):
+        """Tells whether the walk done was the last one, none being
+        queued either"""
+        with self._lock:
+            self._running -= 1
+            return self._running == 0 and not self._queued
+
+
+class S3Lister(object):
+    """Lists a bucket keys concurrently, partitioning its keyspace
+
+    The bucket common prefixes are discovered, depth levels deep,
+    using delimiter. Every discovered prefix is then a partition
+    listed on its own, concurrently with at most concurrency others
+    on the pool's executor, keys being streamed back through bounded
+    buffers.
+
+    The listed keyspace is first split in key ranges on the character
+    following prefix, using markers, so that flat keyspaces, having
+    no common prefixes, are listed concurrently too.
+
+    Keys are yielded as soon as they are listed, or in lexicographic
+    order if ordered is set. In that case, partitions are discovered
+    lazily, in order, and at most concurrency partitions are listed
+    ahead of the one being consumed. Flat keyspaces should then be
+    listed with a depth of 0, their key ranges being the partitions.
+
+    :param  pool: pool to list the bucket through
+    :type   pool: mangrove.services.S3Pool
+
+    :param  bucket_name: name of the bucket to list
+    :type   bucket_name: string
+
+    :param  region: region connection to use, the pool default
+                    region one as a default
+    :type   region: string
+
+    :param  prefix: prefix of the keys to list
+    :type   prefix: string
+
+    :param  delimiter: delimiter used to discover partitions
+    :type   delimiter: string
+
+    :param  depth: number of delimiter levels partitions are
+                   discovered through
+    :type   depth: int
+
+    :param  ordered: should keys be yielded in lexicographic order
+    :type   ordered: bool
+
+    :param  buffer_size: maximum number of buffered keys
+    :type   buffer_size: int
+
+    :param  concurrency: maximum number of partitions listed at once,
+                         ahead of the consumed one in ordered listings
+    :type   concurrency: int
+
+    :param  splits: number of key ranges the keyspace is split in,
+                    1 not to split it
+    :type   splits: int
+    """
+    def __init__(self, pool, bucket_name, region=None, prefix='', delimiter='/',
+                 depth=1, ordered=False, buffer_size=S3_LIST_BUFFER_SIZE,
+                 concurrency=S3_LIST_CONCURRENCY, splits=S3_LIST_SPLITS):
+        self._pool = pool
+        self.bucket_name = bucket_name
+        self.region = region
+        self.prefix = prefix
+        self.delimiter = delimiter
+        self.depth = depth
+        self.ordered = ordered
+        self.buffer_size = buffer_size
+        self.concurrency = concurrency
+        self.splits = splits
+
+        self._cancelled = threading.Event()
+
+    def _bucket(self):
+        if self.region is not None:
+            client = self._pool.region(self.region)
+        else:
+            client = self._pool.regions.default
+            if client is None:
+                raise ValueError(
+                    "No region supplied, and no default region set for the pool."
+                )
+        return client.get_bucket(self.bucket_name, validate=False)
+
+    def _ranges(self):
+        """Splits the listed keyspace in key ranges
+
+        Bounds are the prefix followed by a single character, so that
+        common prefixes never span two ranges, unless that character
+        starts the delimiter: those are left out.
+
+        :rtype: list of _KeyRange
+        """
+        characters = [
+            c for c in S3_LIST_SPLIT_CHARACTERS if c != (self.delimiter or '')[:1]
+        ]
+        step = len(characters) / float(max(self.splits, 1))
+        bounds = sorted(set(
+            self.prefix + characters[int(index * step)]
+            for index in xrange(1, min(self.splits, len(characters)))
+        ))
+        return [
+            _KeyRange(self.prefix, after, until)
+            for after, until in zip([None] + bounds, bounds + [None])
+        ]
+
+    def _pages(self, bucket, prefix, delimiter='', marker=''):
+        """Lazily lists a prefix, page by page
+
+        S3 pages hold keys first, then common prefixes: items are
+        only sorted across pages, not within them.
+        """
+        while True:
+            page = bucket.get_all_keys(prefix=prefix, delimiter=delimiter,
+                                       marker=marker)
+            yield page
+            if not page.is_truncated or not page:
+                return
+            marker = page.next_marker or max(item.name for item in page)
+
+    def _list(self, bucket, key_range, delimiter=''):
+        """Lazily lists a key range, keys and common prefixes alike"""
+        for page in self._pages(bucket, key_range.prefix, delimiter,
+                                key_range.after or ''):
+            exceeded = False
+            for item in page:
+                if key_range.until is not None and item.name > key_range.until:
+                    exceeded = True
+                    continue
+                yield item
+            if exceeded:
+                return
+
+    def _items(self, bucket, prefix, level=0):
+        """Lazily lists a prefix keys, and the partitions found depth
+        levels deep as Prefix objects, in lexicographic order"""
+        for page in self._pages(bucket, prefix, self.delimiter):
+            for item in sorted(page, key=attrgetter('name')):
+                if isinstance(item, Prefix) and level + 1 < self.depth:
+                    for sub_item in self._items(bucket, item.name, level + 1):
+                        yield sub_item
+                else:
+                    yield item
+
+    def partitions(self):
+        """Discovers the bucket keyspace partitions
+
+        :returns: keys found while discovering, and partitions
+                  Prefix objects, sorted by name
+        :rtype: list
+        """
+        if self.depth < 1:
+            return [Prefix(name=self.prefix)]
+        return list(self._items(self._bucket(), self.prefix))
+
+    def _put(self, buffer, item):
+        # Listings stop as soon as the consumer went away, or the
+        # interpreter exits: executors workers are then joined.
+        while not self._cancelled.is_set() and not executors._exiting:
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except Queue.Full:
+                continue
+        return False
+
+    def _list_partition(self, bucket, key_range, buffer):
+        try:
+            for key in self._list(bucket, key_range):
+                if not self._put(buffer, key):
+                    return
+        except Exception as e:
+            self._put(buffer, _Failure(e))
+        self._put(buffer, _DONE)
+
+    def _drain(self, buffer, pending):
+        """Yields keys out of a buffer until pending partitions
+        listings are done"""
+        while pending:
+            item = buffer.get()
+            if item is _DONE:
+                pending -= 1
+            elif isinstance(item, _Failure):
+                raise item.error
+            else:
+                yield item
+
+    def _walk(self, bucket, key_range, level, buffer, walks):
+        """Lists a key range into buffer. Prefixes found less than
+        depth levels deep are queued to be walked on their own,
+        concurrently; the last walk done marks the listing done."""
+        delimiter = self.delimiter if level < self.depth else ''
+        try:
+            for item in self._list(bucket, key_range, delimiter):
+                if isinstance(item, Prefix):
+                    walks.queue(_KeyRange(item.name), level + 1)
+                    self._start_walks(bucket, buffer, walks)
+                elif not self._put(buffer, item):
+                    return
+        except Exception as e:
+            self._put(buffer, _Failure(e))
+            return
+
+        if walks.done():
+            self._put(buffer, _DONE)
+        else:
+            self._start_walks(bucket, buffer, walks)
+
+    def _start_walks(self, bucket, buffer, walks):
+        if self._cancelled.is_set():
+            return
+        for key_range, level in walks.start():
+            self._pool._executor.submit(
+                self._walk, bucket, key_range, level, buffer, walks
+            )
+
+    def _unordered(self, bucket):
+        buffer = Queue.Queue(maxsize=self.buffer_size)
+        walks = _Walks(self.concurrency)
+
+        for key_range in self._ranges():
+            walks.queue(key_range, 0)
+        self._start_walks(bucket, buffer, walks)
+
+        for key in self._drain(buffer, 1):
+            yield key
+
+    def _ordered(self, bucket):
+        if self.depth < 1:
+            items = iter(self._ranges())
+        else:
+            items = self._items(bucket, self.prefix)
+
+        partition_size = max(1, self.buffer_size // self.concurrency)
+        window = deque()
+        listing = [0]
+
+        def fill():
+            # Starts listing partitions up to concurrency ahead, keys
+            # found meanwhile being buffered up to buffer_size
+            while listing[0] < self.concurrency and len(window) < self.buffer_size:
+                item = next(items, None)
+                if item is None:
+                    return
+                if isinstance(item, Prefix):
+                    item = _KeyRange(item.name)
+                if isinstance(item, _KeyRange):
+                    buffer = Queue.Queue(maxsize=partition_size)
+                    self._pool._executor.submit(
+                        self._list_partition, bucket, item, buffer
+                    )
+                    window.append(buffer)
+                    listing[0] += 1
+                else:
+                    window.append(item)
+
+        fill()
+        while window:
+            item = window.popleft()
+            if isinstance(item, Queue.Queue):
+                listing[0] -= 1
+                for key in self._drain(item, 1):
+                    yield key
+            else:
+                yield item
+            fill()
+
+    def __iter__(self):
+        self._cancelled.clear()
+        bucket = self._bucket()
+
+        listing = self._ordered if self.ordered else self._unordered
+        try:
+            for key in listing(bucket):
+                yield key
+        finally:
+            self._cancelled.set()
@@ -1,6 +1,10 @@
+from collections import Mapping
+
 from boto.connection import AWSAuthConnection
 from concurrent.futures._base import Future
 
+from mangrove.client import RegionClient
+
 
 class ConnectionsMapping(dict):
     """Exposes a region name to connection mapping
@@ -56,3 +60,44 @@ class ConnectionsMapping(dict):
             dict.__setitem__(self, key, value)
 
         return value
+
+
+class RegionClientsMapping(Mapping):
+    """Exposes a region name to RegionClient mapping over
+    a pool's connections
+
+    Clients are created lazily, and only for regions the
+    pool holds a connection to.
+
+    :param  pool: pool which connections should be exposed
+    :type   pool: mangrove.pool.ServicePool
+    """
+    def __init__(self, pool):
+        self._pool = pool
+        self._clients = {}
+
+    def __getitem__(self, key):
+        if not self._pool._is_connected(key):
+            raise KeyError(key)
+
+        if key not in self._clients:
+            self._clients[key] = RegionClient(self._pool, key)
+
+        return self._clients[key]
+
+    def __iter__(self):
+        return iter(self._pool._connected_regions())
+
+    def __len__(self):
+        return len(self._pool._connected_regions())
+
+    def __repr__(self):
+        return '<RegionClientsMapping {}>'.format(sorted(self))
+
+    @property
+    def default(self):
+        default_name = self._pool._connections._default_name
+        if default_name is None or default_name not in self:
+            return None
+
+        return self[default_name]
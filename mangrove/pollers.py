@@ -0,0 +1,268 @@
+import time
+import logging
+
+from collections import deque
+
+from concurrent.futures import ThreadPoolExecutor
+
+from mangrove.stats import LatencyWindow
+from mangrove.dispatch import BoundedDispatcher
+from mangrove.constants import (
+    SWF_DECISION_TASK,
+    SWF_ACTIVITY_TASK,
+    SWF_POLL_CONCURRENCY,
+    SWF_DISPATCH_SIZE,
+    SWF_POLL_ERROR_DELAY
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class PolledTask(object):
+    """Decision or activity task, along with the task list it was
+    polled from
+
+    Responses to a task have to be sent to the region it was polled
+    from, through ``pool.region(task.region)``.
+    """
+    __slots__ = ('region', 'domain', 'task_list', 'kind', 'token', 'data')
+
+    def __init__(self, region, domain, task_list, kind, data):
+        self.region = region
+        self.domain = domain
+        self.task_list = task_list
+        self.kind = kind
+        self.token = data['taskToken']
+        self.data = data
+
+    def __repr__(self):
+        return '<PolledTask {} {} {}/{}>'.format(
+            self.kind, self.region, self.domain, self.task_list
+        )
+
+
+class PollStats(object):
+    """Polls statistics of a task list
+
+    :param  polls: number of completed polls
+    :type   polls: int
+
+    :param  empty: number of polls which returned no task
+    :type   empty: int
+
+    :param  errors: number of failed polls
+    :type   errors: int
+
+    :param  latencies: recent polls durations
+    :type   latencies: mangrove.stats.LatencyWindow
+    """
+    __slots__ = ('polls', 'empty', 'errors', 'latencies')
+
+    def __init__(self):
+        self.polls = 0
+        self.empty = 0
+        self.errors = 0
+        self.latencies = LatencyWindow()
+
+    def __repr__(self):
+        return '<PollStats polls={} empty={} errors={}>'.format(
+            self.polls, self.empty, self.errors
+        )
+
+    @property
+    def empty_rate(self):
+        """Share of the completed polls which returned no task
+
+        :rtype: float
+        """
+        if not self.polls:
+            return 0.0
+        return self.empty / float(self.polls)
+
+
+class SwfPoller(BoundedDispatcher):
+    """Long-polls SWF task lists spread across regions and domains
+
+    Every task list poll runs on a shared, bounded, executor: with
+    more task lists than workers, polls are queued and take turns.
+    Polled tasks are handed to a bounded dispatch queue, and a poll
+    is only issued once room was reserved for the task it may return,
+    so that no task is polled, and its timeout started, while nobody
+    is able to handle it.
+
+    ::code-block: python
+        poller = pool.poll({'us-east-1': {'my-domain': ['deciders']}})
+        for task in poller:
+            decisions = decide(task.data['events'])
+            pool.region(task.region).respond_decision_task_completed(
+                task.token, decisions
+            )
+
+    :param  pool: pool to poll the task lists through
+    :type   pool: mangrove.services.SwfPool
+
+    :param  task_lists: region name to domain name to task lists
+                        names mapping
+    :type   task_lists: dict
+
+    :param  kind: kind of tasks to poll, 'decision' or 'activity'
+    :type   kind: string
+
+    :param  identity: identity recorded in the workflows histories
+    :type   identity: string
+
+    :param  concurrency: maximum number of concurrent polls, ignored
+                         if executor is provided
+    :type   concurrency: int
+
+    :param  dispatch_size: maximum number of polled tasks waiting
+                           to be handled
+    :type   dispatch_size: int
+
+    :param  executor: executor to run the polls on, shared with
+                      other pollers
+    :type   executor: concurrent.futures.Executor
+    """
+    def __init__(self, pool, task_lists, kind=SWF_DECISION_TASK, identity=None,
+                 concurrency=SWF_POLL_CONCURRENCY, dispatch_size=SWF_DISPATCH_SIZE,
+                 executor=None):
+        if kind not in (SWF_DECISION_TASK, SWF_ACTIVITY_TASK):
+            raise ValueError(
+                "kind should be either {} or {}, "
+                "got {} instead.".format(SWF_DECISION_TASK, SWF_ACTIVITY_TASK, kind)
+            )
+
+        super(SwfPoller, self).__init__(pool)
+
+        self.kind = kind
+        self.identity = identity
+        self.dispatch_size = dispatch_size
+        self.targets = [
+            (region_name, domain, task_list)
+            for region_name, domains in task_lists.iteritems()
+            for domain, names in domains.iteritems()
+            for task_list in names
+        ]
+
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(concurrency)
+
+        self._stats = dict((target, PollStats()) for target in self.targets)
+        self._waiting = deque()
+
+    @property
+    def capacity(self):
+        return self.dispatch_size
+
+    def stats(self):
+        """Polls statistics
+
+        :returns: (region, domain, task list) to statistics mapping
+        :rtype: dict
+        """
+        return dict(self._stats)
+
+    def _start(self):
+        """Starts polling every task lists"""
+        for target in self.targets:
+            self._schedule(target)
+
+    def _schedule(self, target):
+        """Submits a target poll if a dispatch queue slot can be
+        reserved, puts it aside until one is released otherwise"""
+        with self._condition:
+            if not self._running:
+                return
+            if not self._reserve(1, wait=False):
+                self._waiting.append(target)
+                return
+
+        self._executor.submit(self._poll, target)
+
+    def _released(self):
+        """Schedules a waiting target poll, if any, once a dispatch
+        queue slot was released"""
+        with self._condition:
+            target = self._waiting.popleft() if self._waiting else None
+
+        if target is not None:
+            self._schedule(target)
+
+    def _request(self, client, domain, task_list):
+        """Issues a poll, fetching every events pages of decision tasks
+
+        :returns: the polled task, None if the poll was empty
+        :rtype: dict
+        """
+        if self.kind == SWF_ACTIVITY_TASK:
+            task = client.poll_for_activity_task(
+                domain, task_list, identity=self.identity
+            )
+        else:
+            task = client.poll_for_decision_task(
+                domain, task_list, identity=self.identity
+            )
+            while task.get('taskToken') and task.get('nextPageToken'):
+                page = client.poll_for_decision_task(
+                    domain, task_list, identity=self.identity,
+                    next_page_token=task.pop('nextPageToken')
+                )
+                task['events'].extend(page.get('events', []))
+                if page.get('nextPageToken'):
+                    task['nextPageToken'] = page['nextPageToken']
+
+        if not task or not task.get('taskToken'):
+            return None
+        return task
+
+    def _poll(self, target):
+        region_name, domain, task_list = target
+        stats = self._stats[target]
+        task = None
+
+        start = time.time()
+        try:
+            task = self._request(self._pool.region(region_name), domain, task_list)
+        except Exception:
+            logger.exception("Polling %s %s/%s failed", region_name, domain, task_list)
+            with self._condition:
+                stats.errors += 1
+            self._stopped.wait(SWF_POLL_ERROR_DELAY)
+        else:
+            stats.latencies.add(time.time() - start)
+            with self._condition:
+                stats.polls += 1
+                if task is None:
+                    stats.empty += 1
+        finally:
+            polled = []
+            if task is not None:
+                polled.append(
+                    PolledTask(region_name, domain, task_list, self.kind, task)
+                )
+            self._dispatch(1, polled)
+
+        if task is None:
+            self._released()
+        self._schedule(target)
+
+    def close(self):
+        """Stops polling, waiting for the in-flight polls to complete
+
+        Tasks polled and not handled yet are dropped: SWF will time
+        them out and schedule them again.
+        """
+        with self._condition:
+            self._waiting.clear()
+            self._stop()
+
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+        with self._condition:
+            dropped = len(self._buffer)
+            self._buffer.clear()
+
+        if dropped:
+            logger.warning("%d polled tasks were dropped on close", dropped)
@@ -1,13 +1,37 @@
+import sys
+import time
+import logging
+import weakref
+import functools
+import threading
+
 from abc import ABCMeta
 from multiprocessing import cpu_count
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from boto import ec2
 
 from mangrove.declarative import ServiceDeclaration, ServicePoolDeclaration
-from mangrove.mappings import ConnectionsMapping
+from mangrove.executors import AdaptiveThreadPoolExecutor
+from mangrove.breakers import CircuitBreaker
+from mangrove.budget import ConnectionBudget
+from mangrove.mappings import ConnectionsMapping, RegionClientsMapping
+from mangrove.sharding import HashRing
+from mangrove.stats import LatencyWindow
 from mangrove.utils import get_boto_module
+from mangrove import profiling
+from mangrove.constants import (
+    BREAKER_OPEN,
+    HEDGE_DEFAULT_DELAY,
+    HEDGE_DEFAULT_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_WORKERS_PER_CPU,
+    HASH_RING_REPLICAS,
+    PHASE_CONNECTION,
+    PHASE_REQUEST,
+    PHASE_BACKOFF
+)
 from mangrove.exceptions import (
     MissingMethodError,
     DoesNotExistError,
@@ -15,6 +39,9 @@ from mangrove.exceptions import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 class ServicePool(object):
     """Aws service connection pool wrapper
 
@@ -47,6 +74,30 @@ class ServicePool(object):
                                    AWS_SECRET_ACCESS_KEY will be fetched from
                                    environment)
     :type   aws_secret_access_key: string
+
+    :param  breaker_options: keyword arguments to build each region
+                             connection CircuitBreaker with. Circuit
+                             breakers are disabled if None.
+    :type   breaker_options: dict
+
+    :param  budget: connection budget bounding the pool live connections,
+                    possibly shared with other pools
+    :type   budget: mangrove.budget.ConnectionBudget
+
+    :param  retry_policy: policy to retry failed calls with, as a RetryPolicy
+                          or its parameters dict. As a default the service
+                          declaration one is used, if any.
+    :type   retry_policy: mangrove.retry.RetryPolicy or dict
+
+    :param  account: account to connect to. Its credentials take precedence
+                     over aws_access_key_id and aws_secret_access_key, and
+                     its connections are shared through its connection cache.
+    :type   account: mangrove.accounts.Account
+
+    :param  executor: executor to run the pool concurrent work on, possibly
+                      shared with other pools. As a default an
+                      AdaptiveThreadPoolExecutor is created.
+    :type   executor: concurrent.futures.Executor
     """
     __meta__ = ABCMeta
 
@@ -59,14 +110,34 @@ class ServicePool(object):
     service = None
 
     def __init__(self, connect=False, regions=None, default_region=None,
-                 aws_access_key_id=None, aws_secret_access_key=None):
+                 aws_access_key_id=None, aws_secret_access_key=None,
+                 breaker_options=None, budget=None, retry_policy=None,
+                 account=None, executor=None):
         self._service_declaration = ServiceDeclaration(self.service)
         self._service_declaration.regions = regions
         self._service_declaration.default_region = default_region
+        if retry_policy is not None:
+            self._service_declaration.retry = retry_policy
         self.module = self._service_declaration.module
 
-        self._executor = ThreadPoolExecutor(max_workers=cpu_count())
+        self._executor = executor or AdaptiveThreadPoolExecutor()
+        self._hedge_executor = None
+        self._account = account
         self._connections = ConnectionsMapping()
+        self._clients = RegionClientsMapping(self)
+        self._latencies = {}
+        self._breakers = {}
+        self._breaker_options = breaker_options
+        # Hash rings notified of added regions, held weakly for
+        # discarded rings to be freed
+        self._region_listeners = weakref.WeakSet()
+        self._budget = budget
+        self._evicted = set()
+        self._credentials = {}
+        self._cassette = None
+        self._profiler = None
+        self._instrumented = weakref.WeakSet()
+        self._lock = threading.Lock()
 
         # _default_region private property setting should
         # always be called after the _regions_names is set
@@ -92,18 +163,40 @@ class ServicePool(object):
                                     environment)
         :type   aws_secret_access_key: string
         """
+        # Credentials are kept to transparently reconnect
+        # regions evicted by the connection budget
+        self._credentials = {
+            'aws_access_key_id': aws_access_key_id,
+            'aws_secret_access_key': aws_secret_access_key,
+        }
+
         # For performances reasons, every regions connections are
         # made concurrently through the concurent.futures library.
-        for region in self._service_declaration.regions:
+        regions = sorted(
+            self._service_declaration.regions,
+            key=lambda r: r != self._default_region
+        )
+        for region in regions:
+            # Regions exceeding the connection budget will be
+            # connected on first access.
+            if self._budget is not None and not self._budget.has_room():
+                self._evicted.add(region)
+                continue
+
             self._connections[region] = self._executor.submit(
                 self._connect_module_to_region,
                 region,
                 aws_access_key_id=aws_access_key_id,
                 aws_secret_access_key=aws_secret_access_key
             )
+            if self._budget is not None:
+                self._budget.touch(self, region)
 
         if self._default_region is not None:
-            self._connections.default = self._service_declaration.default_region
+            if self._default_region in self._connections:
+                self._connections.default = self._service_declaration.default_region
+            else:
+                self._connections._default_name = self._default_region
 
     def _connect_module_to_region(self, region, aws_access_key_id=None,
                                   aws_secret_access_key=None):
@@ -123,23 +216,217 @@ class ServicePool(object):
                                     environment)
         :type   aws_secret_access_key: string
         """
-        return self.module.connect_to_region(region)
+        # boto retries server and network errors on its own, up to
+        # num_retries times: on top of the pool retry policy, each
+        # attempt would multiply into as many requests.
+        num_retries = 0 if self.retry_policy is not None else None
+
+        if self._account is not None:
+            return self._account.connect(
+                self.module,
+                self._service_declaration.service_name,
+                region,
+                num_retries=num_retries
+            )
+
+        credentials = {
+            'aws_access_key_id': aws_access_key_id,
+            'aws_secret_access_key': aws_secret_access_key,
+        }
+        connection = self.module.connect_to_region(
+            region,
+            **dict((k, v) for k, v in credentials.items() if v is not None)
+        )
+        if connection is not None and num_retries is not None:
+            connection.num_retries = num_retries
+
+        return connection
 
     @property
     def regions(self):
-        return self._connections
+        return self._clients
 
     def region(self, region_name):
         """Access a pools specific region connections 
         :param  region_name: region connection to be accessed
         :type   region_name: string
         """
-        if not region_name in self._connections:
+        self._ensure_connected(region_name)
+        return self._clients[region_name]
+
+    def _connection(self, region_name):
+        """Access a pools specific region boto connection
+
+        :param  region_name: region connection to be accessed
+        :type   region_name: string
+        """
+        self._ensure_connected(region_name)
+
+        # Only evicted connections, made again, need the lock. The
+        # connection could also be evicted while being looked up:
+        # it is then missing until marked evicted, under the lock.
+        while True:
+            if region_name in self._evicted:
+                with self._lock:
+                    if region_name in self._evicted:
+                        self._connections[region_name] = self._connect_module_to_region(
+                            region_name, **self._credentials
+                        )
+                        self._evicted.discard(region_name)
+
+            if region_name in self._connections:
+                connection = dict.get(self._connections, region_name)
+                break
+
+            with self._lock:
+                if region_name not in self._evicted and region_name not in self._connections:
+                    raise NotConnectedError(
+                        "No active connexion found for {} region, "
+                        "please use .connect() method to proceed.".format(region_name)
+                    )
+
+        if self._budget is not None:
+            self._budget.touch(self, region_name)
+
+        if isinstance(connection, Future):
+            connection = connection.result()
+
+        # boto returns None when asked to connect to an unknown region
+        if connection is None:
+            raise NotConnectedError(
+                "No connexion could be made to {} region".format(region_name)
+            )
+
+        # Assumed role connections expire along with their temporary
+        # credentials: they are looked up in the account cache on
+        # every access, which hands new ones once those are renewed.
+        if self._account is not None and self._account.role_arn is not None:
+            renewed = self._connect_module_to_region(region_name)
+            if renewed is not connection:
+                with self._lock:
+                    if region_name in self._connections:
+                        self._connections[region_name] = renewed
+                connection = renewed
+
+        return connection
+
+    def _ensure_connected(self, region_name):
+        """Raises a NotConnectedError if the pool has no connection
+        to region_name"""
+        if not self._is_connected(region_name):
             raise NotConnectedError(
                 "No active connexion found for {} region, "
                 "please use .connect() method to proceed.".format(region_name)
             )
-        return self._connections[region_name]
+
+    def _is_connected(self, region_name):
+        """Tells whether the pool is connected to a region, evicted
+        connections being made again on access"""
+        if self._replaying():
+            return region_name in self._service_declaration.regions
+        return region_name in self._connections or region_name in self._evicted
+
+    def _connected_regions(self):
+        if self._replaying():
+            return list(self._service_declaration.regions)
+        return list(self._connections) + sorted(self._evicted)
+
+    def _replaying(self):
+        return self._cassette is not None and self._cassette.replaying
+
+    def use_cassette(self, cassette):
+        """Records the pool calls to, or replays them out of, a cassette
+
+        While replaying, the pool does not need to be connected: its
+        declared regions calls are served by the cassette.
+
+        :param  cassette: cassette to use, None to stop using one
+        :type   cassette: mangrove.cassette.Cassette
+        """
+        self._cassette = cassette
+
+    def profile(self, profiler):
+        """Profiles the pool calls, breaking them into phases
+
+        Connections instrumented while profiling get their original
+        make_request method back once profiling stops.
+
+        :param  profiler: profiler to record the calls to, None to
+                          stop profiling
+        :type   profiler: mangrove.profiling.CallProfiler
+        """
+        with self._lock:
+            self._profiler = profiler
+            if profiler is None:
+                for connection in list(self._instrumented):
+                    profiling.uninstrument(connection)
+                self._instrumented.clear()
+
+    def _instrument(self, connection):
+        """Instruments a connection HTTP requests, as long as the
+        pool is profiling its calls"""
+        if profiling.instrumented(connection):
+            return
+
+        with self._lock:
+            if self._profiler is not None:
+                profiling.instrument(connection)
+                self._instrumented.add(connection)
+
+    def _evict(self, region_name):
+        """Drops a region connection, it will be made again on
+        next access
+
+        :param  region_name: name of the region to evict
+        :type   region_name: string
+        """
+        with self._lock:
+            if region_name not in self._connections:
+                return
+
+            connection = dict.pop(self._connections, region_name)
+            self._evicted.add(region_name)
+
+        # Accounts connections are shared through their cache,
+        # they should not be closed.
+        if self._account is not None:
+            return
+
+        if isinstance(connection, Future):
+            if connection.cancel() or connection.exception() is not None:
+                return
+            connection = connection.result()
+
+        close = getattr(connection, 'close', None)
+        if close is not None:
+            close()
+
+    def footprint(self):
+        """Reports the pool connections footprint
+
+        approximate_size is the shallow size, in bytes, of the
+        resolved connections objects and attributes.
+
+        :rtype: dict
+        """
+        pending, size = 0, 0
+        for region_name in list(self._connections):
+            connection = dict.get(self._connections, region_name)
+            if isinstance(connection, Future):
+                if not connection.done() or connection.exception() is not None:
+                    pending += 1
+                    continue
+                connection = connection.result()
+
+            size += sys.getsizeof(connection)
+            size += sys.getsizeof(getattr(connection, '__dict__', {}))
+
+        return {
+            'connections': len(self._connections),
+            'pending': pending,
+            'evicted': len(self._evicted),
+            'approximate_size': size,
+        }
 
     def add_region(self, region_name):
         """Connect the pool to a new region
@@ -147,10 +434,412 @@ class ServicePool(object):
         :param  region_name: Name of the region to connect to
         :type   region_name: string
         """
-        region_client = self._connect_module_to_region(region_name)
+        region_client = self._connect_module_to_region(
+            region_name, **self._credentials
+        )
         self._connections[region_name] = region_client
         self._service_declaration.regions.append(region_name)
 
+        if self._budget is not None:
+            self._budget.touch(self, region_name)
+
+        for listener in list(self._region_listeners):
+            listener.region_added(region_name)
+
+    def hash_ring(self, weights=None, replicas=HASH_RING_REPLICAS):
+        """Builds a consistent hash ring over the pool connected
+        regions, to shard keys across them
+
+        :param  weights: region name to weight mapping, regions not
+                         part of it get a weight of 1.
+        :type   weights: dict
+
+        :param  replicas: virtual nodes per weight unit
+        :type   replicas: int
+        """
+        return HashRing(self, weights=weights, replicas=replicas)
+
+    @property
+    def breakers(self):
+        """Region name to CircuitBreaker mapping, empty if circuit
+        breakers are disabled"""
+        return self._breakers
+
+    def _breaker(self, region_name):
+        """Gets, or lazily creates, a region circuit breaker
+
+        Returns None if circuit breakers are disabled.
+        """
+        if self._breaker_options is None:
+            return None
+
+        if region_name not in self._breakers:
+            self._breakers.setdefault(
+                region_name,
+                CircuitBreaker(**self._breaker_options)
+            )
+
+        return self._breakers[region_name]
+
+    def _is_open(self, region_name):
+        breaker = self._breaker(region_name)
+        return breaker is not None and breaker.state == BREAKER_OPEN
+
+    @property
+    def retry_policy(self):
+        return self._service_declaration.retry
+
+    @property
+    def latencies(self):
+        """Region name to LatencyWindow mapping of the successful
+        calls made through the pool"""
+        return self._latencies
+
+    def _call(self, region_name, method_name, args=None, kwargs=None,
+              submitted=None, resolving=None, retry_policy=None):
+        """Calls a method over a region connection, retrying it
+        according to the pool retry policy, and profiling it if the
+        pool has a profiler
+
+        :param  region_name: region connection to call the method over
+        :type   region_name: string
+
+        :param  method_name: name of the connection method to call
+        :type   method_name: string
+
+        :param  args: positional arguments to call the method with
+        :type   args: tuple
+
+        :param  kwargs: keyword arguments to call the method with
+        :type   kwargs: dict
+
+        :param  submitted: time the call was submitted to an executor at
+        :type   submitted: float
+
+        :param  resolving: seconds the region client spent resolving
+                           the connection before the call
+        :type   resolving: float
+
+        :param  retry_policy: policy to retry the call with, instead
+                              of the pool one
+        :type   retry_policy: mangrove.retry.RetryPolicy
+        """
+        profiler = self._profiler
+        if profiler is None:
+            return self._retry(region_name, method_name, args, kwargs, retry_policy)
+
+        with profiler.profile(self._service_declaration.service_name, region_name,
+                              method_name, args, kwargs, submitted=submitted,
+                              resolving=resolving):
+            return self._retry(region_name, method_name, args, kwargs, retry_policy)
+
+    def _retry(self, region_name, method_name, args=None, kwargs=None,
+               retry_policy=None):
+        """Calls a method over a region connection, retrying it
+        according to retry_policy, the pool one as a default"""
+        policy = retry_policy or self.retry_policy
+        if policy is None:
+            return self._attempt(region_name, method_name, args, kwargs)
+
+        policy = policy.for_method(method_name)
+        policy.budget.deposit()
+
+        attempt = 1
+        while True:
+            try:
+                return self._attempt(region_name, method_name, args, kwargs)
+            except Exception as e:
+                if not policy.should_retry(e, attempt):
+                    raise
+
+            delay = policy.delay(attempt)
+            profile = profiling.current()
+            if profile is not None:
+                profile.add(PHASE_BACKOFF, delay)
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _attempt(self, region_name, method_name, args=None, kwargs=None):
+        """Calls a method over a region connection once, and records
+        its latency
+
+        If the region circuit breaker is open, the call fails fast
+        with a CircuitOpenError. If the pool uses a cassette, the call
+        is either recorded to it or replayed out of it.
+
+        :param  region_name: region connection to call the method over
+        :type   region_name: string
+
+        :param  method_name: name of the connection method to call
+        :type   method_name: string
+
+        :param  args: positional arguments to call the method with
+        :type   args: tuple
+
+        :param  kwargs: keyword arguments to call the method with
+        :type   kwargs: dict
+        """
+        cassette = self._cassette
+        service_name = self._service_declaration.service_name
+        call = (service_name, region_name, method_name, args, kwargs)
+        profile = profiling.current()
+
+        # Open regions fail fast, before their connection is resolved:
+        # it could still be being made, or have to be made again.
+        self._ensure_connected(region_name)
+        breaker = self._breaker(region_name)
+        if breaker is not None:
+            breaker.before_call()
+
+        if cassette is not None and cassette.replaying:
+            method = functools.partial(cassette.play, *call)
+        else:
+            start = time.time()
+            try:
+                connection = self._connection(region_name)
+                method = functools.partial(
+                    getattr(connection, method_name),
+                    *(args or ()),
+                    **(kwargs or {})
+                )
+            except Exception as e:
+                if breaker is not None:
+                    if breaker.is_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.release()
+                raise
+
+            if profile is not None:
+                profile.add(PHASE_CONNECTION, time.time() - start)
+                self._instrument(connection)
+
+        requested = profile.phases[PHASE_REQUEST] if profile is not None else 0.0
+
+        start = time.time()
+        try:
+            result = method()
+        except Exception as e:
+            latency = time.time() - start
+            if profile is not None:
+                profile.attempted(latency, requested)
+            if breaker is not None:
+                breaker.record_error(e)
+            if cassette is not None and not cassette.replaying:
+                self._record(cassette, call, latency=latency, error=e)
+            raise
+        latency = time.time() - start
+
+        if profile is not None:
+            profile.attempted(latency, requested)
+        if breaker is not None:
+            breaker.record_success(latency)
+        if cassette is not None and not cassette.replaying:
+            self._record(cassette, call, latency=latency, result=result)
+
+        if region_name not in self._latencies:
+            self._latencies.setdefault(region_name, LatencyWindow())
+        self._latencies[region_name].add(latency)
+
+        return result
+
+    def _record(self, cassette, call, **outcome):
+        """Records a call to a cassette. Recording failures are
+        logged and counted as misses, but never change the call
+        outcome."""
+        try:
+            cassette.record(*call, **outcome)
+        except Exception:
+            logger.exception("Recording %s %s %s call failed", *call[:3])
+            cassette.count_miss()
+
+    def fan_out(self, method_name, args=None, kwargs=None, regions=None):
+        """Concurrently calls a method over multiple regions connections
+
+        Regions which circuit breaker is open are skipped, and
+        won't be part of the returned mapping.
+
+        :param  method_name: name of the region connection method to call
+        :type   method_name: string
+
+        :param  args: positional arguments to call the method with
+        :type   args: tuple
+
+        :param  kwargs: keyword arguments to call the method with
+        :type   kwargs: dict
+
+        :param  regions: regions to call the method over, as a
+                         default every connected regions are used.
+        :type   regions: list of strings
+
+        :returns: region name to call result Future mapping
+        :rtype: dict
+        """
+        if regions is None:
+            regions = self._connected_regions()
+
+        futures = {}
+        for region_name in regions:
+            self._ensure_connected(region_name)
+            if self._is_open(region_name):
+                continue
+
+            futures[region_name] = self._executor.submit(
+                self._call, region_name, method_name, args, kwargs,
+                submitted=time.time()
+            )
+
+        return futures
+
+    def _hedge_delay(self, region_name, percentile=HEDGE_DEFAULT_PERCENTILE):
+        """Computes how long to wait for a region to answer before
+        hedging the request to another one
+
+        Until enough samples were observed for the region,
+        HEDGE_DEFAULT_DELAY is returned.
+        """
+        window = self._latencies.get(region_name)
+        if window is None or len(window) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+
+        return window.percentile(percentile)
+
+    def _hedge_secondary(self, primary):
+        """Selects the connected region, other than primary, with
+        the lowest observed median latency"""
+        candidates = [
+            r for r in self._connected_regions()
+            if r != primary and not self._is_open(r)
+        ]
+        if not candidates:
+            raise NotConnectedError(
+                "No secondary region connexion found to hedge "
+                "{} region requests to.".format(primary)
+            )
+
+        def median(region_name):
+            window = self._latencies.get(region_name)
+            value = window.percentile(50) if window is not None else None
+            return value if value is not None else float('inf')
+
+        return min(candidates, key=median)
+
+    def hedge(self, method_name, args=None, kwargs=None, primary=None,
+              secondary=None, delay=None, percentile=HEDGE_DEFAULT_PERCENTILE):
+        """Hedges a read call across two regions
+
+        The call is first sent to the primary region. If it did not
+        succeed within delay, the very same call is sent to the secondary
+        region and whichever answers first is returned. The slower call
+        is cancelled if it did not start yet, and its result discarded
+        otherwise.
+
+        Only idempotent calls, typically reads over replicated data
+        (cross-region replicated buckets, global tables...),
+        should be hedged.
+
+        :param  method_name: name of the region connection method to call
+        :type   method_name: string
+
+        :param  args: positional arguments to call the method with
+        :type   args: tuple
+
+        :param  kwargs: keyword arguments to call the method with
+        :type   kwargs: dict
+
+        :param  primary: region to send the call to first, the pool
+                         default region is used if not provided
+        :type   primary: string
+
+        :param  secondary: region to hedge the call to, the connected
+                           region with the lowest median latency is
+                           used if not provided
+        :type   secondary: string
+
+        :param  delay: seconds to wait for the primary region before
+                       hedging. If not provided, it is computed from
+                       the primary region observed latencies.
+        :type   delay: float
+
+        :param  percentile: primary region latency percentile to be
+                            used as delay when none is provided
+        :type   percentile: int
+        """
+        primary = primary or self._default_region
+        if primary is None:
+            raise ValueError(
+                "No primary region supplied, and no default region "
+                "set for the pool."
+            )
+
+        if secondary is None:
+            secondary = self._hedge_secondary(primary)
+
+        for region_name in (primary, secondary):
+            self._ensure_connected(region_name)
+
+        if delay is None:
+            delay = self._hedge_delay(primary, percentile)
+
+        # Hedged calls get their own executor: queueing the secondary
+        # call behind the slow primary one would defeat the purpose.
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=cpu_count() * HEDGE_WORKERS_PER_CPU
+                )
+
+        primary_future = self._hedge_executor.submit(
+            self._call, primary, method_name, args, kwargs,
+            submitted=time.time()
+        )
+        done, _ = wait([primary_future], timeout=delay)
+        if done and primary_future.exception() is None:
+            return primary_future.result()
+
+        # Primary region is either too slow or failed: send
+        # the call to the secondary one and return the first
+        # successful answer.
+        secondary_future = self._hedge_executor.submit(
+            self._call, secondary, method_name, args, kwargs,
+            submitted=time.time()
+        )
+
+        pending = set([primary_future, secondary_future])
+        failed = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                failed = future
+
+        # Both regions failed, propagate the latest error
+        return failed.result()
+
+# Generated ServicePool subclasses by service name, so adding a
+# service to a mixin pool does not create a new class every time.
+_service_pool_classes = {}
+
+
+def _get_service_pool_class(service_name):
+    """Gets, or generates, the ServicePool subclass bound to
+    a service
+
+    :param  service_name: name of the AWS service
+    :type   service_name: string
+    """
+    if service_name not in _service_pool_classes:
+        service_pool_kls = type(service_name.capitalize(), (ServicePool,), {})
+        service_pool_kls.service = service_name
+        _service_pool_classes.setdefault(service_name, service_pool_kls)
+
+    return _service_pool_classes[service_name]
+
+
 class ServiceMixinPool(object):
     """Multiple AWS services connection pool wrapper class
 
@@ -195,6 +884,26 @@ class ServiceMixinPool(object):
                                    AWS_SECRET_ACCESS_KEY will be fetched from
                                    environment)
     :type   aws_secret_access_key: string
+
+    :param  breaker_options: keyword arguments to build every services
+                             region connections CircuitBreaker with.
+                             Circuit breakers are disabled if None.
+    :type   breaker_options: dict
+
+    :param  max_connections: maximum number of live region connections
+                             across every services, least recently used
+                             ones being evicted, and transparently made
+                             again on next access. Unbounded if None.
+    :type   max_connections: int
+
+    :param  idle_timeout: seconds after which an unused region connection
+                          is evicted, never if None.
+    :type   idle_timeout: float
+
+    :param  executor: executor every services pools run their concurrent
+                      work on. As a default an AdaptiveThreadPoolExecutor
+                      is created.
+    :type   executor: concurrent.futures.Executor
     """
     __meta__ = ABCMeta
 
@@ -205,13 +914,25 @@ class ServiceMixinPool(object):
     # or the '*' wildcard (['*'])
     # * default_region parameter should be an aws region part of
     # the provided regions parameters 
+    # * optional retry parameter should be a mangrove.retry.RetryPolicy
+    # parameters dict, its 'methods' key allowing per method overrides
     services = {}
 
     def __init__(self, connect=False,
-                 aws_access_key_id=None, aws_secret_access_key=None):
-        self._executor = ThreadPoolExecutor(max_workers=cpu_count())
+                 aws_access_key_id=None, aws_secret_access_key=None,
+                 breaker_options=None, max_connections=None, idle_timeout=None,
+                 executor=None):
+        self._executor = executor or AdaptiveThreadPoolExecutor()
         self._services_declaration = ServicePoolDeclaration(self.services)
         self._services_store = {}
+        self._breaker_options = breaker_options
+        self._budget = None
+
+        if max_connections is not None or idle_timeout is not None:
+            self._budget = ConnectionBudget(
+                max_connections=max_connections,
+                idle_timeout=idle_timeout
+            )
 
         self._load_services(connect)
 
@@ -241,7 +962,8 @@ class ServiceMixinPool(object):
                 regions=localisation.regions,
                 default_region=localisation.default_region,
                 aws_access_key_id=aws_access_key_id,
-                aws_secret_access_key=aws_secret_access_key
+                aws_secret_access_key=aws_secret_access_key,
+                retry_policy=localisation.retry
             )
 
     def connect(self):
@@ -249,9 +971,52 @@ class ServiceMixinPool(object):
         for name, pool in self._services_store.iteritems():
             pool.connect()
 
+    def use_cassette(self, cassette):
+        """Records every services calls to, or replays them out of,
+        a cassette
+
+        :param  cassette: cassette to use, None to stop using one
+        :type   cassette: mangrove.cassette.Cassette
+        """
+        for name, pool in self._services_store.iteritems():
+            pool.use_cassette(cassette)
+
+    def profile(self, profiler):
+        """Profiles every services calls
+
+        :param  profiler: profiler to record the calls to, None to
+                          stop profiling
+        :type   profiler: mangrove.profiling.CallProfiler
+        """
+        for name, pool in self._services_store.iteritems():
+            pool.profile(profiler)
+
+    def footprint(self):
+        """Reports the mixin pool connections footprint, overall
+        and by service
+
+        :rtype: dict
+        """
+        services = dict(
+            (name, pool.footprint())
+            for name, pool in self._services_store.iteritems()
+        )
+
+        report = {
+            'services': services,
+            'max_connections': getattr(self._budget, 'max_connections', None),
+            'evictions': getattr(self._budget, 'evictions', 0),
+            'pool_classes': len(_service_pool_classes),
+        }
+        for key in ('connections', 'pending', 'evicted', 'approximate_size'):
+            report[key] = sum(s[key] for s in services.itervalues())
+
+        return report
+
     def add_service(self, service_name, connect=False,
                     regions=None, default_region=None,
-                    aws_access_key_id=None, aws_secret_access_key=None):
+                    aws_access_key_id=None, aws_secret_access_key=None,
+                    breaker_options=None, retry_policy=None):
         """Adds a service connection to the services pool
 
         :param  service_name: name of the AWS service to add
@@ -269,16 +1034,30 @@ class ServiceMixinPool(object):
                                     AWS_SECRET_ACCESS_KEY will be fetched from
                                     environment)
         :type   aws_secret_access_key: string
+
+        :param  breaker_options: keyword arguments to build the service
+                                 region connections CircuitBreaker with,
+                                 the mixin pool ones are used if None.
+        :type   breaker_options: dict
+
+        :param  retry_policy: policy to retry the service failed calls with
+        :type   retry_policy: mangrove.retry.RetryPolicy or dict
         """
-        service_pool_kls = type(service_name.capitalize(), (ServicePool,), {})
-        service_pool_kls.service = service_name
+        if breaker_options is None:
+            breaker_options = self._breaker_options
+
+        service_pool_kls = _get_service_pool_class(service_name)
 
         service_pool_instance = service_pool_kls(
             connect=False,
             regions=regions,
             default_region=default_region,
             aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key
+            aws_secret_access_key=aws_secret_access_key,
+            breaker_options=breaker_options,
+            budget=self._budget,
+            retry_policy=retry_policy,
+            executor=self._executor
         )
 
         setattr(self, service_name, service_pool_instance)
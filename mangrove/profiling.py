@@ -0,0 +1,310 @@
+import json
+import time
+import heapq
+import itertools
+import threading
+
+from mangrove.constants import (
+    PROFILER_SLOWEST_SIZE,
+    PHASE_QUEUE,
+    PHASE_CONNECTION,
+    PHASE_REQUEST,
+    PHASE_PARSING,
+    PHASES
+)
+
+
+# Profile of the call being made by the current thread, if any
+_local = threading.local()
+
+
+def current():
+    """Profile of the call the current thread is making
+
+    :rtype: CallProfile or None
+    """
+    return getattr(_local, 'profile', None)
+
+
+def redact(value):
+    """Redacts a call argument, only keeping its type and size
+
+    :param  value: argument to redact
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, dict):
+        return dict((key, redact(item)) for key, item in value.iteritems())
+    if isinstance(value, basestring):
+        return '<{} len={}>'.format(type(value).__name__, len(value))
+    return '<{}>'.format(type(value).__name__)
+
+
+def instrumented(connection):
+    """Tells whether a connection HTTP requests are timed"""
+    make_request = getattr(connection, 'make_request', None)
+    return getattr(make_request, '_profiled', False)
+
+
+def instrument(connection):
+    """Times a boto connection HTTP requests, on behalf of the profile
+    of the call making them
+
+    Connections without a make_request method are left untouched,
+    connections already instrumented too.
+
+    :param  connection: connection to instrument
+    :type   connection: boto.connection.AWSAuthConnection
+    """
+    make_request = getattr(connection, 'make_request', None)
+    if make_request is None or instrumented(connection):
+        return
+
+    def profiled_make_request(*args, **kwargs):
+        profile = current()
+        start = time.time()
+        try:
+            return make_request(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.add(PHASE_REQUEST, time.time() - start)
+
+    # The connection own make_request attribute, if any, is restored
+    # when uninstrumenting it, the class method otherwise.
+    profiled_make_request._profiled = True
+    profiled_make_request._original = getattr(connection, '__dict__', {}).get('make_request')
+    connection.make_request = profiled_make_request
+
+
+def uninstrument(connection):
+    """Stops timing a connection HTTP requests
+
+    :param  connection: connection to restore
+    :type   connection: boto.connection.AWSAuthConnection
+    """
+    if not instrumented(connection):
+        return
+
+    original = connection.make_request._original
+    if original is None:
+        del connection.make_request
+    else:
+        connection.make_request = original
+
+
+class CallProfile(object):
+    """Breakdown of a region client method call duration
+
+    Phases are the seconds spent waiting for an executor worker
+    (queue), resolving the region connection (connection), in the
+    HTTP requests (request), reading and parsing their responses
+    (parsing), and waiting before retries (backoff).
+
+    :param  service: name of the called service
+    :type   service: string
+
+    :param  region: name of the called region
+    :type   region: string
+
+    :param  method: name of the called method
+    :type   method: string
+
+    :param  args: redacted positional arguments
+    :type   args: list
+
+    :param  kwargs: redacted keyword arguments
+    :type   kwargs: dict
+    """
+    __slots__ = (
+        'service',
+        'region',
+        'method',
+        'args',
+        'kwargs',
+        'started',
+        'duration',
+        'attempts',
+        'error',
+        'phases',
+    )
+
+    def __init__(self, service, region, method, args=None, kwargs=None):
+        self.service = service
+        self.region = region
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.started = time.time()
+        self.duration = None
+        self.attempts = 0
+        self.error = None
+        self.phases = dict((phase, 0.0) for phase in PHASES)
+
+    def __repr__(self):
+        return '<CallProfile {} {}.{} {:.3f}s>'.format(
+            self.region, self.service, self.method, self.duration or 0
+        )
+
+    def add(self, phase, seconds):
+        """Adds seconds to a phase"""
+        self.phases[phase] += seconds
+
+    def attempted(self, seconds, requested):
+        """Splits an attempt method duration into request and parsing
+
+        :param  seconds: duration of the attempt method call
+        :type   seconds: float
+
+        :param  requested: request phase duration before the attempt
+        :type   requested: float
+        """
+        self.attempts += 1
+        request = self.phases[PHASE_REQUEST] - requested
+
+        # No HTTP request was timed: the connection is not
+        # instrumented, or the call was replayed.
+        if not request:
+            self.add(PHASE_REQUEST, seconds)
+        else:
+            self.add(PHASE_PARSING, max(seconds - request, 0.0))
+
+    def as_dict(self):
+        return dict((attr, getattr(self, attr)) for attr in self.__slots__)
+
+
+class _Profiling(object):
+    """Context manager making a call profile the current thread one"""
+    def __init__(self, profiler, profile):
+        self.profiler = profiler
+        self.profile = profile
+
+    def __enter__(self):
+        self.previous = current()
+        _local.profile = self.profile
+        return self.profile
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.profile = self.previous
+        if exc_type is not None:
+            # Exceptions messages may quote the request content: only
+            # their type, and AWS error code, are kept.
+            error_code = getattr(exc_value, 'error_code', None)
+            if error_code is not None:
+                self.profile.error = '{}: {}'.format(exc_type.__name__, error_code)
+            else:
+                self.profile.error = exc_type.__name__
+        self.profiler.record(self.profile)
+
+
+class CallProfiler(object):
+    """Profiles region clients calls, keeping the slowest ones
+
+    Opt-in: pools only profile their calls once handed a profiler
+    through ``pool.profile(profiler)``. Calls arguments are redacted
+    before being kept, so that dumps can be safely shared.
+
+    ::code-block: python
+        profiler = CallProfiler(size=50)
+        pool.profile(profiler)
+        ...
+        profiler.dump(open('/tmp/slow-calls.json', 'w'))
+
+    :param  size: number of slowest calls to keep
+    :type   size: int
+
+    :param  redact: callable redacting a call argument
+    :type   redact: callable
+    """
+    def __init__(self, size=PROFILER_SLOWEST_SIZE, redact=redact):
+        self.size = size
+        self.redact = redact
+
+        self.calls = 0
+        self.totals = dict((phase, 0.0) for phase in PHASES)
+        self._slowest = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def profile(self, service, region, method, args=None, kwargs=None,
+                submitted=None, resolving=None):
+        """Profiles a call, within the returned context
+
+        :param  submitted: time the call was submitted to an
+                           executor at, if it was
+        :type   submitted: float
+
+        :param  resolving: seconds spent resolving the region
+                           connection before the call
+        :type   resolving: float
+
+        :rtype: context manager
+        """
+        profile = CallProfile(
+            service,
+            region,
+            method,
+            args=[self.redact(arg) for arg in args or ()],
+            kwargs=dict((k, self.redact(v)) for k, v in (kwargs or {}).iteritems())
+        )
+        if resolving:
+            profile.add(PHASE_CONNECTION, resolving)
+            profile.started -= resolving
+        if submitted is not None:
+            profile.add(PHASE_QUEUE, max(profile.started - submitted, 0.0))
+            profile.started = submitted
+
+        return _Profiling(self, profile)
+
+    def record(self, profile):
+        """Records a completed call profile"""
+        profile.duration = time.time() - profile.started
+
+        with self._lock:
+            self.calls += 1
+            for phase, seconds in profile.phases.iteritems():
+                self.totals[phase] += seconds
+
+            entry = (profile.duration, next(self._sequence), profile)
+            if len(self._slowest) < self.size:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        """Slowest calls profiles, slowest first
+
+        :rtype: list of CallProfile
+        """
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [profile for _, _, profile in entries]
+
+    def reset(self):
+        """Forgets every recorded calls"""
+        with self._lock:
+            self.calls = 0
+            self.totals = dict((phase, 0.0) for phase in PHASES)
+            self._slowest = []
+
+    def dump(self, stream=None):
+        """Dumps the calls count, phases totals, and slowest calls
+
+        :param  stream: file-like object to write the dump to,
+                        as JSON, if provided
+        :type   stream: file
+
+        :rtype: dict
+        """
+        with self._lock:
+            calls, totals = self.calls, dict(self.totals)
+
+        report = {
+            'calls': calls,
+            'phases': totals,
+            'slowest': [profile.as_dict() for profile in self.slowest()],
+        }
+        if stream is not None:
+            json.dump(report, stream, indent=2, sort_keys=True, default=repr)
+        return report
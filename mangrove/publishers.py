@@ -0,0 +1,257 @@
+import time
+import threading
+
+from collections import deque
+
+from concurrent.futures import Future
+
+from boto.exception import BotoServerError
+
+from mangrove.retry import RetryPolicy
+from mangrove.constants import SNS_MAX_BATCH_SIZE
+
+
+class _Delivery(object):
+    __slots__ = ('id', 'message', 'subject', 'message_attributes', 'future', 'attempt')
+
+    def __init__(self, id, message, subject=None, message_attributes=None):
+        self.id = id
+        self.message = message
+        self.subject = subject
+        self.message_attributes = message_attributes
+        self.future = Future()
+        self.attempt = 1
+
+    def entry(self):
+        """Builds the delivery publish batch request entry"""
+        entry = {'Id': self.id, 'Message': self.message}
+        if self.subject is not None:
+            entry['Subject'] = self.subject
+        if self.message_attributes is not None:
+            entry['MessageAttributes'] = self.message_attributes
+        return entry
+
+
+class SnsPublisher(object):
+    """Publishes messages to topics spread across regions
+
+    Every (region, topic) delivery of a message is published
+    concurrently with the others, on the pool's executor, so that
+    publishing to several regions takes as long as the slowest
+    of them rather than their sum.
+
+    Region connections exposing a ``publish_batch`` method get their
+    deliveries batched: while a batch is being published to a topic,
+    deliveries to that topic accumulate, and are published together
+    once it completes, up to batch_size of them per call. Other
+    connections get one publish call per delivery.
+
+    Calls are made through the pool, and thus benefit from its circuit
+    breakers. Failed calls, and batch entries which failed on the
+    server side, are retried according to the publisher retry policy,
+    the pool one unless provided. SimpleNotificationPool instances
+    have a default RetryPolicy, their connections boto retries being
+    disabled so that both do not multiply.
+
+    ::code-block: python
+        publisher = pool.publisher()
+        futures = publisher.publish('hello', [
+            ('us-east-1', 'arn:aws:sns:us-east-1:123456789012:events'),
+            ('eu-west-1', 'arn:aws:sns:eu-west-1:123456789012:events'),
+        ])
+        message_ids = dict((t, f.result()) for t, f in futures.iteritems())
+
+    :param  pool: pool to publish the messages through
+    :type   pool: mangrove.services.SimpleNotificationPool
+
+    :param  batch_size: maximum number of deliveries per batch publish
+                        call, up to 10
+    :type   batch_size: int
+
+    :param  retry_policy: policy to retry failed deliveries with, as a
+                          RetryPolicy or its parameters dict
+    :type   retry_policy: mangrove.retry.RetryPolicy or dict
+    """
+    def __init__(self, pool, batch_size=SNS_MAX_BATCH_SIZE, retry_policy=None):
+        if not 1 <= batch_size <= SNS_MAX_BATCH_SIZE:
+            raise ValueError(
+                "batch_size should be between 1 and {}, "
+                "got {} instead.".format(SNS_MAX_BATCH_SIZE, batch_size)
+            )
+
+        self._pool = pool
+        self.batch_size = batch_size
+        self._retry_policy = RetryPolicy.load(retry_policy)
+
+        self._pending = {}
+        self._draining = set()
+        self._batching = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    @property
+    def retry_policy(self):
+        return self._retry_policy or self._pool.retry_policy
+
+    def _supports_batch(self, region_name):
+        """Tells whether a region connection can publish in batches.
+        Replaying pools have no connection to inspect, and open regions
+        calls should fail fast rather than wait for theirs: neither do.
+        """
+        if self._pool._replaying() or self._pool._is_open(region_name):
+            return False
+
+        if region_name not in self._batching:
+            connection = self._pool.region(region_name).connection
+            self._batching[region_name] = callable(
+                getattr(connection, 'publish_batch', None)
+            )
+        return self._batching[region_name]
+
+    def publish(self, message, targets, subject=None, message_attributes=None):
+        """Publishes a message to topics across regions
+
+        :param  message: message to publish
+        :type   message: string
+
+        :param  targets: (region name, topic arn) pairs to publish to
+        :type   targets: iterable of tuples
+
+        :param  subject: message subject
+        :type   subject: string
+
+        :param  message_attributes: message attributes, in the boto
+                                    publish call format
+        :type   message_attributes: dict
+
+        :returns: (region name, topic arn) to delivery future mapping,
+                  futures results being the published messages ids
+        :rtype: dict
+        """
+        futures = {}
+        for target in targets:
+            if target in futures:
+                continue
+
+            region_name, topic = target
+            self._pool._ensure_connected(region_name)
+
+            with self._lock:
+                self._counter += 1
+                delivery = _Delivery(
+                    str(self._counter), message, subject, message_attributes
+                )
+            futures[target] = delivery.future
+            self._enqueue(target, delivery)
+
+        return futures
+
+    def _publish_one(self, target, delivery):
+        region_name, topic = target
+        if not delivery.future.set_running_or_notify_cancel():
+            return
+
+        try:
+            response = self._pool._call(region_name, 'publish', kwargs={
+                'topic': topic,
+                'message': delivery.message,
+                'subject': delivery.subject,
+                'message_attributes': delivery.message_attributes,
+            }, retry_policy=self.retry_policy)
+            message_id = response['PublishResponse']['PublishResult']['MessageId']
+        except Exception as e:
+            delivery.future.set_exception(e)
+        else:
+            delivery.future.set_result(message_id)
+
+    def _enqueue(self, target, delivery, retry=False):
+        """Queues a delivery to a topic, draining the topic queue
+        unless it is already being drained"""
+        with self._lock:
+            pending = self._pending.setdefault(target, deque())
+            if retry:
+                pending.appendleft(delivery)
+            else:
+                pending.append(delivery)
+
+            if target in self._draining:
+                return
+            self._draining.add(target)
+
+        self._pool._executor.submit(self._drain, target)
+
+    def _drain(self, target):
+        # Batch support is only resolved here, on the executor, so
+        # that publishing never waits for regions connections.
+        batching = self._supports_batch(target[0])
+
+        while True:
+            with self._lock:
+                pending = self._pending.get(target)
+                if not pending:
+                    self._pending.pop(target, None)
+                    self._draining.discard(target)
+                    return
+                size = self.batch_size if batching else len(pending)
+                batch = [pending.popleft() for _ in xrange(min(size, len(pending)))]
+
+            if not batching:
+                for delivery in batch:
+                    self._pool._executor.submit(self._publish_one, target, delivery)
+                continue
+
+            # Retried deliveries futures are already running, and
+            # cancelled ones are not published
+            batch = [
+                delivery for delivery in batch
+                if delivery.attempt > 1 or delivery.future.set_running_or_notify_cancel()
+            ]
+            if batch:
+                self._publish_batch(target, batch)
+
+    def _publish_batch(self, target, batch):
+        region_name, topic = target
+        policy = self.retry_policy
+
+        try:
+            response = self._pool._call(
+                region_name, 'publish_batch',
+                args=(topic, [delivery.entry() for delivery in batch]),
+                retry_policy=policy
+            )
+        except Exception as e:
+            for delivery in batch:
+                delivery.future.set_exception(e)
+            return
+
+        result = response['PublishBatchResponse']['PublishBatchResult']
+        deliveries = dict((delivery.id, delivery) for delivery in batch)
+
+        for entry in result.get('Successful', []):
+            deliveries.pop(entry['Id']).future.set_result(entry['MessageId'])
+
+        if policy is not None:
+            policy = policy.for_method('publish_batch')
+
+        retries = []
+        for entry in result.get('Failed', []):
+            delivery = deliveries.pop(entry['Id'])
+            error = BotoServerError(400 if entry.get('SenderFault') else 500,
+                                    entry.get('Message'))
+            error.error_code = entry.get('Code')
+
+            if policy is not None and policy.should_retry(error, delivery.attempt):
+                retries.append(delivery)
+            else:
+                delivery.future.set_exception(error)
+
+        for delivery in deliveries.itervalues():
+            delivery.future.set_exception(BotoServerError(
+                500, "Delivery {} missing from the batch response".format(delivery.id)
+            ))
+
+        if retries:
+            time.sleep(policy.delay(max(d.attempt for d in retries)))
+            for delivery in reversed(retries):
+                delivery.attempt += 1
+                self._enqueue(target, delivery, retry=True)
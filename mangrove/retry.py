@@ -0,0 +1,217 @@
+import time
+import random
+import socket
+import httplib
+import threading
+
+from boto.exception import BotoServerError
+
+from mangrove.constants import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_MIN_PER_SECOND,
+    RETRY_BUDGET_CAPACITY,
+    THROTTLING_ERROR_CODES
+)
+
+
+def is_retryable(error):
+    """Tells whether a call which raised error is worth retrying
+
+    Throttling errors, server side errors and network errors are
+    retryable, client side errors are not.
+
+    :param  error: exception raised by the call
+    :type   error: Exception
+    """
+    if isinstance(error, BotoServerError):
+        if error.error_code in THROTTLING_ERROR_CODES:
+            return True
+        return error.status is not None and error.status >= 500
+
+    return isinstance(error, (socket.error, httplib.HTTPException))
+
+
+class RetryBudget(object):
+    """Bounds retries to a ratio of the original calls
+
+    Every original call earns ratio retry tokens, and every retry
+    spends one. Whatever the traffic, min_per_second tokens are earned
+    every second so low traffic callers can still retry, and at most
+    capacity tokens are stored. Retries can thus never multiply the
+    load beyond (1 + ratio) times the original traffic, give or take
+    these few tokens.
+
+    :param  ratio: retry tokens earned per original call
+    :type   ratio: float
+
+    :param  min_per_second: retry tokens earned per second
+    :type   min_per_second: float
+
+    :param  capacity: maximum number of stored retry tokens
+    :type   capacity: float
+    """
+    def __init__(self, ratio=RETRY_BUDGET_RATIO,
+                 min_per_second=RETRY_BUDGET_MIN_PER_SECOND,
+                 capacity=RETRY_BUDGET_CAPACITY):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+
+        self._tokens = float(capacity)
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self):
+        now = time.time()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated_at) * self.min_per_second
+        )
+        self._updated_at = now
+
+    def deposit(self):
+        """Earns tokens for an original call"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Spends a token for a retry
+
+        :returns: whether the retry is allowed
+        :rtype: bool
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+# Process-wide retry budget shared by every policies which
+# were not given their own.
+default_retry_budget = RetryBudget()
+
+
+class RetryPolicy(object):
+    """Retry policy for calls made over region connections
+
+    Retryable errors are retried up to max_attempts calls overall,
+    waiting a random delay between 0 and base_delay * 2 ^ attempt
+    seconds (bounded by max_delay) before each retry, as long as the
+    retry budget allows it.
+
+    Methods specific policies can be declared through the methods
+    parameter, as a method name to RetryPolicy or overridden
+    parameters dict mapping.
+
+    Pools having a policy disable boto's own retries on their
+    connections, so that each attempt is a single request. A
+    num_retries set in the boto config takes precedence though.
+
+    :param  max_attempts: maximum number of calls, retries included
+    :type   max_attempts: int
+
+    :param  base_delay: backoff base delay, in seconds
+    :type   base_delay: float
+
+    :param  max_delay: backoff maximum delay, in seconds
+    :type   max_delay: float
+
+    :param  is_retryable: callable telling whether an exception
+                          raised by a call is worth retrying
+    :type   is_retryable: callable
+
+    :param  budget: retry budget to be spent by retries, the
+                    process-wide one as a default
+    :type   budget: RetryBudget
+
+    :param  methods: method name to policy mapping
+    :type   methods: dict
+    """
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+                 is_retryable=is_retryable, budget=None, methods=None):
+        if max_attempts < 1:
+            raise ValueError(
+                "max_attempts should be a positive integer, "
+                "got {} instead.".format(max_attempts)
+            )
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.is_retryable = is_retryable
+        self.budget = budget if budget is not None else default_retry_budget
+
+        self.methods = {}
+        for method_name, policy in (methods or {}).iteritems():
+            if not isinstance(policy, RetryPolicy):
+                policy = self.override(**policy)
+            self.methods[method_name] = policy
+
+    @classmethod
+    def load(cls, policy):
+        """Builds a policy from a RetryPolicy or parameters dict
+
+        :param  policy: policy or policy parameters
+        :type   policy: RetryPolicy or dict
+        """
+        if policy is None or isinstance(policy, RetryPolicy):
+            return policy
+        if isinstance(policy, dict):
+            return cls(**policy)
+
+        raise TypeError(
+            "Unhandled retry policy type. Expected RetryPolicy or dict, "
+            "{} found".format(type(policy))
+        )
+
+    def override(self, **kwargs):
+        """Builds a copy of the policy with some parameters overridden"""
+        params = {
+            'max_attempts': self.max_attempts,
+            'base_delay': self.base_delay,
+            'max_delay': self.max_delay,
+            'is_retryable': self.is_retryable,
+            'budget': self.budget,
+        }
+        params.update(kwargs)
+        return RetryPolicy(**params)
+
+    def for_method(self, method_name):
+        """Access the policy to be applied to a method calls"""
+        return self.methods.get(method_name, self)
+
+    def delay(self, attempt):
+        """Computes the jittered delay to wait before a retry
+
+        :param  attempt: number of calls already made
+        :type   attempt: int
+        """
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt)
+        )
+
+    def should_retry(self, error, attempt):
+        """Tells whether a failed call should be retried, spending
+        a retry budget token if so
+
+        :param  error: exception raised by the call
+        :type   error: Exception
+
+        :param  attempt: number of calls already made
+        :type   attempt: int
+        """
+        return (attempt < self.max_attempts and
+                self.is_retryable(error) and
+                self.budget.withdraw())
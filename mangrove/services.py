@@ -1,13 +1,48 @@
 from mangrove.pool import ServicePool
+from mangrove.retry import RetryPolicy
+from mangrove.inventory import Ec2Inventory
+from mangrove.consumers import SqsConsumer
+from mangrove.listing import S3Lister
+from mangrove.pollers import SwfPoller
+from mangrove.publishers import SnsPublisher
 
 
 class Ec2Pool(ServicePool):
     service = 'ec2'
 
+    def inventory(self, regions=None, filters=None):
+        """Builds an incremental instances inventory over the pool
+
+        :param  regions: regions to inventory, as a default every
+                         pool connected regions.
+        :type   regions: list of strings
+
+        :param  filters: filters to list instances with
+        :type   filters: dict
+        """
+        return Ec2Inventory(self, regions=regions, filters=filters)
+
 
 class S3Pool(ServicePool):
     service = 's3'
 
+    def list_keys(self, bucket_name, region=None, **options):
+        """Lists a bucket keys concurrently, partitioning its keyspace
+        by common prefixes and key ranges
+
+        :param  bucket_name: name of the bucket to list
+        :type   bucket_name: string
+
+        :param  region: region connection to use, the pool default
+                        region one as a default
+        :type   region: string
+
+        Other keyword arguments are handed to S3Lister.
+
+        :rtype: mangrove.listing.S3Lister
+        """
+        return S3Lister(self, bucket_name, region=region, **options)
+
 
 class EmrPool(ServicePool):
     service = 'emr'
@@ -68,14 +103,73 @@ class ElasticTranscoderPool(ServicePool):
 class SwfPool(ServicePool):
     service = 'swf'
 
+    def poll(self, task_lists, **options):
+        """Starts long-polling task lists across regions and domains
+
+        :param  task_lists: region name to domain name to task lists
+                            names mapping
+        :type   task_lists: dict
+
+        Other keyword arguments are handed to SwfPoller.
+
+        :rtype: mangrove.pollers.SwfPoller
+        """
+        return SwfPoller(self, task_lists, **options).start()
+
 
 class SqsPool(ServicePool):
     service = 'sqs'
 
+    def consume(self, queues, **options):
+        """Starts consuming messages out of queues across regions
+
+        :param  queues: region name to queues names mapping
+        :type   queues: dict
+
+        Other keyword arguments are handed to SqsConsumer.
+
+        :rtype: mangrove.consumers.SqsConsumer
+        """
+        return SqsConsumer(self, queues, **options).start()
+
 
 class SimpleNotificationPool(ServicePool):
     service = 'sns'
 
+    def __init__(self, *args, **kwargs):
+        # Deliveries are retried by default, through the pool rather
+        # than boto: its connections retries are then disabled.
+        if kwargs.get('retry_policy') is None:
+            kwargs['retry_policy'] = RetryPolicy()
+        super(SimpleNotificationPool, self).__init__(*args, **kwargs)
+        self._publisher = SnsPublisher(self)
+
+    def publisher(self, **options):
+        """Builds a publisher of messages to topics across regions
+
+        Keyword arguments are handed to SnsPublisher.
+
+        :rtype: mangrove.publishers.SnsPublisher
+        """
+        return SnsPublisher(self, **options)
+
+    def publish(self, message, targets, **kwargs):
+        """Publishes a message to topics across regions concurrently,
+        through the pool's default publisher
+
+        :param  message: message to publish
+        :type   message: string
+
+        :param  targets: (region name, topic arn) pairs to publish to
+        :type   targets: iterable of tuples
+
+        Other keyword arguments are handed to SnsPublisher.publish.
+
+        :returns: (region name, topic arn) to delivery future mapping
+        :rtype: dict
+        """
+        return self._publisher.publish(message, targets, **kwargs)
+
 
 class SimpleEmailPool(ServicePool):
     service = 'ses'
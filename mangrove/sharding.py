@@ -0,0 +1,146 @@
+import struct
+import hashlib
+import threading
+
+from bisect import bisect_right
+
+from mangrove.constants import HASH_RING_REPLICAS
+
+
+def hash_key(key):
+    """Hashes a key to a 64 bits integer position on the ring
+
+    :param  key: key to hash
+    :type   key: string
+    """
+    if isinstance(key, unicode):
+        key = key.encode('utf-8')
+
+    return struct.unpack('>Q', hashlib.md5(key).digest()[:8])[0]
+
+
+class HashRing(object):
+    """Consistent hash ring mapping keys to a pool's regions
+
+    Every region is placed replicas * weight times (virtual nodes)
+    on the ring, and a key is owned by the first virtual node
+    found clockwise from its hash. Looking a key up is thus
+    O(log n), and adding a region only moves the keys the new
+    region virtual nodes now own.
+
+    The ring keeps track of the regions added to the pool
+    through its add_region method, for as long as it is used: the
+    pool only holds a weak reference to it.
+
+    :param  pool: pool which connected regions the ring is built over
+    :type   pool: mangrove.pool.ServicePool
+
+    :param  weights: region name to weight mapping, regions not part
+                     of it get a weight of 1.
+    :type   weights: dict
+
+    :param  replicas: virtual nodes per weight unit
+    :type   replicas: int
+    """
+    def __init__(self, pool, weights=None, replicas=HASH_RING_REPLICAS):
+        self._pool = pool
+        self.weights = dict(weights or {})
+        self.replicas = replicas
+
+        self._points = []
+        self._owners = []
+        self._lock = threading.Lock()
+
+        for region_name in pool.regions:
+            self._add_node(region_name)
+
+        pool._region_listeners.add(self)
+
+    def __len__(self):
+        return len(self._nodes())
+
+    def __contains__(self, region_name):
+        return region_name in self._nodes()
+
+    def _nodes(self):
+        return set(self._owners)
+
+    def _add_node(self, region_name):
+        """Places a region virtual nodes on the ring"""
+        weight = self.weights.setdefault(region_name, 1)
+        vnodes = int(self.replicas * weight)
+        points = [
+            (hash_key('{}-{}'.format(region_name, i)), region_name)
+            for i in xrange(vnodes)
+        ]
+
+        with self._lock:
+            ring = [
+                node for node in zip(self._points, self._owners)
+                if node[1] != region_name
+            ]
+            ring = sorted(ring + points)
+            self._points = [point for point, _ in ring]
+            self._owners = [owner for _, owner in ring]
+
+    def region_added(self, region_name):
+        """Places a region newly connected by the pool on the ring"""
+        self._add_node(region_name)
+
+    def add_region(self, region_name, weight=None):
+        """Adds a region to the ring, connecting the pool to it
+        if needed
+
+        :param  region_name: name of the region to add
+        :type   region_name: string
+
+        :param  weight: region weight, 1 as a default
+        :type   weight: int or float
+        """
+        if weight is not None:
+            self.weights[region_name] = weight
+
+        if region_name not in self._pool.regions:
+            # The pool notifies the ring once connected
+            self._pool.add_region(region_name)
+        else:
+            self._add_node(region_name)
+
+    def remove_region(self, region_name):
+        """Removes a region from the ring. The pool connection
+        to it is left untouched.
+
+        :param  region_name: name of the region to remove
+        :type   region_name: string
+        """
+        with self._lock:
+            ring = [
+                node for node in zip(self._points, self._owners)
+                if node[1] != region_name
+            ]
+            self._points = [point for point, _ in ring]
+            self._owners = [owner for _, owner in ring]
+        self.weights.pop(region_name, None)
+
+    def region_name(self, key):
+        """Finds the name of the region owning a key
+
+        :param  key: key to look up
+        :type   key: string
+        """
+        with self._lock:
+            points, owners = self._points, self._owners
+
+        if not points:
+            raise LookupError("Hash ring holds no region")
+
+        index = bisect_right(points, hash_key(key)) % len(points)
+        return owners[index]
+
+    def region(self, key):
+        """Access the region client owning a key
+
+        :param  key: key to look up
+        :type   key: string
+        """
+        return self._pool.region(self.region_name(key))
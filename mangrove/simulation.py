@@ -0,0 +1,281 @@
+import math
+import time
+import random
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from boto.exception import BotoServerError
+
+from mangrove.stats import LatencyWindow
+
+
+def constant(value):
+    """Latency distribution always returning value seconds"""
+    return lambda rng: value
+
+
+def uniform(low, high):
+    """Latency distribution uniformly spread between low and high seconds"""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median, sigma=0.5):
+    """Long tailed latency distribution, as observed on remote regions
+
+    :param  median: median latency, in seconds
+    :type   median: float
+
+    :param  sigma: shape of the distribution tail, the higher
+                   the longer
+    :type   sigma: float
+    """
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+class SimulatedConnection(object):
+    """Wraps a region connection (typically moto-backed) to simulate
+    a remote region behavior
+
+    Every method call is delayed according to the latency distribution,
+    fails with a server error according to error_rate, and is throttled
+    if it exceeds max_rate calls per second.
+
+    :param  connection: wrapped region connection
+    :type   connection: boto.connection.AWSAuthConnection
+
+    :param  latency: latency distribution, as returned by constant,
+                     uniform or lognormal. No latency is added if None.
+    :type   latency: callable
+
+    :param  error_rate: probability, between 0 and 1, of a call to
+                        fail with a 503 error
+    :type   error_rate: float
+
+    :param  max_rate: calls per second beyond which calls are throttled,
+                      unbounded if None
+    :type   max_rate: float
+
+    :param  seed: seed of the simulation random generator
+    :type   seed: int
+    """
+    def __init__(self, connection, latency=None, error_rate=0, max_rate=None,
+                 seed=None):
+        self._connection = connection
+        self._latency = latency
+        self._error_rate = error_rate
+        self._max_rate = max_rate
+        self._random = random.Random(seed)
+
+        self._tokens = max_rate
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self._connection, name)
+        if not callable(attribute):
+            return attribute
+
+        def method(*args, **kwargs):
+            self._simulate()
+            return attribute(*args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    def _throttle(self):
+        if self._max_rate is None:
+            return False
+
+        now = time.time()
+        self._tokens = min(
+            self._max_rate,
+            self._tokens + (now - self._updated_at) * self._max_rate
+        )
+        self._updated_at = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    def _simulate(self):
+        with self._lock:
+            self.calls += 1
+            latency = self._latency(self._random) if self._latency else 0
+            throttled = self._throttle()
+            failed = not throttled and self._random.random() < self._error_rate
+            if throttled:
+                self.throttled += 1
+            elif failed:
+                self.errors += 1
+
+        time.sleep(latency)
+
+        if throttled:
+            error = BotoServerError(400, 'Bad Request')
+            error.error_code = 'Throttling'
+            raise error
+        if failed:
+            raise BotoServerError(503, 'Service Unavailable')
+
+
+class RegionSimulator(object):
+    """Simulates regions behaviors over pools connections
+
+    Profiles are SimulatedConnection keyword arguments (latency,
+    error_rate, max_rate), by region name. Regions without profile
+    are left untouched.
+
+    ::code-block: python
+        simulator = RegionSimulator({
+            'us-east-1': {'latency': lognormal(0.02)},
+            'ap-southeast-1': {'latency': lognormal(0.25), 'error_rate': 0.01},
+        })
+        simulator.install(pool)
+
+    :param  profiles: region name to simulation profile mapping
+    :type   profiles: dict
+
+    :param  seed: seed of the simulations random generators
+    :type   seed: int
+    """
+    def __init__(self, profiles, seed=None):
+        self.profiles = profiles
+        self.seed = seed
+
+    def _pools(self, pool):
+        # Mixin pools simulation applies to every of their services
+        services = getattr(pool, '_services_store', None)
+        if services is not None:
+            return services.values()
+        return [pool]
+
+    def install(self, pool):
+        """Wraps pool (or mixin pool services) connections into
+        simulated ones
+
+        :param  pool: pool to simulate regions of
+        :type   pool: mangrove.pool.ServicePool or
+                      mangrove.pool.ServiceMixinPool
+        """
+        for service_pool in self._pools(pool):
+            for region_name, profile in self.profiles.iteritems():
+                if region_name not in service_pool._connections:
+                    continue
+                connection = service_pool._connections[region_name]
+                if isinstance(connection, SimulatedConnection):
+                    continue
+                service_pool._connections[region_name] = SimulatedConnection(
+                    connection, seed=self.seed, **profile
+                )
+
+    def uninstall(self, pool):
+        """Restores pool (or mixin pool services) original connections"""
+        for service_pool in self._pools(pool):
+            for region_name in list(service_pool._connections):
+                connection = service_pool._connections[region_name]
+                if isinstance(connection, SimulatedConnection):
+                    service_pool._connections[region_name] = connection._connection
+
+
+class BenchmarkReport(object):
+    """Throughput and latency percentiles of a benchmark run"""
+    def __init__(self, calls, errors, duration, latencies):
+        self.calls = calls
+        self.errors = errors
+        self.duration = duration
+        self.throughput = calls / duration if duration else float('inf')
+        self.p50 = latencies.percentile(50)
+        self.p95 = latencies.percentile(95)
+        self.p99 = latencies.percentile(99)
+        self.max = latencies.percentile(100)
+
+    def __repr__(self):
+        return '<BenchmarkReport {} calls {:.1f}/s p99 {:.3f}s>'.format(
+            self.calls, self.throughput, self.p99 or 0
+        )
+
+    def __str__(self):
+        return (
+            "calls: {} (errors: {}) in {:.3f}s, {:.1f} calls/s\n"
+            "latency p50: {:.3f}s p95: {:.3f}s p99: {:.3f}s max: {:.3f}s"
+        ).format(
+            self.calls, self.errors, self.duration, self.throughput,
+            self.p50 or 0, self.p95 or 0, self.p99 or 0, self.max or 0
+        )
+
+
+def run_benchmark(scenario, calls=100, concurrency=10):
+    """Runs a scenario calls times over concurrency threads
+
+    :param  scenario: callable running one scenario iteration
+    :type   scenario: callable
+
+    :param  calls: number of scenario iterations
+    :type   calls: int
+
+    :param  concurrency: number of concurrent iterations
+    :type   concurrency: int
+
+    :rtype: BenchmarkReport
+    """
+    latencies = LatencyWindow(size=calls)
+    errors = [0]
+    lock = threading.Lock()
+
+    def timed():
+        start = time.time()
+        try:
+            scenario()
+        except Exception:
+            with lock:
+                errors[0] += 1
+        finally:
+            latencies.add(time.time() - start)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    start = time.time()
+    wait([executor.submit(timed) for _ in xrange(calls)])
+    duration = time.time() - start
+    executor.shutdown()
+
+    return BenchmarkReport(calls, errors[0], duration, latencies)
+
+
+def fan_out_scenario(pool, method_name, args=None, kwargs=None, regions=None):
+    """Scenario calling a method over every pool regions at once, and
+    waiting for all of them to answer"""
+    def scenario():
+        futures = pool.fan_out(method_name, args, kwargs, regions=regions)
+        for future in futures.values():
+            future.result()
+    return scenario
+
+
+def hedge_scenario(pool, method_name, args=None, kwargs=None, primary=None,
+                   secondary=None, delay=None):
+    """Scenario hedging a method call across two pool regions"""
+    def scenario():
+        pool.hedge(
+            method_name, args, kwargs, primary=primary,
+            secondary=secondary, delay=delay
+        )
+    return scenario
+
+
+def mixin_scenario(pool, calls):
+    """Scenario sequentially running calls over a mixin pool services
+
+    :param  calls: (service name, region name, method name, args) tuples
+    :type   calls: list of tuples
+    """
+    def scenario():
+        for service_name, region_name, method_name, args in calls:
+            client = getattr(pool, service_name).regions[region_name]
+            getattr(client, method_name)(*(args or ()))
+    return scenario
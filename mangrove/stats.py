@@ -0,0 +1,70 @@
+import threading
+
+from collections import deque
+
+from mangrove.constants import LATENCY_WINDOW_SIZE
+
+
+class LatencyWindow(object):
+    """Thread-safe sliding window of the most recent latency samples
+
+    Samples are expressed in seconds. Only the latest ``size``
+    samples are kept, so percentiles reflect the recent behavior
+    of the observed region rather than its whole history.
+
+    :param  size: maximum number of samples to be kept
+    :type   size: int
+    """
+    def __init__(self, size=LATENCY_WINDOW_SIZE):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, value):
+        """Records a latency sample
+
+        :param  value: observed latency, in seconds
+        :type   value: float
+        """
+        with self._lock:
+            self._samples.append(value)
+
+    def percentile(self, percentile):
+        """Computes the nearest-rank percentile of the window samples
+
+        :param  percentile: percentile to compute, between 0 and 100
+        :type   percentile: int or float
+
+        :returns: the percentile value, or None if no samples were recorded
+        :rtype: float
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError(
+                "percentile should be between 0 and 100, "
+                "got {} instead.".format(percentile)
+            )
+
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if not samples:
+            return None
+
+        rank = int(round(percentile / 100.0 * len(samples))) - 1
+        return samples[max(rank, 0)]
+
+    def mean(self):
+        """Computes the mean of the window samples
+
+        :returns: the mean value, or None if no samples were recorded
+        :rtype: float
+        """
+        with self._lock:
+            samples = list(self._samples)
+
+        if not samples:
+            return None
+
+        return sum(samples) / float(len(samples))
@@ -0,0 +1,15 @@
+def fake_service_pool(pool_class, pool_options=None, **connections):
+    """Builds an unconnected pool_class pool, its regions connections
+    being the supplied ones, keyed by underscored region names
+
+    :param  pool_class: pool class to build
+    :type   pool_class: class
+
+    :param  pool_options: pool init keyword arguments
+    :type   pool_options: dict
+    """
+    regions = [name.replace('_', '-') for name in connections]
+    pool = pool_class(connect=False, regions=regions, **(pool_options or {}))
+    for name, connection in connections.iteritems():
+        pool._connections[name.replace('_', '-')] = connection
+    return pool
@@ -0,0 +1,220 @@
+import time
+import pytest
+
+from moto import mock_s3
+
+from mangrove import accounts
+from mangrove.accounts import Account, AccountPool, ConnectionCache
+from mangrove.services import S3Pool, StsPool
+from mangrove.executors import AdaptiveThreadPoolExecutor
+from mangrove.constants import ASSUMED_ROLE_DURATION, ASSUMED_ROLE_RENEWAL_MARGIN
+
+
+class FakeCredentials(object):
+    def __init__(self, index):
+        self.access_key = 'AKID{}'.format(index)
+        self.secret_key = 'secret'
+        self.session_token = 'token'
+
+
+class FakeAssumedRole(object):
+    def __init__(self, index):
+        self.credentials = FakeCredentials(index)
+
+
+class FakeStsConnection(object):
+    def __init__(self):
+        self.assumed = []
+
+    def assume_role(self, role_arn, role_session_name, duration_seconds=None):
+        self.assumed.append(role_arn)
+        return FakeAssumedRole(len(self.assumed))
+
+
+class FakeConnection(object):
+    def __init__(self, name):
+        self.name = name
+
+    def get_all_buckets(self):
+        return self.name
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+class FakeModule(object):
+    @staticmethod
+    def connect_to_region(region_name, **credentials):
+        return FakeConnection(region_name)
+
+
+def fake_sts_pool():
+    pool = StsPool(connect=False, regions=['us-east-1'], default_region='us-east-1')
+    pool._connections['us-east-1'] = FakeStsConnection()
+    return pool
+
+
+class TestConnectionCache:
+    def test_connections_are_made_once(self):
+        cache, made = ConnectionCache(), []
+        connect = lambda: made.append(1) or object()
+
+        first = cache.get(('a', 's3', 'us-east-1'), connect)
+        second = cache.get(('a', 's3', 'us-east-1'), connect)
+
+        assert first is second
+        assert len(made) == 1
+
+    def test_expired_connections_are_made_again(self):
+        cache = ConnectionCache()
+        key = ('a', 's3', 'us-east-1')
+
+        first = cache.get(key, object, expires_at=time.time() - 1)
+        second = cache.get(key, object)
+
+        assert first is not second
+
+    def test_failed_connections_are_not_cached(self):
+        cache = ConnectionCache()
+
+        def failing():
+            raise IOError()
+
+        with pytest.raises(IOError):
+            cache.get(('a', 's3', 'us-east-1'), failing)
+        assert len(cache) == 0
+
+    def test_invalidate_account(self):
+        cache = ConnectionCache()
+        cache.get(('a', 's3', 'us-east-1'), object)
+        cache.get(('b', 's3', 'us-east-1'), object)
+        cache.invalidate('a')
+
+        assert ('a', 's3', 'us-east-1') not in cache
+        assert ('b', 's3', 'us-east-1') in cache
+
+
+class TestAccount:
+    def test_static_credentials(self):
+        account = Account('a', aws_access_key_id='AKID', aws_secret_access_key='secret')
+
+        assert account.credentials() == ({
+            'aws_access_key_id': 'AKID',
+            'aws_secret_access_key': 'secret',
+        }, None)
+
+    def test_role_without_sts_pool_raises(self):
+        with pytest.raises(ValueError):
+            Account('a', role_arn='arn:aws:iam::1234:role/ops')
+
+    def test_assumed_role_credentials_are_cached(self):
+        sts = fake_sts_pool()
+        account = Account('a', role_arn='arn:aws:iam::1234:role/ops', sts_pool=sts)
+
+        credentials, expires_at = account.credentials()
+        account.credentials()
+
+        assert credentials['aws_access_key_id'] == 'AKID1'
+        assert credentials['security_token'] == 'token'
+        assert expires_at > time.time()
+        assert sts._connections['us-east-1'].assumed == ['arn:aws:iam::1234:role/ops']
+
+    def test_expiring_assumed_role_credentials_are_renewed(self):
+        sts = fake_sts_pool()
+        account = Account('a', role_arn='arn:aws:iam::1234:role/ops', sts_pool=sts)
+        account.credentials()
+        account._expires_at = time.time()
+
+        credentials, _ = account.credentials()
+
+        assert credentials['aws_access_key_id'] == 'AKID2'
+
+    @mock_s3
+    def test_accounts_pools_share_connections(self):
+        account = Account('a', cache=ConnectionCache())
+        first = S3Pool(connect=True, regions=['us-east-1'], account=account)
+        second = S3Pool(connect=True, regions=['us-east-1'], account=account)
+
+        assert first._connection('us-east-1') is second._connection('us-east-1')
+
+    @mock_s3
+    def test_retrying_pools_do_not_disable_other_pools_boto_retries(self):
+        account = Account('a', cache=ConnectionCache())
+        plain = S3Pool(connect=True, regions=['us-east-1'], account=account)
+        retrying = S3Pool(connect=True, regions=['us-east-1'], account=account,
+                          retry_policy={'max_attempts': 3})
+
+        assert plain._connection('us-east-1') is not retrying._connection('us-east-1')
+        assert retrying._connection('us-east-1').num_retries == 0
+        assert plain._connection('us-east-1').num_retries > 0
+
+    @mock_s3
+    def test_distinct_accounts_do_not_share_connections(self):
+        cache = ConnectionCache()
+        first = S3Pool(connect=True, regions=['us-east-1'],
+                       account=Account('a', cache=cache))
+        second = S3Pool(connect=True, regions=['us-east-1'],
+                        account=Account('b', cache=cache))
+
+        assert first._connection('us-east-1') is not second._connection('us-east-1')
+        assert len(cache) == 2
+
+    def test_cached_connections_expire_before_their_credentials(self):
+        cache = ConnectionCache()
+        account = Account('a', role_arn='arn:aws:iam::1234:role/ops',
+                          sts_pool=fake_sts_pool(), cache=cache)
+
+        account.connect(FakeModule, 's3', 'us-east-1')
+
+        _, expires_at = account.credentials()
+        entry_expires_at = cache._entries[('a', 's3', 'us-east-1')][1]
+        assert entry_expires_at == expires_at - ASSUMED_ROLE_RENEWAL_MARGIN
+
+    @mock_s3
+    def test_pools_connections_are_renewed_along_with_credentials(self, monkeypatch):
+        clock = FakeClock()
+        monkeypatch.setattr(accounts, 'time', clock)
+        account = Account('a', role_arn='arn:aws:iam::1234:role/ops',
+                          sts_pool=fake_sts_pool(), cache=ConnectionCache())
+        pool = S3Pool(connect=True, regions=['us-east-1'], account=account)
+        first = pool._connection('us-east-1')
+
+        clock.now += ASSUMED_ROLE_DURATION - ASSUMED_ROLE_RENEWAL_MARGIN + 1
+        renewed = pool._connection('us-east-1')
+
+        assert first.aws_access_key_id == 'AKID1'
+        assert renewed.aws_access_key_id == 'AKID2'
+        assert pool._connection('us-east-1') is renewed
+        assert dict.get(pool._connections, 'us-east-1') is renewed
+
+
+class TestAccountPool:
+    def test_accounts_pools_share_executor(self):
+        pool = AccountPool(S3Pool, [Account('a'), Account('b')],
+                           regions=['us-east-1'])
+
+        assert list(pool) == ['a', 'b']
+        assert pool['a']._executor is pool['b']._executor
+        assert isinstance(pool['a']._executor, AdaptiveThreadPoolExecutor)
+        assert pool.account('b')._account.name == 'b'
+
+    def test_fan_out_spans_accounts_and_regions(self):
+        pool = AccountPool(S3Pool, [Account('a'), Account('b')],
+                           regions=['us-east-1', 'eu-west-1'])
+        for account_name in pool:
+            for region_name in ('us-east-1', 'eu-west-1'):
+                pool[account_name]._connections[region_name] = FakeConnection(
+                    '{}/{}'.format(account_name, region_name)
+                )
+
+        futures = pool.fan_out('get_all_buckets')
+        assert len(futures) == 4
+        assert futures[('b', 'eu-west-1')].result() == 'b/eu-west-1'
+
+        futures = pool.fan_out('get_all_buckets', accounts=['a'], regions=['us-east-1'])
+        assert futures.keys() == [('a', 'us-east-1')]
@@ -0,0 +1,97 @@
+import time
+import pytest
+
+from boto.exception import BotoServerError
+
+from mangrove.breakers import CircuitBreaker, is_region_failure
+from mangrove.constants import BREAKER_CLOSED, BREAKER_OPEN, BREAKER_HALF_OPEN
+from mangrove.exceptions import CircuitOpenError
+
+
+class TestIsRegionFailure:
+    def test_server_errors_are_failures(self):
+        assert is_region_failure(BotoServerError(503, 'Service Unavailable')) is True
+
+    def test_client_errors_are_not_failures(self):
+        assert is_region_failure(BotoServerError(404, 'Not Found')) is False
+
+    def test_throttling_errors_are_failures(self):
+        error = BotoServerError(400, 'Bad Request')
+        error.error_code = 'Throttling'
+
+        assert is_region_failure(error) is True
+
+    def test_network_errors_are_failures(self):
+        assert is_region_failure(IOError()) is True
+
+
+class TestCircuitBreaker:
+    def test_breaker_opens_after_failure_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        assert breaker.state == BREAKER_CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == BREAKER_OPEN
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_success_resets_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == BREAKER_CLOSED
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1, latency_threshold=0.5)
+        breaker.record_success(latency=1)
+
+        assert breaker.state == BREAKER_OPEN
+
+    def test_breaker_half_opens_after_reset_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        assert breaker.state == BREAKER_HALF_OPEN
+        # Only a single probe call is let through
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+
+    def test_half_open_probe_success_closes_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record_success()
+
+        assert breaker.state == BREAKER_CLOSED
+
+    def test_half_open_probe_failure_opens_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.01)
+        for _ in range(3):
+            breaker.record_failure()
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state == BREAKER_OPEN
+
+    def test_released_probe_lets_another_one_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.release()
+
+        assert breaker.state == BREAKER_HALF_OPEN
+        assert breaker.allow() is True
+
+    def test_record_error_ignores_non_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_error(BotoServerError(404, 'Not Found'))
+
+        assert breaker.state == BREAKER_CLOSED
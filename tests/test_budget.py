@@ -0,0 +1,95 @@
+import gc
+import time
+import weakref
+import pytest
+
+from mangrove.budget import ConnectionBudget
+
+
+class RecordingPool(object):
+    def __init__(self):
+        self.evicted = []
+
+    def _evict(self, region_name):
+        self.evicted.append(region_name)
+
+
+class TestConnectionBudget:
+    def test_invalid_max_connections_raises(self):
+        with pytest.raises(ValueError):
+            ConnectionBudget(max_connections=0)
+
+    def test_unbounded_budget_never_evicts(self):
+        budget, pool = ConnectionBudget(), RecordingPool()
+        for region_name in ('us-east-1', 'eu-west-1', 'us-west-1'):
+            budget.touch(pool, region_name)
+
+        assert len(budget) == 3
+        assert budget.has_room() is True
+        assert pool.evicted == []
+
+    def test_least_recently_used_connection_is_evicted(self):
+        budget, pool = ConnectionBudget(max_connections=2), RecordingPool()
+        budget.touch(pool, 'us-east-1')
+        budget.touch(pool, 'eu-west-1')
+        budget.touch(pool, 'us-east-1')
+        budget.touch(pool, 'us-west-1')
+
+        assert pool.evicted == ['eu-west-1']
+        assert (pool, 'eu-west-1') not in budget
+        assert budget.evictions == 1
+        assert budget.has_room() is False
+
+    def test_budget_is_shared_across_pools(self):
+        budget = ConnectionBudget(max_connections=1)
+        s3, ec2 = RecordingPool(), RecordingPool()
+        budget.touch(s3, 'us-east-1')
+        budget.touch(ec2, 'us-east-1')
+
+        assert s3.evicted == ['us-east-1']
+        assert ec2.evicted == []
+
+    def test_idle_connections_are_evicted(self):
+        budget, pool = ConnectionBudget(idle_timeout=0.01), RecordingPool()
+        budget.close()
+        budget.touch(pool, 'us-east-1')
+        time.sleep(0.02)
+
+        assert budget.evict_idle() == 1
+        assert pool.evicted == ['us-east-1']
+        assert len(budget) == 0
+
+    def test_idle_connections_are_swept_without_further_use(self):
+        budget, pool = ConnectionBudget(idle_timeout=0.05), RecordingPool()
+        budget.touch(pool, 'us-east-1')
+
+        deadline = time.time() + 2
+        while pool.evicted != ['us-east-1'] and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert pool.evicted == ['us-east-1']
+        budget.close()
+
+    def test_closed_budget_stops_sweeping(self):
+        budget, pool = ConnectionBudget(idle_timeout=0.05), RecordingPool()
+        budget.close()
+        budget.touch(pool, 'us-east-1')
+        time.sleep(0.3)
+
+        assert pool.evicted == []
+
+    def test_sweeper_does_not_keep_budget_alive(self):
+        budget = ConnectionBudget(idle_timeout=0.05)
+        reference = weakref.ref(budget)
+        del budget
+        gc.collect()
+
+        assert reference() is None
+
+    def test_discard_stops_tracking_connection(self):
+        budget, pool = ConnectionBudget(max_connections=1), RecordingPool()
+        budget.touch(pool, 'us-east-1')
+        budget.discard(pool, 'us-east-1')
+
+        assert len(budget) == 0
+        assert budget.has_room() is True
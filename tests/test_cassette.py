@@ -0,0 +1,200 @@
+import time
+import pytest
+import threading
+
+from boto.exception import BotoServerError
+from boto.s3.connection import S3Connection
+from boto.sqs.message import Message
+
+from mangrove.pool import ServicePool
+from mangrove.cassette import Cassette, call_key, dumps, loads
+from mangrove.constants import CASSETTE_RECORD
+from mangrove.exceptions import CassetteMissError
+
+
+class DummyS3Pool(ServicePool):
+    service = 's3'
+
+
+class Bucket(object):
+    def __init__(self, name, connection=None):
+        self.name = name
+        self.connection = connection
+
+
+class RecordedConnection(object):
+    def __init__(self, region_name):
+        self.region_name = region_name
+        self.calls = 0
+
+    def get_bucket(self, name, validate=True):
+        self.calls += 1
+        time.sleep(0.02)
+        if name == 'missing':
+            raise BotoServerError(404, 'Not Found')
+        return Bucket('{}/{}'.format(self.region_name, name))
+
+
+def record(path, calls):
+    pool = DummyS3Pool(connect=False, regions=['us-east-1', 'eu-west-1'])
+    for region_name in pool._service_declaration.regions:
+        pool._connections[region_name] = RecordedConnection(region_name)
+
+    with Cassette(path, mode=CASSETTE_RECORD) as cassette:
+        pool.use_cassette(cassette)
+        for region_name, name in calls:
+            try:
+                pool.regions[region_name].get_bucket(name)
+            except BotoServerError:
+                pass
+
+
+def replaying_pool(path, latency_scale=None):
+    pool = DummyS3Pool(connect=False, regions=['us-east-1', 'eu-west-1'])
+    pool.use_cassette(Cassette(path, latency_scale=latency_scale))
+    return pool
+
+
+class TestCassette:
+    def test_call_key_depends_on_every_call_parts(self):
+        key = call_key('s3', 'us-east-1', 'get_bucket', ('a',), {'validate': False})
+
+        assert key == call_key('s3', 'us-east-1', 'get_bucket', ['a'], {'validate': False})
+        assert key != call_key('s3', 'eu-west-1', 'get_bucket', ('a',), {'validate': False})
+        assert key != call_key('s3', 'us-east-1', 'get_bucket', ('a',))
+
+    def test_call_key_identifies_boto_objects_across_processes(self):
+        first, second = Message(), Message()
+        first.receipt_handle = second.receipt_handle = 'handle'
+
+        assert (call_key('sqs', 'us-east-1', 'delete_message_batch', ([first],)) ==
+                call_key('sqs', 'us-east-1', 'delete_message_batch', ([second],)))
+
+    def test_call_key_rejects_unidentified_objects(self):
+        with pytest.raises(TypeError):
+            call_key('sqs', 'us-east-1', 'delete_message', (object(),))
+
+    def test_connections_are_not_pickled(self):
+        bucket = loads(dumps(Bucket('a', connection=S3Connection('x', 'x'))))
+
+        assert bucket.name == 'a'
+        assert bucket.connection is None
+
+    def test_invalid_mode_raises(self, tmpdir):
+        with pytest.raises(ValueError):
+            Cassette(str(tmpdir.join('cassette')), mode='rewind')
+
+    def test_invalid_cassette_file_raises(self, tmpdir):
+        path = tmpdir.join('cassette')
+        path.write('not a cassette file')
+
+        with pytest.raises(ValueError):
+            Cassette(str(path))
+
+    def test_replay_without_network_connection(self, tmpdir):
+        path = str(tmpdir.join('cassette'))
+        record(path, [('us-east-1', 'a'), ('eu-west-1', 'a')])
+
+        pool = replaying_pool(path)
+
+        assert pool._connections.keys() == []
+        assert pool.regions['us-east-1'].get_bucket('a').name == 'us-east-1/a'
+        assert pool.regions['eu-west-1'].get_bucket('a').name == 'eu-west-1/a'
+
+    def test_replay_cycles_over_recordings(self, tmpdir):
+        path = str(tmpdir.join('cassette'))
+        record(path, [('us-east-1', 'a'), ('us-east-1', 'a')])
+
+        cassette = Cassette(path)
+        for _ in range(3):
+            assert cassette.play('s3', 'us-east-1', 'get_bucket', ('a',)).name == 'us-east-1/a'
+        assert len(cassette) == 2
+
+    def test_replay_raises_recorded_errors(self, tmpdir):
+        path = str(tmpdir.join('cassette'))
+        record(path, [('us-east-1', 'missing')])
+
+        pool = replaying_pool(path)
+
+        with pytest.raises(BotoServerError) as e:
+            pool.regions['us-east-1'].get_bucket('missing')
+        assert e.value.status == 404
+
+    def test_replay_of_unrecorded_call_raises(self, tmpdir):
+        path = str(tmpdir.join('cassette'))
+        record(path, [('us-east-1', 'a')])
+
+        pool = replaying_pool(path)
+
+        with pytest.raises(CassetteMissError):
+            pool.regions['us-east-1'].get_bucket('b')
+
+    def test_replay_misses_are_counted(self, tmpdir):
+        path = str(tmpdir.join('cassette'))
+        record(path, [('us-east-1', 'a')])
+
+        cassette = Cassette(path)
+        with pytest.raises(CassetteMissError):
+            cassette.play('s3', 'us-east-1', 'get_bucket', ('b',))
+
+        assert cassette.misses == 1
+
+    def test_unrecordable_results_are_returned_and_counted_as_misses(self, tmpdir):
+        class LockingConnection(RecordedConnection):
+            def get_lock(self):
+                return threading.Lock()
+
+        path = str(tmpdir.join('cassette'))
+        pool = DummyS3Pool(connect=False, regions=['us-east-1'])
+        pool._connections['us-east-1'] = LockingConnection('us-east-1')
+
+        with Cassette(path, mode=CASSETTE_RECORD) as cassette:
+            pool.use_cassette(cassette)
+            lock = pool.regions['us-east-1'].get_lock()
+            pool.regions['us-east-1'].get_bucket('a')
+
+        assert lock.acquire(False)
+        assert cassette.misses == 1
+        assert len(Cassette(path)) == 1
+
+    def test_unrecordable_errors_are_raised_unchanged(self, tmpdir):
+        class LockedError(Exception):
+            def __init__(self):
+                super(LockedError, self).__init__()
+                self.lock = threading.Lock()
+
+        class FailingConnection(RecordedConnection):
+            def get_lock(self):
+                raise LockedError()
+
+        pool = DummyS3Pool(connect=False, regions=['us-east-1'])
+        pool._connections['us-east-1'] = FailingConnection('us-east-1')
+
+        with Cassette(str(tmpdir.join('cassette')), mode=CASSETTE_RECORD) as cassette:
+            pool.use_cassette(cassette)
+            with pytest.raises(LockedError):
+                pool.regions['us-east-1'].get_lock()
+
+        assert cassette.misses == 1
+
+    def test_replay_with_scaled_latency(self, tmpdir):
+        path = str(tmpdir.join('cassette'))
+        record(path, [('us-east-1', 'a')])
+
+        fast = replaying_pool(path)
+        fast.regions['us-east-1'].get_bucket('a')
+        slow = replaying_pool(path, latency_scale=2)
+        slow.regions['us-east-1'].get_bucket('a')
+
+        assert fast.latencies['us-east-1'].mean() < 0.02
+        assert slow.latencies['us-east-1'].mean() >= 0.04
+
+    def test_empty_cassette_replays_nothing(self, tmpdir):
+        path = str(tmpdir.join('cassette'))
+        Cassette(path, mode=CASSETTE_RECORD).close()
+
+        cassette = Cassette(path)
+
+        assert len(cassette) == 0
+        with pytest.raises(CassetteMissError):
+            cassette.play('s3', 'us-east-1', 'get_bucket', ('a',))
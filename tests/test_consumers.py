@@ -0,0 +1,212 @@
+import time
+import threading
+import pytest
+
+from mangrove import consumers
+from mangrove.services import SqsPool
+from mangrove.consumers import SqsConsumer
+from mangrove.constants import SQS_DELETE_ATTEMPTS
+
+from fakes import fake_service_pool
+
+
+class FakeMessage(object):
+    def __init__(self, body, index):
+        self.body = body
+        self.id = 'id-{}'.format(index)
+        self.receipt_handle = 'handle-{}'.format(index)
+
+
+class FakeQueue(object):
+    def __init__(self, name, messages=0, prefix=None):
+        self.name = name
+        prefix = prefix or name
+        self.messages = [FakeMessage('{}-{}'.format(prefix, i), '{}-{}'.format(prefix, i))
+                         for i in range(messages)]
+
+
+class FakeBatchResults(object):
+    def __init__(self, errors):
+        self.results = []
+        self.errors = errors
+
+
+class FakeSqsConnection(object):
+    def __init__(self, *queues, **kwargs):
+        self.queues = dict((q.name, q) for q in queues)
+        self.receive_error = kwargs.get('receive_error')
+        self.delete_failures = kwargs.get('delete_failures', {})
+        self.received = []
+        self.deleted = []
+        self.visibility_changes = []
+        self.lock = threading.Lock()
+
+    def get_queue(self, name):
+        return self.queues.get(name)
+
+    def receive_message(self, queue, number_messages=1, visibility_timeout=None,
+                        wait_time_seconds=None):
+        if self.receive_error is not None:
+            self.received.append(0)
+            raise self.receive_error
+        with self.lock:
+            messages = queue.messages[:number_messages]
+            queue.messages = queue.messages[number_messages:]
+            self.received.append(len(messages))
+        if not messages:
+            time.sleep(0.01)
+        return messages
+
+    def delete_message_batch(self, queue, messages):
+        self.deleted.append([m.body for m in messages])
+
+        errors = []
+        for message in messages:
+            remaining, sender_fault = self.delete_failures.get(message.body, (0, False))
+            if remaining:
+                self.delete_failures[message.body] = (remaining - 1, sender_fault)
+                errors.append({'id': message.id, 'sender_fault': str(sender_fault).lower(),
+                               'error_code': 'Oops', 'error_message': 'Oops'})
+        return FakeBatchResults(errors)
+
+    def change_message_visibility_batch(self, queue, messages):
+        self.visibility_changes.append([(m.body, t) for m, t in messages])
+
+
+class TestSqsConsumer:
+    def test_invalid_batch_size_raises(self):
+        with pytest.raises(ValueError):
+            SqsConsumer(fake_service_pool(SqsPool), {}, batch_size=11)
+
+    def test_missing_queue_raises(self):
+        pool = fake_service_pool(SqsPool, us_east_1=FakeSqsConnection())
+
+        with pytest.raises(ValueError):
+            pool.consume({'us-east-1': ['jobs']})
+
+    def test_messages_are_consumed_across_regions(self):
+        pool = fake_service_pool(SqsPool, 
+            us_east_1=FakeSqsConnection(FakeQueue('jobs', messages=15)),
+            eu_west_1=FakeSqsConnection(FakeQueue('jobs', messages=5, prefix='eu')),
+        )
+
+        bodies = []
+        with SqsConsumer(pool, {'us-east-1': ['jobs'], 'eu-west-1': ['jobs']},
+                         wait_time=0) as consumer:
+            while len(bodies) < 20:
+                bodies.append(consumer.get(timeout=1).body)
+
+        assert len(set(bodies)) == 20
+        # Receive calls are batched
+        assert max(pool._connections['us-east-1'].received) == 10
+
+    def test_prefetch_bounds_buffered_messages(self):
+        connection = FakeSqsConnection(FakeQueue('jobs', messages=50))
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0, prefetch=5,
+                                batch_size=3)
+        time.sleep(0.1)
+
+        assert sum(connection.received) == 5
+        assert consumer.get(timeout=1) is not None
+        consumer.close()
+
+    def test_acknowledgements_are_deleted_in_batches(self):
+        connection = FakeSqsConnection(FakeQueue('jobs', messages=12))
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0,
+                                ack_interval=60)
+        for _ in range(12):
+            consumer.ack(consumer.get(timeout=1))
+
+        assert [len(batch) for batch in connection.deleted] == [10]
+        consumer.close()
+        assert [len(batch) for batch in connection.deleted] == [10, 2]
+
+    def test_in_progress_messages_visibility_is_extended(self):
+        connection = FakeSqsConnection(FakeQueue('jobs', messages=1))
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0,
+                                visibility_timeout=0.1, ack_interval=0.05)
+        message = consumer.get(timeout=1)
+        time.sleep(0.2)
+        consumer.ack(message)
+        consumer.close()
+
+        assert ('jobs-0', 0.1) in sum(connection.visibility_changes, [])
+
+    def test_close_releases_buffered_messages(self):
+        connection = FakeSqsConnection(FakeQueue('jobs', messages=3))
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0,
+                                ack_interval=60)
+        time.sleep(0.05)
+        consumer.close()
+
+        assert sorted(sum(connection.visibility_changes, [])) == [
+            ('jobs-0', 0), ('jobs-1', 0), ('jobs-2', 0)
+        ]
+        assert list(consumer) == []
+
+    def test_failed_receive_waits_for_the_consumer_to_stop(self, monkeypatch):
+        monkeypatch.setattr(consumers, 'SQS_RECEIVE_ERROR_DELAY', 60)
+        connection = FakeSqsConnection(FakeQueue('jobs'), receive_error=IOError())
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0)
+        while not connection.received:
+            time.sleep(0.01)
+        closing = threading.Thread(target=consumer.close)
+        closing.start()
+        closing.join(5)
+
+        assert not closing.is_alive()
+        assert connection.received == [0]
+
+    def test_server_side_delete_failures_are_acknowledged_again(self):
+        connection = FakeSqsConnection(FakeQueue('jobs', messages=2),
+                                       delete_failures={'jobs-0': (1, False)})
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0,
+                                ack_interval=60)
+        for _ in range(2):
+            consumer.ack(consumer.get(timeout=1))
+        consumer.flush()
+        consumer.flush()
+        consumer.close()
+
+        assert connection.deleted == [['jobs-0', 'jobs-1'], ['jobs-0']]
+        assert consumer._delete_attempts == {}
+
+    def test_delete_failures_are_acknowledged_a_bounded_number_of_times(self):
+        connection = FakeSqsConnection(FakeQueue('jobs', messages=1),
+                                       delete_failures={'jobs-0': (10, False)})
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0,
+                                ack_interval=60)
+        consumer.ack(consumer.get(timeout=1))
+        for _ in range(5):
+            consumer.flush()
+        consumer.close()
+
+        assert connection.deleted == [['jobs-0']] * SQS_DELETE_ATTEMPTS
+        assert consumer._delete_attempts == {}
+
+    def test_sender_side_delete_failures_are_not_acknowledged_again(self):
+        connection = FakeSqsConnection(FakeQueue('jobs', messages=1),
+                                       delete_failures={'jobs-0': (1, True)})
+        pool = fake_service_pool(SqsPool, us_east_1=connection)
+
+        consumer = pool.consume({'us-east-1': ['jobs']}, wait_time=0,
+                                ack_interval=60)
+        consumer.ack(consumer.get(timeout=1))
+        consumer.flush()
+        consumer.close()
+
+        assert connection.deleted == [['jobs-0']]
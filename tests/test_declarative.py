@@ -5,6 +5,7 @@ from boto import ec2
 from moto import mock_ec2, mock_s3
 
 from mangrove.declarative import ServiceDeclaration, ServicePoolDeclaration
+from mangrove.retry import RetryPolicy
 from mangrove.constants import WILDCARD_ALL_REGIONS
 from mangrove.exceptions import InvalidServiceError, DoesNotExistError
 
@@ -45,6 +46,28 @@ class TestServiceDeclaration:
         assert sd.regions == ['eu-west-1', 'us-east-1']
         assert sd.default_region == 'eu-west-1'
 
+    def test_from_dict_with_a_retry_policy(self):
+        sd = ServiceDeclaration()
+        sd.from_dict({
+            'ec2': {
+                'regions': ['eu-west-1'],
+                'retry': {
+                    'max_attempts': 5,
+                    'methods': {'run_instances': {'max_attempts': 1}}
+                }
+            }
+        })
+
+        assert isinstance(sd.retry, RetryPolicy) is True
+        assert sd.retry.max_attempts == 5
+        assert sd.retry.for_method('run_instances').max_attempts == 1
+
+    def test_from_dict_without_retry_policy(self):
+        sd = ServiceDeclaration()
+        sd.from_dict({'ec2': {'regions': ['eu-west-1']}})
+
+        assert sd.retry is None
+
     def test_from_dict_with_an_invalid_service_name_raises(self):
         sd = ServiceDeclaration()
 
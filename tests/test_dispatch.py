@@ -0,0 +1,41 @@
+from mangrove.dispatch import BoundedDispatcher
+
+
+class ListDispatcher(BoundedDispatcher):
+    def __init__(self, capacity):
+        super(ListDispatcher, self).__init__(None)
+        self._capacity = capacity
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def _start(self):
+        pass
+
+    def close(self):
+        self._stop()
+
+
+class TestBoundedDispatcher:
+    def test_reservations_are_bounded_by_capacity(self):
+        dispatcher = ListDispatcher(capacity=3).start()
+
+        assert dispatcher._reserve(2) == 2
+        assert dispatcher._reserve(2) == 1
+        assert dispatcher._reserve(1, wait=False) == 0
+
+    def test_dispatched_items_release_their_reservation_once_taken(self):
+        dispatcher = ListDispatcher(capacity=2).start()
+        dispatcher._dispatch(dispatcher._reserve(2), ['a', 'b'])
+
+        assert dispatcher._reserve(1, wait=False) == 0
+        assert dispatcher.get() == 'a'
+        assert dispatcher._reserve(1, wait=False) == 1
+
+    def test_get_returns_none_on_timeout_and_once_closed(self):
+        with ListDispatcher(capacity=1) as dispatcher:
+            assert dispatcher.get(timeout=0.01) is None
+
+        assert dispatcher.running is False
+        assert list(dispatcher) == []
@@ -0,0 +1,194 @@
+import gc
+import os
+import sys
+import time
+import weakref
+import threading
+import subprocess
+import pytest
+
+from mangrove.pool import ServiceMixinPool
+from mangrove.services import Ec2Pool
+from mangrove.executors import AdaptiveThreadPoolExecutor
+from mangrove.constants import EXECUTOR_GROW, EXECUTOR_SHRINK
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestAdaptiveThreadPoolExecutor:
+    def test_invalid_bounds_raise(self):
+        with pytest.raises(ValueError):
+            AdaptiveThreadPoolExecutor(min_workers=4, max_workers=2)
+
+        with pytest.raises(ValueError):
+            AdaptiveThreadPoolExecutor(min_workers=0, max_workers=0)
+
+    def test_results_and_exceptions_are_set_on_futures(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=2)
+
+        def fail():
+            raise KeyError('boom')
+
+        try:
+            assert executor.submit(lambda x: x * 2, 21).result() == 42
+            with pytest.raises(KeyError):
+                executor.submit(fail).result()
+        finally:
+            executor.shutdown()
+
+    def test_workers_are_spawned_lazily(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=2, max_workers=8)
+        assert executor.workers == 0
+
+        executor.submit(lambda: None).result()
+        assert executor.workers == 2
+        executor.shutdown()
+
+    def test_workers_grow_with_queued_work_up_to_max_workers(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=6)
+        release = threading.Event()
+
+        futures = [executor.submit(release.wait, 1) for _ in range(10)]
+        assert executor.workers == 6
+
+        release.set()
+        assert all(f.result() for f in futures)
+        executor.shutdown()
+
+        decisions = executor.decisions()
+        assert decisions
+        assert all(d.action == EXECUTOR_GROW for d in decisions)
+        assert decisions[-1].workers == 6
+
+    def test_concurrent_io_bound_work_is_not_starved(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=20)
+
+        start = time.time()
+        futures = [executor.submit(time.sleep, 0.1) for _ in range(20)]
+        for future in futures:
+            future.result()
+        elapsed = time.time() - start
+        executor.shutdown()
+
+        assert elapsed < 0.5
+
+    def test_idle_workers_retire_down_to_min_workers(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=4,
+                                              idle_timeout=0.05)
+        release = threading.Event()
+
+        futures = [executor.submit(release.wait, 1) for _ in range(4)]
+        assert executor.workers == 4
+        release.set()
+        for future in futures:
+            future.result()
+
+        # Forgets the submission rate, for idle workers to retire
+        with executor._lock:
+            executor._submissions.clear()
+        assert wait_until(lambda: executor.workers == 1)
+
+        shrinks = [d for d in executor.decisions() if d.action == EXECUTOR_SHRINK]
+        assert len(shrinks) == 3
+        assert shrinks[-1].workers == 1
+        executor.shutdown()
+
+    def test_workers_grow_with_outstanding_work(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=4)
+        release = threading.Event()
+
+        # Work taken off the queue, but still running, is outstanding
+        futures = [executor.submit(release.wait, 1)]
+        futures += [executor.submit(release.wait, 1) for _ in range(2)]
+        assert executor.workers == 3
+
+        release.set()
+        assert all(f.result() for f in futures)
+        assert wait_until(lambda: executor._outstanding == 0)
+        executor.shutdown()
+
+    def test_dropped_executor_workers_stop(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=2, max_workers=2)
+        executor.submit(lambda: None).result()
+        threads = list(executor._threads)
+        executor_ref = weakref.ref(executor)
+
+        def collected():
+            gc.collect()
+            return executor_ref() is None
+
+        # Workers may briefly hold it, accounting for completed work
+        del executor
+        assert wait_until(collected)
+        for thread in threads:
+            thread.join(2)
+            assert not thread.is_alive()
+
+    def test_workers_stop_quietly_at_exit(self):
+        script = (
+            "from mangrove.executors import AdaptiveThreadPoolExecutor\n"
+            "executor = AdaptiveThreadPoolExecutor(min_workers=4, idle_timeout=60)\n"
+            "executor.submit(lambda: None).result()\n"
+        )
+        process = subprocess.Popen([sys.executable, '-c', script],
+                                   cwd=os.path.join(os.path.dirname(__file__), '..'),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = process.communicate()
+
+        assert process.returncode == 0
+        assert err == ''
+
+    def test_latency_demand_keeps_workers(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=0, max_workers=8)
+        for _ in range(4):
+            executor.latencies.add(1.0)
+        for _ in range(10):
+            executor._submissions.append(time.time())
+
+        with executor._lock:
+            demand, latency = executor._demand(time.time() + 1)
+
+        assert latency == 1.0
+        assert demand == 10
+        executor.shutdown()
+
+    def test_submit_after_shutdown_raises(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=2)
+        executor.submit(lambda: None).result()
+        executor.shutdown()
+
+        with pytest.raises(RuntimeError):
+            executor.submit(lambda: None)
+
+    def test_shutdown_runs_queued_work(self):
+        executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=1)
+        futures = [executor.submit(time.sleep, 0.01) for _ in range(5)]
+        executor.shutdown(wait=True)
+
+        assert all(f.done() for f in futures)
+
+
+class TestPoolsExecutor:
+    def test_service_pool_defaults_to_adaptive_executor(self):
+        pool = Ec2Pool(connect=False, regions=['us-east-1'])
+        assert isinstance(pool._executor, AdaptiveThreadPoolExecutor)
+
+    def test_mixin_pool_shares_its_executor_with_services(self):
+        class Pool(ServiceMixinPool):
+            services = {
+                'ec2': {'regions': ['us-east-1']},
+                'sqs': {'regions': ['us-east-1']},
+            }
+
+        executor = AdaptiveThreadPoolExecutor(max_workers=4)
+        pool = Pool(executor=executor)
+
+        assert pool.ec2._executor is executor
+        assert pool.sqs._executor is executor
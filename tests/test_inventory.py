@@ -0,0 +1,130 @@
+from mangrove.services import Ec2Pool
+from mangrove.inventory import Ec2Inventory, InstanceRecord, InventoryDiff
+
+from fakes import fake_service_pool
+
+
+class FakeInstance(object):
+    def __init__(self, id, state='running', tags=None):
+        self.id = id
+        self.state = state
+        self.instance_type = 'm1.small'
+        self.image_id = 'ami-1234'
+        self.private_ip_address = '10.0.0.1'
+        self.ip_address = None
+        self.launch_time = '2014-03-20T10:00:00.000Z'
+        self.tags = tags or {}
+
+
+class FakeReservation(object):
+    def __init__(self, *instances):
+        self.instances = list(instances)
+
+
+class FakeEc2Connection(object):
+    def __init__(self, *instances):
+        self.instances = list(instances)
+        self.error = None
+
+    def get_all_instances(self, filters=None):
+        if self.error is not None:
+            raise self.error
+        return [FakeReservation(*self.instances)]
+
+
+class TestInstanceRecord:
+    def test_from_instance_keeps_relevant_attributes(self):
+        record = InstanceRecord.from_instance(
+            'us-east-1', FakeInstance('i-1', tags={'b': '2', 'a': '1'})
+        )
+
+        assert record.id == 'i-1'
+        assert record.region == 'us-east-1'
+        assert record.state == 'running'
+        assert record.tags == (('a', '1'), ('b', '2'))
+        assert not hasattr(record, '__dict__')
+
+    def test_records_equality_and_changes(self):
+        running = InstanceRecord('i-1', 'us-east-1', state='running')
+        stopped = InstanceRecord('i-1', 'us-east-1', state='stopped')
+
+        assert running == InstanceRecord('i-1', 'us-east-1', state='running')
+        assert running != stopped
+        assert running.changes(stopped) == ['state']
+
+
+class TestInventoryDiff:
+    def test_compute_detects_added_removed_and_changed(self):
+        previous = {
+            'i-1': InstanceRecord('i-1', 'us-east-1', state='running'),
+            'i-2': InstanceRecord('i-2', 'us-east-1', state='running'),
+        }
+        current = {
+            'i-1': InstanceRecord('i-1', 'us-east-1', state='stopped'),
+            'i-3': InstanceRecord('i-3', 'us-east-1', state='pending'),
+        }
+        diff = InventoryDiff.compute('us-east-1', previous, current)
+
+        assert [r.id for r in diff.added] == ['i-3']
+        assert [r.id for r in diff.removed] == ['i-2']
+        assert [(o.state, n.state) for o, n in diff.changed] == [('running', 'stopped')]
+
+    def test_diff_without_changes_is_falsy(self):
+        assert not InventoryDiff.compute('us-east-1', {}, {})
+
+
+class TestEc2Inventory:
+    def test_first_refresh_reports_every_instances_as_added(self):
+        pool = fake_service_pool(Ec2Pool, 
+            us_east_1=FakeEc2Connection(FakeInstance('i-1')),
+            eu_west_1=FakeEc2Connection(FakeInstance('i-2'), FakeInstance('i-3')),
+        )
+        inventory = pool.inventory()
+        diffs = inventory.refresh()
+
+        assert isinstance(inventory, Ec2Inventory)
+        assert len(diffs['us-east-1'].added) == 1
+        assert len(diffs['eu-west-1'].added) == 2
+        assert len(inventory) == 3
+        assert sorted(inventory.snapshot('eu-west-1')) == ['i-2', 'i-3']
+
+    def test_refresh_only_reports_changed_regions(self):
+        us_east_1 = FakeEc2Connection(FakeInstance('i-1'))
+        pool = fake_service_pool(Ec2Pool, 
+            us_east_1=us_east_1,
+            eu_west_1=FakeEc2Connection(FakeInstance('i-2')),
+        )
+        inventory = pool.inventory()
+        inventory.refresh()
+
+        us_east_1.instances = [FakeInstance('i-1', state='stopped')]
+        diffs = inventory.refresh()
+
+        assert diffs.keys() == ['us-east-1']
+        assert diffs['us-east-1'].changed[0][1].state == 'stopped'
+
+    def test_subscribers_receive_non_empty_diffs(self):
+        connection = FakeEc2Connection(FakeInstance('i-1'))
+        pool = fake_service_pool(Ec2Pool, us_east_1=connection)
+        inventory = pool.inventory()
+        received = []
+        inventory.subscribe(received.append)
+
+        inventory.refresh()
+        inventory.refresh()
+        connection.instances = []
+        inventory.refresh()
+
+        assert len(received) == 2
+        assert [r.id for r in received[1].removed] == ['i-1']
+
+    def test_failing_region_keeps_previous_snapshot(self):
+        connection = FakeEc2Connection(FakeInstance('i-1'))
+        pool = fake_service_pool(Ec2Pool, us_east_1=connection)
+        inventory = pool.inventory()
+        inventory.refresh()
+
+        connection.error = IOError()
+        assert inventory.refresh() == {}
+        assert isinstance(inventory.errors['us-east-1'], IOError)
+        assert inventory.snapshot('us-east-1').keys() == ['i-1']
@@ -0,0 +1,262 @@
+import time
+import Queue
+import threading
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from boto.resultset import ResultSet
+from boto.s3.prefix import Prefix
+
+from mangrove import executors
+from mangrove.services import S3Pool
+
+
+class FakeKey(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return '<FakeKey {}>'.format(self.name)
+
+
+class FakeBucket(object):
+    """Bucket listed like S3 does: pages hold page_size entries, in
+    lexicographic order, keys first and then common prefixes"""
+    def __init__(self, names, delay=0, failing_prefix=None, page_size=7):
+        self.names = sorted(names)
+        self.delay = delay
+        self.failing_prefix = failing_prefix
+        self.page_size = page_size
+        self.listed = []
+
+    def get_all_keys(self, prefix='', delimiter='', marker='', **params):
+        self.listed.append((prefix, delimiter, marker))
+        time.sleep(self.delay)
+        if self.failing_prefix is not None and prefix == self.failing_prefix:
+            raise IOError()
+
+        entries = []
+        for name in self.names:
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if delimiter and delimiter in rest:
+                name = prefix + rest.split(delimiter)[0] + delimiter
+                entry = Prefix(name=name)
+            else:
+                entry = FakeKey(name)
+            if name > marker and (not entries or entries[-1].name != name):
+                entries.append(entry)
+
+        page = ResultSet()
+        selected = entries[:self.page_size]
+        page.extend(e for e in selected if isinstance(e, FakeKey))
+        page.extend(e for e in selected if isinstance(e, Prefix))
+        page.is_truncated = len(entries) > self.page_size
+        if delimiter and page.is_truncated:
+            page.next_marker = selected[-1].name
+        return page
+
+
+class FakeS3Connection(object):
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def get_bucket(self, name, validate=True):
+        return self.bucket
+
+
+FLAT_NAMES = ['{:03x}'.format(i) for i in range(0, 4096, 16)]
+
+NAMES = (
+    ['index.html', 'z.txt'] +
+    ['logs/2014/{:03d}.log'.format(i) for i in range(30)] +
+    ['logs/2013/{:03d}.log'.format(i) for i in range(30)] +
+    ['data/{}/part-{}'.format(c, i) for c in 'abc' for i in range(20)]
+)
+
+
+def fake_s3_pool(bucket):
+    pool = S3Pool(connect=False, regions=['us-east-1'], default_region='us-east-1')
+    pool._connections['us-east-1'] = FakeS3Connection(bucket)
+    pool._connections._default_name = 'us-east-1'
+    return pool
+
+
+class TestS3Lister:
+    def test_partitions_are_discovered_through_delimiter(self):
+        pool = fake_s3_pool(FakeBucket(NAMES))
+        partitions = pool.list_keys('bucket', depth=1).partitions()
+
+        assert [p.name for p in partitions] == ['data/', 'index.html', 'logs/', 'z.txt']
+        assert isinstance(partitions[0], Prefix)
+
+    def test_partitions_are_discovered_levels_deep(self):
+        pool = fake_s3_pool(FakeBucket(NAMES))
+        partitions = pool.list_keys('bucket', depth=2).partitions()
+
+        assert [p.name for p in partitions if isinstance(p, Prefix)] == [
+            'data/a/', 'data/b/', 'data/c/', 'logs/2013/', 'logs/2014/'
+        ]
+
+    def test_pages_common_prefixes_are_listed_along_with_their_keys(self):
+        for ordered in (False, True):
+            pool = fake_s3_pool(FakeBucket(NAMES))
+            keys = list(pool.list_keys('bucket', ordered=ordered))
+
+            assert sorted(k.name for k in keys) == sorted(NAMES)
+            if ordered:
+                assert [k.name for k in keys] == sorted(NAMES)
+
+    def test_unordered_listing_yields_every_keys(self):
+        pool = fake_s3_pool(FakeBucket(NAMES))
+        keys = list(pool.list_keys('bucket', depth=2, buffer_size=5))
+
+        assert sorted(k.name for k in keys) == sorted(NAMES)
+
+    def test_ordered_listing_yields_sorted_keys(self):
+        pool = fake_s3_pool(FakeBucket(NAMES))
+        keys = list(pool.list_keys('bucket', depth=2, ordered=True,
+                                   buffer_size=4, concurrency=2))
+
+        assert [k.name for k in keys] == sorted(NAMES)
+
+    def test_listing_with_prefix(self):
+        pool = fake_s3_pool(FakeBucket(NAMES))
+        keys = list(pool.list_keys('bucket', prefix='logs/', ordered=True))
+
+        assert [k.name for k in keys] == sorted(n for n in NAMES if n.startswith('logs/'))
+
+    def test_partition_listing_failure_is_raised(self):
+        pool = fake_s3_pool(FakeBucket(NAMES, failing_prefix='logs/'))
+
+        with pytest.raises(IOError):
+            list(pool.list_keys('bucket'))
+
+    def test_abandoned_listing_stops_partitions_listings(self):
+        bucket = FakeBucket(NAMES)
+        pool = fake_s3_pool(bucket)
+        lister = pool.list_keys('bucket', buffer_size=1)
+
+        keys = iter(lister)
+        next(keys)
+        keys.close()
+
+        assert lister._cancelled.is_set()
+
+    def test_listings_give_up_when_the_interpreter_exits(self, monkeypatch):
+        lister = fake_s3_pool(FakeBucket(NAMES)).list_keys('bucket')
+        buffer = Queue.Queue(maxsize=1)
+        buffer.put(FakeKey('a'))
+
+        monkeypatch.setattr(executors, '_exiting', True)
+
+        assert lister._put(buffer, FakeKey('b')) is False
+
+    def test_concurrent_walks_are_bounded(self):
+        class CountingBucket(FakeBucket):
+            """Bucket counting its concurrent listings"""
+            def __init__(self, names):
+                super(CountingBucket, self).__init__(names, delay=0.01)
+                self.listing = 0
+                self.max_listing = 0
+                self.lock = threading.Lock()
+
+            def get_all_keys(self, *args, **kwargs):
+                with self.lock:
+                    self.listing += 1
+                    self.max_listing = max(self.max_listing, self.listing)
+                try:
+                    return super(CountingBucket, self).get_all_keys(*args, **kwargs)
+                finally:
+                    with self.lock:
+                        self.listing -= 1
+
+        bucket = CountingBucket(NAMES)
+        pool = fake_s3_pool(bucket)
+        pool._executor = ThreadPoolExecutor(max_workers=8)
+        keys = list(pool.list_keys('bucket', depth=2, concurrency=2))
+
+        assert sorted(k.name for k in keys) == sorted(NAMES)
+        assert bucket.max_listing == 2
+
+    def test_keyspace_is_split_in_key_ranges(self):
+        bucket = FakeBucket(NAMES, page_size=1000)
+        pool = fake_s3_pool(bucket)
+        lister = pool.list_keys('bucket', splits=4)
+
+        bounds = [(r.after, r.until) for r in lister._ranges()]
+        keys = list(lister)
+
+        assert bounds == [(None, 'F'), ('F', 'V'), ('V', 'k'), ('k', None)]
+        assert sorted(k.name for k in keys) == sorted(NAMES)
+        assert sorted(m for p, d, m in bucket.listed if p == '') == ['', 'F', 'V', 'k']
+
+    def test_common_prefixes_never_span_key_ranges(self):
+        names = ['a', 'a/1', 'a/2', 'a-b', 'b/1']
+        pool = fake_s3_pool(FakeBucket(names))
+        lister = pool.list_keys('bucket', delimiter='a', splits=62)
+
+        assert 'a' not in [r.until for r in lister._ranges()]
+        assert sorted(k.name for k in lister) == sorted(names)
+
+    def test_flat_keyspaces_are_listed_concurrently(self):
+        class ConcurrentBucket(FakeBucket):
+            """Bucket which listings wait for each other to start"""
+            def __init__(self, names, listings):
+                super(ConcurrentBucket, self).__init__(names)
+                self.listings = listings
+                self.started = 0
+                self.concurrent = True
+                self.condition = threading.Condition()
+
+            def get_all_keys(self, *args, **kwargs):
+                with self.condition:
+                    self.started += 1
+                    self.condition.notify_all()
+                    deadline = time.time() + 2
+                    while self.started < self.listings and time.time() < deadline:
+                        self.condition.wait(0.1)
+                    self.concurrent &= self.started >= self.listings
+                return super(ConcurrentBucket, self).get_all_keys(*args, **kwargs)
+
+        bucket = ConcurrentBucket(FLAT_NAMES, listings=4)
+        bucket.page_size = 1000
+        pool = fake_s3_pool(bucket)
+        pool._executor = ThreadPoolExecutor(max_workers=4)
+
+        keys = list(pool.list_keys('bucket', splits=4))
+
+        assert sorted(k.name for k in keys) == FLAT_NAMES
+        assert bucket.concurrent
+
+    def test_flat_keyspaces_ordered_listing_splits_key_ranges(self):
+        bucket = FakeBucket(FLAT_NAMES, page_size=1000)
+        pool = fake_s3_pool(bucket)
+        keys = list(pool.list_keys('bucket', depth=0, ordered=True, splits=4,
+                                   buffer_size=8, concurrency=2))
+
+        assert [k.name for k in keys] == FLAT_NAMES
+        assert len(bucket.listed) == 4
+
+    def test_discovered_keys_are_streamed(self):
+        for ordered in (False, True):
+            bucket = FakeBucket(FLAT_NAMES)
+            pool = fake_s3_pool(bucket)
+            lister = pool.list_keys('bucket', ordered=ordered, buffer_size=4,
+                                    concurrency=1, splits=1)
+
+            keys = iter(lister)
+            next(keys)
+            time.sleep(0.05)
+
+            assert len(bucket.listed) == 1
+            keys.close()
+
+    def test_listing_without_region_nor_default_raises(self):
+        pool = S3Pool(connect=False, regions=['us-east-1'])
+        pool._connections['us-east-1'] = FakeS3Connection(FakeBucket(NAMES))
+
+        with pytest.raises(ValueError):
+            list(pool.list_keys('bucket'))
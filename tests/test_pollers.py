@@ -0,0 +1,174 @@
+import time
+import threading
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from mangrove.services import SwfPool
+from mangrove.pollers import SwfPoller, PollStats
+
+from fakes import fake_service_pool
+
+
+class FakeSwfConnection(object):
+    def __init__(self, tasks=None, pages=None, fail=False):
+        self.tasks = dict((key, list(values)) for key, values in (tasks or {}).iteritems())
+        self.pages = pages or {}
+        self.fail = fail
+        self.polls = []
+        self.lock = threading.Lock()
+
+    def _next(self, domain, task_list):
+        with self.lock:
+            self.polls.append((domain, task_list))
+            if self.fail:
+                raise IOError()
+            queue = self.tasks.get((domain, task_list))
+            token = queue.pop(0) if queue else None
+        if token is None:
+            time.sleep(0.01)
+            return {'startedEventId': 0, 'previousStartedEventId': 0}
+        return token
+
+    def poll_for_activity_task(self, domain, task_list, identity=None):
+        token = self._next(domain, task_list)
+        if isinstance(token, dict):
+            return {}
+        return {'taskToken': token, 'activityId': token}
+
+    def poll_for_decision_task(self, domain, task_list, identity=None,
+                               next_page_token=None):
+        if next_page_token is not None:
+            return self.pages[next_page_token]
+
+        token = self._next(domain, task_list)
+        if isinstance(token, dict):
+            return token
+        task = {'taskToken': token, 'events': [{'eventId': 1}]}
+        if token in self.pages:
+            task['nextPageToken'] = token
+        return task
+
+
+def collect(poller, count, timeout=2):
+    tasks = []
+    while len(tasks) < count:
+        task = poller.get(timeout=timeout)
+        if task is None:
+            break
+        tasks.append(task)
+    return tasks
+
+
+class TestSwfPoller:
+    def test_invalid_kind_raises(self):
+        with pytest.raises(ValueError):
+            SwfPoller(fake_service_pool(SwfPool, us_east_1=FakeSwfConnection()), {}, kind='signal')
+
+    def test_tasks_are_polled_across_regions_domains_and_task_lists(self):
+        pool = fake_service_pool(SwfPool, 
+            us_east_1=FakeSwfConnection({
+                ('d1', 'a'): ['us-1', 'us-2'],
+                ('d2', 'b'): ['us-3'],
+            }),
+            eu_west_1=FakeSwfConnection({('d1', 'a'): ['eu-1']}),
+        )
+
+        poller = pool.poll({
+            'us-east-1': {'d1': ['a'], 'd2': ['b']},
+            'eu-west-1': {'d1': ['a']},
+        }, kind='activity', concurrency=2)
+        try:
+            tasks = collect(poller, 4)
+        finally:
+            poller.close()
+
+        assert sorted(t.token for t in tasks) == ['eu-1', 'us-1', 'us-2', 'us-3']
+        eu_task = [t for t in tasks if t.token == 'eu-1'][0]
+        assert (eu_task.region, eu_task.domain, eu_task.task_list) == ('eu-west-1', 'd1', 'a')
+        assert eu_task.kind == 'activity'
+
+    def test_decision_tasks_events_pages_are_fetched(self):
+        connection = FakeSwfConnection(
+            {('d', 'deciders'): ['token']},
+            pages={'token': {'events': [{'eventId': 2}]}},
+        )
+        pool = fake_service_pool(SwfPool, us_east_1=connection)
+
+        poller = pool.poll({'us-east-1': {'d': ['deciders']}})
+        try:
+            task = poller.get(timeout=2)
+        finally:
+            poller.close()
+
+        assert task.data['events'] == [{'eventId': 1}, {'eventId': 2}]
+        assert 'nextPageToken' not in task.data
+
+    def test_polls_stop_while_dispatch_queue_is_full(self):
+        connection = FakeSwfConnection({('d', 'a'): [str(i) for i in range(50)]})
+        pool = fake_service_pool(SwfPool, us_east_1=connection)
+
+        poller = pool.poll({'us-east-1': {'d': ['a']}}, kind='activity', dispatch_size=3)
+        try:
+            time.sleep(0.2)
+            assert len(connection.polls) == 3
+            assert len(poller._buffer) == 3
+
+            poller.get()
+            time.sleep(0.1)
+            assert len(connection.polls) == 4
+        finally:
+            poller.close()
+
+    def test_empty_polls_and_latencies_are_tracked(self):
+        connection = FakeSwfConnection({('d', 'a'): ['1']})
+        pool = fake_service_pool(SwfPool, us_east_1=connection)
+
+        poller = pool.poll({'us-east-1': {'d': ['a']}}, kind='activity')
+        try:
+            assert poller.get(timeout=2).token == '1'
+            time.sleep(0.1)
+        finally:
+            poller.close()
+
+        stats = poller.stats()[('us-east-1', 'd', 'a')]
+        assert stats.polls > 1
+        assert stats.empty == stats.polls - 1
+        assert 0 < stats.empty_rate < 1
+        assert stats.latencies.percentile(50) is not None
+
+    def test_failed_polls_are_counted(self):
+        connection = FakeSwfConnection(fail=True)
+        pool = fake_service_pool(SwfPool, us_east_1=connection)
+
+        poller = pool.poll({'us-east-1': {'d': ['a']}}, kind='activity')
+        time.sleep(0.1)
+        poller.close()
+
+        stats = poller.stats()[('us-east-1', 'd', 'a')]
+        assert stats.errors == 1
+        assert stats.polls == 0
+
+    def test_closed_poller_yields_no_tasks(self):
+        pool = fake_service_pool(SwfPool, us_east_1=FakeSwfConnection())
+        poller = pool.poll({'us-east-1': {'d': ['a']}})
+        poller.close()
+
+        assert not poller.running
+        assert list(poller) == []
+
+    def test_shared_executor_is_not_shutdown(self):
+        executor = ThreadPoolExecutor(2)
+        pool = fake_service_pool(SwfPool, us_east_1=FakeSwfConnection({('d', 'a'): ['1']}))
+
+        poller = pool.poll({'us-east-1': {'d': ['a']}}, executor=executor)
+        assert poller.get(timeout=2).token == '1'
+        poller.close()
+
+        assert executor.submit(lambda: 42).result() == 42
+        executor.shutdown()
+
+
+class TestPollStats:
+    def test_empty_rate_without_polls(self):
+        assert PollStats().empty_rate == 0.0
@@ -1,19 +1,62 @@
+import time
+import socket
+import threading
 import pytest
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from boto.s3.connection import S3Connection
 from moto import mock_s3, mock_ec2
 
 from mangrove.pool import ServicePool, ServiceMixinPool
+from mangrove.budget import ConnectionBudget
+from mangrove.retry import RetryBudget
+from mangrove.client import RegionClient
+from mangrove.constants import BREAKER_OPEN
 from mangrove.mappings import ConnectionsMapping
-from mangrove.exceptions import NotConnectedError, DoesNotExistError
+from mangrove.exceptions import (
+    CircuitOpenError,
+    NotConnectedError,
+    DoesNotExistError
+)
+
+from fakes import fake_service_pool
 
 
 class DummyS3Pool(ServicePool):
     service = 's3'
 
 
+class FakeConnection(object):
+    """Region connection stub answering after a fixed delay"""
+    def __init__(self, name, delay=0, error=None, failures=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+
+    def get_all_buckets(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            if self.failures is None or self.calls <= self.failures:
+                raise self.error
+        return self.name
+
+
+def fake_pool(breaker_options=None, **delays):
+    connections = dict(
+        (name, FakeConnection(name.replace('_', '-'), delay=delay))
+        for name, delay in delays.iteritems()
+    )
+    return fake_service_pool(
+        DummyS3Pool,
+        {'breaker_options': breaker_options},
+        **connections
+    )
+
+
 class DummyMixinPool(ServiceMixinPool):
     services = {
         's3': {
@@ -58,6 +101,304 @@ class TestServicePool:
         assert pool._service_declaration.regions == ['us-east-1', 'eu-west-1']
         assert isinstance(pool._connections['eu-west-1'], S3Connection) is True
 
+    @mock_s3
+    def test_unknown_region_connection_raises(self):
+        pool = DummyS3Pool(connect=True, regions=['us-east-1'])
+        pool.add_region('xx-nowhere-1')
+
+        with pytest.raises(NotConnectedError):
+            pool.region('xx-nowhere-1').get_all_buckets()
+
+    def test_call_records_region_latency(self):
+        pool = fake_pool(us_east_1=0)
+
+        assert pool._call('us-east-1', 'get_all_buckets') == 'us-east-1'
+        assert len(pool.latencies['us-east-1']) == 1
+
+    def test_regions_exposes_region_clients(self):
+        pool = fake_pool(us_east_1=0)
+        client = pool.regions['us-east-1']
+
+        assert isinstance(client, RegionClient) is True
+        assert client.name == 'us-east-1'
+        assert client.get_all_buckets() == 'us-east-1'
+        assert len(pool.latencies['us-east-1']) == 1
+
+    def test_fan_out_calls_every_connected_regions(self):
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+        futures = pool.fan_out('get_all_buckets')
+
+        assert sorted(futures) == ['eu-west-1', 'us-east-1']
+        assert futures['eu-west-1'].result() == 'eu-west-1'
+
+    def test_fan_out_on_unconnected_region_raises(self):
+        pool = fake_pool(us_east_1=0)
+
+        with pytest.raises(NotConnectedError):
+            pool.fan_out('get_all_buckets', regions=['eu-west-1'])
+
+
+class TestServicePoolBreakers:
+    def test_breakers_are_disabled_by_default(self):
+        pool = fake_pool(us_east_1=0)
+        pool._connections['us-east-1'].error = IOError()
+
+        for _ in range(10):
+            with pytest.raises(IOError):
+                pool.regions['us-east-1'].get_all_buckets()
+
+        assert pool.breakers == {}
+
+    def test_failing_region_breaker_opens_and_fails_fast(self):
+        pool = fake_pool(breaker_options={'failure_threshold': 2}, us_east_1=0)
+        connection = pool._connections['us-east-1']
+        connection.error = IOError()
+
+        for _ in range(2):
+            with pytest.raises(IOError):
+                pool.regions['us-east-1'].get_all_buckets()
+
+        assert pool.breakers['us-east-1'].state == BREAKER_OPEN
+        with pytest.raises(CircuitOpenError):
+            pool.regions['us-east-1'].get_all_buckets()
+        assert connection.calls == 2
+
+    def test_open_region_fails_fast_without_resolving_its_connection(self):
+        pool = fake_pool(breaker_options={'failure_threshold': 1}, us_east_1=0)
+        pool._connections['us-east-1'].error = IOError()
+        with pytest.raises(IOError):
+            pool.regions['us-east-1'].get_all_buckets()
+
+        # Pending connection which would block forever if waited on
+        pool._connections['us-east-1'] = Future()
+
+        with pytest.raises(CircuitOpenError):
+            pool.regions['us-east-1'].get_all_buckets()
+        with pytest.raises(CircuitOpenError):
+            pool._call('us-east-1', 'get_all_buckets')
+
+    def test_fan_out_skips_open_regions(self):
+        pool = fake_pool(
+            breaker_options={'failure_threshold': 1},
+            us_east_1=0,
+            eu_west_1=0
+        )
+        pool._connections['us-east-1'].error = IOError()
+        with pytest.raises(IOError):
+            pool._call('us-east-1', 'get_all_buckets')
+
+        futures = pool.fan_out('get_all_buckets')
+
+        assert futures.keys() == ['eu-west-1']
+
+
+class TestServicePoolHedge:
+    def test_hedge_returns_primary_answer_when_fast_enough(self):
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+
+        result = pool.hedge(
+            'get_all_buckets', primary='us-east-1',
+            secondary='eu-west-1', delay=1
+        )
+
+        assert result == 'us-east-1'
+        assert pool._connections['eu-west-1'].calls == 0
+
+    def test_hedge_returns_secondary_answer_when_primary_is_slow(self):
+        pool = fake_pool(us_east_1=0.5, eu_west_1=0)
+
+        result = pool.hedge(
+            'get_all_buckets', primary='us-east-1',
+            secondary='eu-west-1', delay=0.01
+        )
+
+        assert result == 'eu-west-1'
+
+    def test_hedge_falls_back_to_secondary_when_primary_fails(self):
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+        pool._connections['us-east-1'].error = IOError()
+
+        result = pool.hedge('get_all_buckets', primary='us-east-1', delay=1)
+
+        assert result == 'eu-west-1'
+
+    def test_hedge_raises_when_every_region_fails(self):
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+        pool._connections['us-east-1'].error = IOError()
+        pool._connections['eu-west-1'].error = IOError()
+
+        with pytest.raises(IOError):
+            pool.hedge('get_all_buckets', primary='us-east-1', delay=1)
+
+    def test_hedge_without_primary_nor_default_region_raises(self):
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+
+        with pytest.raises(ValueError):
+            pool.hedge('get_all_buckets')
+
+    def test_hedge_without_secondary_region_raises(self):
+        pool = fake_pool(us_east_1=0)
+
+        with pytest.raises(NotConnectedError):
+            pool.hedge('get_all_buckets', primary='us-east-1')
+
+    def test_concurrent_hedges_share_one_executor(self, monkeypatch):
+        created = []
+
+        class SlowToCreateExecutor(ThreadPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                time.sleep(0.05)
+                created.append(self)
+                super(SlowToCreateExecutor, self).__init__(*args, **kwargs)
+
+        monkeypatch.setattr('mangrove.pool.ThreadPoolExecutor', SlowToCreateExecutor)
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+
+        threads = [
+            threading.Thread(target=pool.hedge, args=('get_all_buckets',),
+                             kwargs={'primary': 'us-east-1', 'delay': 1})
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert created == [pool._hedge_executor]
+
+    def test_hedge_delay_uses_primary_latency_percentile(self):
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+        for _ in range(100):
+            pool._call('us-east-1', 'get_all_buckets')
+
+        expected = pool.latencies['us-east-1'].percentile(95)
+        assert pool._hedge_delay('us-east-1', 95) == expected
+
+
+class TestServicePoolRetry:
+    def retrying_pool(self, **policy):
+        policy.setdefault('base_delay', 0)
+        policy.setdefault('budget', RetryBudget())
+        pool = DummyS3Pool(connect=False, regions=['us-east-1'],
+                           retry_policy=policy)
+        pool._connections['us-east-1'] = FakeConnection('us-east-1')
+        return pool, pool._connections['us-east-1']
+
+    def test_calls_are_not_retried_without_policy(self):
+        pool = fake_pool(us_east_1=0)
+        connection = pool._connections['us-east-1']
+        connection.error = socket.error()
+
+        with pytest.raises(socket.error):
+            pool.regions['us-east-1'].get_all_buckets()
+        assert connection.calls == 1
+
+    def test_retryable_errors_are_retried(self):
+        pool, connection = self.retrying_pool(max_attempts=3)
+        connection.error, connection.failures = socket.error(), 2
+
+        assert pool.regions['us-east-1'].get_all_buckets() == 'us-east-1'
+        assert connection.calls == 3
+
+    def test_retries_stop_after_max_attempts(self):
+        pool, connection = self.retrying_pool(max_attempts=3)
+        connection.error = socket.error()
+
+        with pytest.raises(socket.error):
+            pool.regions['us-east-1'].get_all_buckets()
+        assert connection.calls == 3
+
+    def test_non_retryable_errors_are_not_retried(self):
+        pool, connection = self.retrying_pool(max_attempts=3)
+        connection.error = ValueError()
+
+        with pytest.raises(ValueError):
+            pool.regions['us-east-1'].get_all_buckets()
+        assert connection.calls == 1
+
+    def test_method_policy_overrides_pool_policy(self):
+        pool, connection = self.retrying_pool(
+            max_attempts=3,
+            methods={'get_all_buckets': {'max_attempts': 1}}
+        )
+        connection.error = socket.error()
+
+        with pytest.raises(socket.error):
+            pool.regions['us-east-1'].get_all_buckets()
+        assert connection.calls == 1
+
+    def test_exhausted_budget_stops_retries(self):
+        budget = RetryBudget(min_per_second=0, capacity=1, ratio=0)
+        pool, connection = self.retrying_pool(max_attempts=5, budget=budget)
+        connection.error = socket.error()
+
+        with pytest.raises(socket.error):
+            pool.regions['us-east-1'].get_all_buckets()
+        assert connection.calls == 2
+
+    def test_boto_retries_are_disabled_on_connections_of_pools_with_a_policy(self):
+        pool = DummyS3Pool(connect=False, regions=['us-east-1'],
+                           retry_policy={'max_attempts': 3})
+        connection = pool._connect_module_to_region('us-east-1')
+
+        assert connection.num_retries == 0
+
+    def test_boto_retries_are_left_alone_without_policy(self):
+        pool = DummyS3Pool(connect=False, regions=['us-east-1'])
+        connection = pool._connect_module_to_region('us-east-1')
+
+        assert connection.num_retries == S3Connection('x', 'x').num_retries
+
+
+class TestServicePoolBudget:
+    def test_evicted_region_is_transparently_reconnected(self):
+        budget = ConnectionBudget(max_connections=1)
+        pool = DummyS3Pool(connect=False, regions=['us-east-1', 'eu-west-1'],
+                           budget=budget)
+        pool._connect_module_to_region = lambda r, **kwargs: FakeConnection(r)
+        pool.connect()
+
+        assert pool._connections.keys() == ['us-east-1']
+        assert sorted(pool.regions) == ['eu-west-1', 'us-east-1']
+
+        assert pool.regions['eu-west-1'].get_all_buckets() == 'eu-west-1'
+        assert pool._connections.keys() == ['eu-west-1']
+        assert pool._evicted == set(['us-east-1'])
+
+        assert pool.regions['us-east-1'].get_all_buckets() == 'us-east-1'
+        assert budget.evictions == 2
+
+    def test_default_region_is_connected_first(self):
+        budget = ConnectionBudget(max_connections=1)
+        pool = DummyS3Pool(connect=False, regions=['us-east-1', 'eu-west-1'],
+                           default_region='eu-west-1', budget=budget)
+        pool._connect_module_to_region = lambda r, **kwargs: FakeConnection(r)
+        pool.connect()
+
+        assert pool._connections.keys() == ['eu-west-1']
+        assert pool.regions.default.region_name == 'eu-west-1'
+
+    def test_live_connections_are_resolved_without_the_pool_lock(self):
+        pool = fake_pool(us_east_1=0)
+
+        with pool._lock:
+            resolving = threading.Thread(target=pool._connection, args=('us-east-1',))
+            resolving.start()
+            resolving.join(1)
+            blocked = resolving.is_alive()
+
+        assert not blocked
+
+    def test_footprint_reports_connections(self):
+        pool = fake_pool(us_east_1=0, eu_west_1=0)
+        pool._evict('us-east-1')
+        footprint = pool.footprint()
+
+        assert footprint['connections'] == 1
+        assert footprint['evicted'] == 1
+        assert footprint['pending'] == 0
+        assert footprint['approximate_size'] > 0
+
 
 class TestServiceMixinPool:
     @mock_s3
@@ -86,6 +427,48 @@ class TestServiceMixinPool:
         with pytest.raises(ValueError):
             pool = RaisingMixinPool(connect=False)
 
+    @mock_s3
+    @mock_ec2
+    def test_mixin_pool_reuses_generated_service_pool_classes(self):
+        first, second = DummyMixinPool(), DummyMixinPool()
+
+        assert type(first.s3) is type(second.s3)
+        assert type(first.s3) is not type(first.ec2)
+
+    @mock_s3
+    @mock_ec2
+    def test_mixin_pool_services_retry_policies(self):
+        class RetryingMixinPool(ServiceMixinPool):
+            services = {
+                's3': {
+                    'regions': ['us-east-1'],
+                    'retry': {'max_attempts': 5}
+                },
+                'ec2': {
+                    'regions': ['us-east-1'],
+                }
+            }
+
+        pool = RetryingMixinPool()
+
+        assert pool.s3.retry_policy.max_attempts == 5
+        assert pool.ec2.retry_policy is None
+
+    @mock_s3
+    @mock_ec2
+    def test_mixin_pool_connections_are_bounded(self):
+        pool = DummyMixinPool(max_connections=3)
+        pool.connect()
+        footprint = pool.footprint()
+
+        assert footprint['connections'] == 3
+        assert footprint['max_connections'] == 3
+        assert footprint['evicted'] == len(pool.ec2._regions_names) + 2 - 3
+
+        pool.s3.regions['eu-west-1'].get_all_buckets
+        pool.s3.regions['us-east-1'].get_all_buckets
+        assert pool.footprint()['connections'] == 3
+
     @mock_s3
     @mock_ec2
     def test_mixin_pool_with_default_region_not_part_of_regions_raises(self):
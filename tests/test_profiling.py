@@ -0,0 +1,259 @@
+import json
+import time
+import socket
+import threading
+import pytest
+
+from StringIO import StringIO
+
+from concurrent.futures import Future
+
+from boto.exception import BotoServerError
+
+from mangrove.pool import ServiceMixinPool
+from mangrove.services import S3Pool
+from mangrove import profiling
+from mangrove.profiling import CallProfiler, CallProfile, redact
+
+from fakes import fake_service_pool
+
+
+class FakeConnection(object):
+    """Connection which methods make an HTTP request, then parse
+    its response"""
+    def __init__(self, request_time=0.05, parsing_time=0.02, failures=0):
+        self.request_time = request_time
+        self.parsing_time = parsing_time
+        self.failures = failures
+
+    def make_request(self, action, params=None):
+        time.sleep(self.request_time)
+        if self.failures:
+            self.failures -= 1
+            raise socket.error()
+        return 'response'
+
+    def get_all_buckets(self, headers=None):
+        response = self.make_request('GET')
+        time.sleep(self.parsing_time)
+        return [response]
+
+
+class RequestlessConnection(object):
+    def get_all_buckets(self, headers=None):
+        time.sleep(0.02)
+        return []
+
+
+class TestRedact:
+    def test_values_are_redacted_keeping_their_type_and_size(self):
+        assert redact('secret') == '<str len=6>'
+        assert redact(42) == '<int>'
+        assert redact(None) is None
+        assert redact(True) is True
+        assert redact(['a', 1]) == ['<str len=1>', '<int>']
+        assert redact({'key': 'value'}) == {'key': '<str len=5>'}
+
+
+class TestCallProfiler:
+    def test_slowest_calls_are_kept(self):
+        profiler = CallProfiler(size=3)
+
+        for duration in [0.1, 0.5, 0.2, 0.4, 0.3]:
+            profile = CallProfile('s3', 'us-east-1', 'get_all_buckets')
+            profile.started = time.time() - duration
+            profiler.record(profile)
+
+        slowest = profiler.slowest()
+        assert profiler.calls == 5
+        assert [round(p.duration, 1) for p in slowest] == [0.5, 0.4, 0.3]
+
+    def test_call_arguments_are_redacted(self):
+        profiler = CallProfiler()
+        with profiler.profile('s3', 'us-east-1', 'get_bucket', ('my-bucket',),
+                              {'validate': False}):
+            pass
+
+        profile = profiler.slowest()[0]
+        assert profile.args == ['<str len=9>']
+        assert profile.kwargs == {'validate': False}
+
+    def test_failed_calls_are_recorded_with_their_error(self):
+        profiler = CallProfiler()
+
+        with pytest.raises(KeyError):
+            with profiler.profile('s3', 'us-east-1', 'get_all_buckets'):
+                raise KeyError('boom')
+
+        assert profiler.slowest()[0].error == 'KeyError'
+        assert profiling.current() is None
+
+    def test_failed_calls_errors_only_keep_their_type_and_code(self):
+        profiler = CallProfiler()
+        error = BotoServerError(400, 'Bad Request', 'secret-message-body')
+        error.error_code = 'InvalidParameter'
+
+        with pytest.raises(BotoServerError):
+            with profiler.profile('sns', 'us-east-1', 'publish'):
+                raise error
+
+        assert profiler.slowest()[0].error == 'BotoServerError: InvalidParameter'
+
+    def test_dump_is_json_serializable(self):
+        profiler = CallProfiler()
+        with profiler.profile('s3', 'us-east-1', 'get_all_buckets'):
+            pass
+
+        stream = StringIO()
+        report = profiler.dump(stream)
+        dumped = json.loads(stream.getvalue())
+
+        assert report['calls'] == dumped['calls'] == 1
+        assert dumped['slowest'][0]['method'] == 'get_all_buckets'
+        assert set(dumped['phases']) == set(['queue', 'connection', 'request',
+                                             'parsing', 'backoff'])
+
+    def test_reset(self):
+        profiler = CallProfiler()
+        with profiler.profile('s3', 'us-east-1', 'get_all_buckets'):
+            pass
+        profiler.reset()
+
+        assert profiler.calls == 0
+        assert profiler.slowest() == []
+
+
+class TestPoolProfiling:
+    def test_calls_are_not_profiled_by_default(self):
+        pool = fake_service_pool(S3Pool, us_east_1=FakeConnection(0, 0))
+        pool.regions['us-east-1'].get_all_buckets()
+
+        assert pool._profiler is None
+        assert not getattr(pool._connections['us-east-1'].make_request, '_profiled', False)
+
+    def test_calls_are_broken_into_request_and_parsing(self):
+        pool = fake_service_pool(
+            S3Pool,
+            us_east_1=FakeConnection(request_time=0.05, parsing_time=0.03)
+        )
+        profiler = CallProfiler()
+        pool.profile(profiler)
+
+        pool.regions['us-east-1'].get_all_buckets()
+
+        profile = profiler.slowest()[0]
+        assert (profile.service, profile.region, profile.method) == ('s3', 'us-east-1', 'get_all_buckets')
+        assert profile.attempts == 1
+        assert 0.05 <= profile.phases['request'] < 0.1
+        assert 0.025 <= profile.phases['parsing'] < 0.08
+        assert profile.duration >= 0.08
+
+    def test_uninstrumented_calls_are_requests(self):
+        pool = fake_service_pool(S3Pool, us_east_1=RequestlessConnection())
+        profiler = CallProfiler()
+        pool.profile(profiler)
+
+        pool.regions['us-east-1'].get_all_buckets()
+
+        profile = profiler.slowest()[0]
+        assert profile.phases['request'] >= 0.02
+        assert profile.phases['parsing'] == 0
+
+    def test_connection_resolution_is_profiled(self):
+        pool = fake_service_pool(S3Pool, us_east_1=FakeConnection(0, 0))
+        connecting = Future()
+        pool._connections['us-east-1'] = connecting
+        threading.Timer(0.05, connecting.set_result, [FakeConnection(0, 0)]).start()
+
+        profiler = CallProfiler()
+        pool.profile(profiler)
+        pool.regions['us-east-1'].get_all_buckets()
+
+        assert profiler.slowest()[0].phases['connection'] >= 0.04
+
+    def test_connection_resolution_is_only_profiled_for_the_first_call(self):
+        pool = fake_service_pool(S3Pool, us_east_1=FakeConnection(0, 0))
+        connecting = Future()
+        pool._connections['us-east-1'] = connecting
+        threading.Timer(0.05, connecting.set_result, [FakeConnection(0, 0)]).start()
+
+        profiler = CallProfiler()
+        pool.profile(profiler)
+        get_all_buckets = pool.regions['us-east-1'].get_all_buckets
+        get_all_buckets()
+        get_all_buckets()
+
+        first, second = sorted(profiler.slowest(), key=lambda p: p.started)
+        assert first.phases['connection'] >= 0.04
+        assert second.phases['connection'] < 0.04
+
+    def test_stopping_profiling_restores_connections(self):
+        connection = FakeConnection(0, 0)
+        pool = fake_service_pool(S3Pool, us_east_1=connection)
+        pool.profile(CallProfiler())
+        pool.regions['us-east-1'].get_all_buckets()
+
+        assert profiling.instrumented(connection)
+
+        pool.profile(None)
+
+        assert not profiling.instrumented(connection)
+        assert 'make_request' not in vars(connection)
+        assert connection.get_all_buckets() == ['response']
+
+    def test_uninstrument_restores_instance_make_request(self):
+        connection = RequestlessConnection()
+        make_request = lambda *args, **kwargs: 'response'
+        connection.make_request = make_request
+
+        profiling.instrument(connection)
+        profiling.uninstrument(connection)
+
+        assert connection.make_request is make_request
+
+    def test_retries_backoff_is_profiled(self):
+        pool = fake_service_pool(
+            S3Pool,
+            {'retry_policy': {'base_delay': 0.01}},
+            us_east_1=FakeConnection(0, 0, failures=2)
+        )
+        profiler = CallProfiler()
+        pool.profile(profiler)
+
+        pool.regions['us-east-1'].get_all_buckets()
+
+        profile = profiler.slowest()[0]
+        assert profile.attempts == 3
+        assert profile.phases['backoff'] > 0
+        assert profile.error is None
+
+    def test_fan_out_queueing_is_profiled(self):
+        pool = fake_service_pool(
+            S3Pool,
+            us_east_1=FakeConnection(0, 0),
+            eu_west_1=FakeConnection(0, 0)
+        )
+        profiler = CallProfiler()
+        pool.profile(profiler)
+
+        futures = pool.fan_out('get_all_buckets')
+        for future in futures.itervalues():
+            future.result()
+
+        assert profiler.calls == 2
+        assert all(p.phases['queue'] >= 0 for p in profiler.slowest())
+        assert profiler.totals['queue'] > 0
+
+    def test_mixin_pool_profiles_every_services(self):
+        class Pool(ServiceMixinPool):
+            services = {
+                'ec2': {'regions': ['us-east-1']},
+                's3': {'regions': ['us-east-1']},
+            }
+
+        profiler = CallProfiler()
+        pool = Pool()
+        pool.profile(profiler)
+
+        assert pool.ec2._profiler is profiler
+        assert pool.s3._profiler is profiler
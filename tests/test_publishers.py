@@ -0,0 +1,213 @@
+import time
+import threading
+import pytest
+
+from concurrent.futures import Future
+
+from boto.exception import BotoServerError
+
+from mangrove.services import SimpleNotificationPool
+from mangrove.publishers import SnsPublisher
+from mangrove.retry import RetryPolicy
+from mangrove.exceptions import NotConnectedError
+
+from fakes import fake_service_pool
+
+
+class FakeSnsConnection(object):
+    def __init__(self, delay=0, failing_topics=(), failures=0):
+        self.delay = delay
+        self.failing_topics = failing_topics
+        self.failures = failures
+        self.attempts = 0
+        self.published = []
+        self.lock = threading.Lock()
+
+    def publish(self, topic=None, message=None, subject=None, target_arn=None,
+                message_structure=None, message_attributes=None):
+        time.sleep(self.delay)
+        with self.lock:
+            self.attempts += 1
+            if self.failures:
+                self.failures -= 1
+                raise BotoServerError(503, 'Service Unavailable')
+        if topic in self.failing_topics:
+            raise BotoServerError(400, 'Bad Request')
+        with self.lock:
+            self.published.append((topic, message))
+            message_id = 'id-{}'.format(len(self.published))
+        return {'PublishResponse': {'PublishResult': {'MessageId': message_id}}}
+
+
+class FakeBatchSnsConnection(FakeSnsConnection):
+    def __init__(self, delay=0, failures=None):
+        super(FakeBatchSnsConnection, self).__init__(delay)
+        self.failures = failures or {}
+        self.batches = []
+
+    def publish_batch(self, topic, entries):
+        time.sleep(self.delay)
+        successful, failed = [], []
+        with self.lock:
+            self.batches.append([e['Message'] for e in entries])
+            for entry in entries:
+                remaining = self.failures.get(entry['Message'], 0)
+                if remaining:
+                    self.failures[entry['Message']] = remaining - 1
+                    failed.append({'Id': entry['Id'], 'Code': 'InternalError',
+                                   'SenderFault': False, 'Message': 'Oops'})
+                elif entry['Message'] == 'invalid':
+                    failed.append({'Id': entry['Id'], 'Code': 'InvalidParameter',
+                                   'SenderFault': True, 'Message': 'Invalid'})
+                else:
+                    self.published.append((topic, entry['Message']))
+                    successful.append({'Id': entry['Id'],
+                                       'MessageId': 'id-{}'.format(len(self.published))})
+        return {'PublishBatchResponse': {'PublishBatchResult': {
+            'Successful': successful, 'Failed': failed
+        }}}
+
+
+class TestSnsPublisher:
+    def test_invalid_batch_size_raises(self):
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=FakeSnsConnection())
+        with pytest.raises(ValueError):
+            SnsPublisher(pool, batch_size=11)
+
+    def test_message_is_published_to_every_targets_concurrently(self):
+        class ConcurrentSnsConnection(FakeSnsConnection):
+            """Connection which publish calls wait for every other
+            deliveries to start"""
+            started = 0
+            concurrent = True
+            condition = threading.Condition()
+
+            def publish(self, **kwargs):
+                cls = ConcurrentSnsConnection
+                with cls.condition:
+                    cls.started += 1
+                    cls.condition.notify_all()
+                    deadline = time.time() + 2
+                    while cls.started < 3 and time.time() < deadline:
+                        cls.condition.wait(0.1)
+                    cls.concurrent &= cls.started >= 3
+                return super(ConcurrentSnsConnection, self).publish(**kwargs)
+
+        us, eu = ConcurrentSnsConnection(), ConcurrentSnsConnection()
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=us, eu_west_1=eu)
+        targets = [('us-east-1', 'us-topic'), ('eu-west-1', 'eu-topic'),
+                   ('eu-west-1', 'other-topic')]
+
+        futures = pool.publish('hello', targets)
+        results = dict((t, f.result()) for t, f in futures.iteritems())
+
+        assert set(results) == set(targets)
+        assert us.published == [('us-topic', 'hello')]
+        assert sorted(eu.published) == [('eu-topic', 'hello'), ('other-topic', 'hello')]
+        assert ConcurrentSnsConnection.concurrent
+
+    def test_delivery_failures_are_set_on_their_futures(self):
+        pool = fake_service_pool(
+            SimpleNotificationPool,
+            us_east_1=FakeSnsConnection(failing_topics=['broken'])
+        )
+
+        futures = pool.publish('hello', [('us-east-1', 'ok'), ('us-east-1', 'broken')])
+
+        assert futures[('us-east-1', 'ok')].result() == 'id-1'
+        with pytest.raises(BotoServerError):
+            futures[('us-east-1', 'broken')].result()
+
+    def test_failed_deliveries_are_retried_by_default(self):
+        connection = FakeSnsConnection(failures=1)
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=connection)
+
+        future = pool.publish('hello', [('us-east-1', 'topic')])[('us-east-1', 'topic')]
+
+        assert isinstance(pool.retry_policy, RetryPolicy)
+        assert future.result(timeout=2) == 'id-1'
+        assert connection.attempts == 2
+
+    def test_boto_retries_are_disabled_on_default_pools_connections(self):
+        pool = SimpleNotificationPool(connect=False, regions=['us-east-1'])
+
+        assert pool._connect_module_to_region('us-east-1').num_retries == 0
+
+    def test_publishing_does_not_wait_for_connections(self):
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=FakeSnsConnection())
+        connecting = Future()
+        pool._connections['us-east-1'] = connecting
+
+        start = time.time()
+        future = pool.publish('hello', [('us-east-1', 'topic')])[('us-east-1', 'topic')]
+        assert time.time() - start < 0.1
+
+        connecting.set_result(FakeBatchSnsConnection())
+        assert future.result(timeout=2) == 'id-1'
+
+    def test_publisher_retry_policy_takes_precedence(self):
+        connection = FakeSnsConnection(failures=1)
+        pool = fake_service_pool(
+            SimpleNotificationPool,
+            {'retry_policy': {'base_delay': 0.001}},
+            us_east_1=connection
+        )
+        publisher = pool.publisher(retry_policy={'max_attempts': 1})
+
+        future = publisher.publish('hello', [('us-east-1', 'topic')])[('us-east-1', 'topic')]
+
+        with pytest.raises(BotoServerError):
+            future.result(timeout=2)
+        assert connection.attempts == 1
+
+    def test_pool_has_a_default_publisher(self):
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=FakeSnsConnection())
+
+        assert isinstance(pool._publisher, SnsPublisher)
+        assert pool._publisher._pool is pool
+
+    def test_unconnected_region_raises(self):
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=FakeSnsConnection())
+
+        with pytest.raises(NotConnectedError):
+            pool.publish('hello', [('ap-south-1', 'topic')])
+
+    def test_deliveries_are_batched_while_a_batch_is_published(self):
+        connection = FakeBatchSnsConnection(delay=0.1)
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=connection)
+        publisher = pool.publisher(batch_size=4)
+
+        futures = [
+            publisher.publish(str(i), [('us-east-1', 'topic')])[('us-east-1', 'topic')]
+            for i in range(9)
+        ]
+        message_ids = [f.result() for f in futures]
+
+        assert len(set(message_ids)) == 9
+        assert sum(connection.batches, []) == [str(i) for i in range(9)]
+        assert all(len(batch) <= 4 for batch in connection.batches)
+        assert len(connection.batches) < 9
+
+    def test_server_side_batch_failures_are_retried(self):
+        connection = FakeBatchSnsConnection(failures={'flaky': 2})
+        pool = fake_service_pool(
+            SimpleNotificationPool,
+            {'retry_policy': {'base_delay': 0.001}},
+            us_east_1=connection
+        )
+
+        future = pool.publisher().publish('flaky', [('us-east-1', 'topic')])[('us-east-1', 'topic')]
+
+        assert future.result(timeout=2) == 'id-1'
+        assert connection.batches == [['flaky']] * 3
+
+    def test_sender_side_batch_failures_are_not_retried(self):
+        connection = FakeBatchSnsConnection()
+        pool = fake_service_pool(SimpleNotificationPool, us_east_1=connection)
+
+        future = pool.publisher().publish('invalid', [('us-east-1', 'topic')])[('us-east-1', 'topic')]
+
+        with pytest.raises(BotoServerError) as excinfo:
+            future.result(timeout=2)
+        assert excinfo.value.error_code == 'InvalidParameter'
+        assert len(connection.batches) == 1
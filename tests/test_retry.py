@@ -0,0 +1,101 @@
+import socket
+import pytest
+
+from boto.exception import BotoServerError, BotoClientError
+
+from mangrove.retry import RetryPolicy, RetryBudget, is_retryable
+
+
+def throttling_error():
+    error = BotoServerError(400, 'Bad Request')
+    error.error_code = 'Throttling'
+    return error
+
+
+class TestIsRetryable:
+    def test_throttling_errors_are_retryable(self):
+        assert is_retryable(throttling_error()) is True
+
+    def test_server_errors_are_retryable(self):
+        assert is_retryable(BotoServerError(500, 'Internal Error')) is True
+
+    def test_client_errors_are_not_retryable(self):
+        assert is_retryable(BotoServerError(403, 'Forbidden')) is False
+        assert is_retryable(BotoClientError('invalid')) is False
+
+    def test_network_errors_are_retryable(self):
+        assert is_retryable(socket.timeout()) is True
+        assert is_retryable(socket.error()) is True
+
+    def test_unknown_errors_are_not_retryable(self):
+        assert is_retryable(ValueError()) is False
+
+
+class TestRetryBudget:
+    def test_retries_are_bounded_by_original_calls_ratio(self):
+        budget = RetryBudget(ratio=0.25, min_per_second=0, capacity=10)
+        # Empty the initial tokens
+        while budget.withdraw():
+            pass
+
+        for _ in range(40):
+            budget.deposit()
+
+        retries = 0
+        while budget.withdraw():
+            retries += 1
+        assert retries == 10
+
+    def test_tokens_are_capped(self):
+        budget = RetryBudget(ratio=1, min_per_second=0, capacity=2)
+        for _ in range(10):
+            budget.deposit()
+
+        assert budget.tokens == 2
+
+
+class TestRetryPolicy:
+    def test_invalid_max_attempts_raises(self):
+        with pytest.raises(ValueError):
+            RetryPolicy(max_attempts=0)
+
+    def test_delay_is_jittered_and_bounded(self):
+        policy = RetryPolicy(base_delay=1, max_delay=3)
+
+        for attempt in range(1, 10):
+            assert 0 <= policy.delay(attempt) <= min(3, 2 ** attempt)
+
+    def test_should_retry_respects_max_attempts(self):
+        policy = RetryPolicy(max_attempts=2, budget=RetryBudget())
+
+        assert policy.should_retry(throttling_error(), 1) is True
+        assert policy.should_retry(throttling_error(), 2) is False
+
+    def test_should_retry_respects_budget(self):
+        budget = RetryBudget(min_per_second=0, capacity=1)
+        policy = RetryPolicy(max_attempts=10, budget=budget)
+
+        assert policy.should_retry(throttling_error(), 1) is True
+        assert policy.should_retry(throttling_error(), 2) is False
+
+    def test_methods_overrides(self):
+        policy = RetryPolicy(
+            max_attempts=5,
+            methods={'run_instances': {'max_attempts': 1}}
+        )
+
+        assert policy.for_method('run_instances').max_attempts == 1
+        assert policy.for_method('run_instances').budget is policy.budget
+        assert policy.for_method('get_all_instances') is policy
+
+    def test_load_from_dict(self):
+        policy = RetryPolicy.load({'max_attempts': 4})
+
+        assert isinstance(policy, RetryPolicy)
+        assert policy.max_attempts == 4
+        assert RetryPolicy.load(None) is None
+        assert RetryPolicy.load(policy) is policy
+
+    def test_load_from_invalid_type_raises(self):
+        with pytest.raises(TypeError):
+            RetryPolicy.load(123)
@@ -0,0 +1,104 @@
+import gc
+import weakref
+import pytest
+
+from mangrove.pool import ServicePool
+from mangrove.sharding import HashRing, hash_key
+
+
+class DummyS3Pool(ServicePool):
+    service = 's3'
+
+
+def connected_pool(regions):
+    pool = DummyS3Pool(connect=False, regions=list(regions))
+    pool._connect_module_to_region = lambda region_name: region_name
+    for region_name in regions:
+        pool._connections[region_name] = region_name
+    return pool
+
+
+KEYS = ['prefix/{}'.format(i) for i in xrange(10000)]
+
+
+class TestHashRing:
+    def test_hash_key_is_stable(self):
+        assert hash_key('abc') == hash_key(u'abc')
+        assert hash_key('abc') != hash_key('abd')
+
+    def test_ring_is_built_over_pool_regions(self):
+        pool = connected_pool(['us-east-1', 'eu-west-1'])
+        ring = pool.hash_ring()
+
+        assert len(ring) == 2
+        assert 'us-east-1' in ring
+        assert len(ring._points) == 2 * ring.replicas
+
+    def test_keys_are_mapped_deterministically(self):
+        pool = connected_pool(['us-east-1', 'eu-west-1', 'ap-southeast-1'])
+        ring, other = HashRing(pool), HashRing(pool)
+
+        assert [ring.region_name(k) for k in KEYS[:100]] == \
+               [other.region_name(k) for k in KEYS[:100]]
+
+    def test_region_returns_owning_region_client(self):
+        pool = connected_pool(['us-east-1'])
+        ring = pool.hash_ring()
+
+        assert ring.region('some-key').region_name == 'us-east-1'
+
+    def test_keys_are_spread_according_to_weights(self):
+        pool = connected_pool(['us-east-1', 'eu-west-1'])
+        ring = pool.hash_ring(weights={'us-east-1': 3})
+        owners = [ring.region_name(k) for k in KEYS]
+
+        share = owners.count('us-east-1') / float(len(owners))
+        assert 0.65 < share < 0.85
+
+    def test_adding_a_region_moves_a_minimal_fraction_of_keys(self):
+        pool = connected_pool(['us-east-1', 'eu-west-1', 'ap-southeast-1'])
+        ring = pool.hash_ring()
+        before = dict((k, ring.region_name(k)) for k in KEYS)
+
+        pool.add_region('us-west-1')
+        after = dict((k, ring.region_name(k)) for k in KEYS)
+
+        moved = [k for k in KEYS if before[k] != after[k]]
+        assert 0.15 < len(moved) / float(len(KEYS)) < 0.35
+        # Moved keys all belong to the new region
+        assert set(after[k] for k in moved) == set(['us-west-1'])
+
+    def test_ring_add_region_connects_the_pool(self):
+        pool = connected_pool(['us-east-1'])
+        ring = pool.hash_ring()
+
+        ring.add_region('eu-west-1', weight=2)
+
+        assert 'eu-west-1' in pool.regions
+        assert len(ring._points) == 3 * ring.replicas
+
+    def test_removed_region_keys_move_to_remaining_regions(self):
+        pool = connected_pool(['us-east-1', 'eu-west-1'])
+        ring = pool.hash_ring()
+        ring.remove_region('eu-west-1')
+
+        assert set(ring.region_name(k) for k in KEYS[:100]) == set(['us-east-1'])
+
+    def test_lookup_over_empty_ring_raises(self):
+        pool = connected_pool([])
+        ring = pool.hash_ring()
+
+        with pytest.raises(LookupError):
+            ring.region_name('abc')
+
+    def test_discarded_rings_are_freed(self):
+        pool = connected_pool(['us-east-1'])
+        ring = pool.hash_ring()
+        ring_ref = weakref.ref(ring)
+
+        del ring
+        gc.collect()
+        pool.add_region('eu-west-1')
+
+        assert ring_ref() is None
+        assert len(pool._region_listeners) == 0
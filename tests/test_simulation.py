@@ -0,0 +1,169 @@
+import pytest
+
+from boto.exception import BotoServerError
+from moto import mock_s3
+
+from mangrove.pool import ServicePool, ServiceMixinPool
+from mangrove.simulation import (
+    RegionSimulator,
+    SimulatedConnection,
+    constant,
+    uniform,
+    lognormal,
+    run_benchmark,
+    fan_out_scenario,
+    hedge_scenario,
+    mixin_scenario
+)
+
+
+class DummyS3Pool(ServicePool):
+    service = 's3'
+
+
+class DummyMixinPool(ServiceMixinPool):
+    services = {
+        's3': {
+            'regions': ['us-east-1', 'eu-west-1'],
+        },
+    }
+
+
+class InstantConnection(object):
+    region_name = 'us-east-1'
+
+    def get_all_buckets(self):
+        return []
+
+
+def instant_pool():
+    pool = DummyS3Pool(connect=False, regions=['us-east-1', 'eu-west-1'])
+    for region_name in pool._service_declaration.regions:
+        pool._connections[region_name] = InstantConnection()
+    return pool
+
+
+class TestDistributions:
+    def test_distributions_are_seeded(self):
+        import random
+
+        for distribution in (uniform(0.1, 0.2), lognormal(0.1)):
+            first = [distribution(random.Random(1)) for _ in range(5)]
+            second = [distribution(random.Random(1)) for _ in range(5)]
+            assert first == second
+
+    def test_lognormal_median(self):
+        import random
+
+        rng = random.Random(1)
+        samples = sorted(lognormal(0.1)(rng) for _ in range(1001))
+        assert 0.09 < samples[500] < 0.11
+
+
+class TestSimulatedConnection:
+    def test_calls_are_delayed(self):
+        connection = SimulatedConnection(InstantConnection(), latency=constant(0.01))
+        pool = instant_pool()
+        pool._connections['us-east-1'] = connection
+
+        pool.regions['us-east-1'].get_all_buckets()
+
+        assert pool.latencies['us-east-1'].mean() >= 0.01
+        assert connection.calls == 1
+
+    def test_attributes_are_proxied(self):
+        connection = SimulatedConnection(InstantConnection())
+
+        assert connection.region_name == 'us-east-1'
+
+    def test_errors_are_injected(self):
+        connection = SimulatedConnection(InstantConnection(), error_rate=1)
+
+        with pytest.raises(BotoServerError) as e:
+            connection.get_all_buckets()
+        assert e.value.status == 503
+        assert connection.errors == 1
+
+    def test_calls_beyond_max_rate_are_throttled(self):
+        connection = SimulatedConnection(InstantConnection(), max_rate=2)
+        connection.get_all_buckets()
+        connection.get_all_buckets()
+
+        with pytest.raises(BotoServerError) as e:
+            connection.get_all_buckets()
+        assert e.value.error_code == 'Throttling'
+        assert connection.throttled == 1
+
+
+class TestRegionSimulator:
+    def test_install_and_uninstall_over_a_pool(self):
+        pool = instant_pool()
+        simulator = RegionSimulator({'eu-west-1': {'latency': constant(0.01)}})
+
+        simulator.install(pool)
+        assert isinstance(pool._connections['eu-west-1'], SimulatedConnection)
+        assert isinstance(pool._connections['us-east-1'], InstantConnection)
+
+        simulator.uninstall(pool)
+        assert isinstance(pool._connections['eu-west-1'], InstantConnection)
+
+    @mock_s3
+    def test_install_over_a_mixin_pool(self):
+        pool = DummyMixinPool()
+        pool.connect()
+        RegionSimulator({'us-east-1': {}}).install(pool)
+
+        assert isinstance(pool.s3._connections['us-east-1'], SimulatedConnection)
+        assert not isinstance(pool.s3._connections['eu-west-1'], SimulatedConnection)
+
+
+class TestBenchmarks:
+    def test_fan_out_latency_is_bounded_by_slowest_region(self):
+        pool = instant_pool()
+        RegionSimulator({
+            'us-east-1': {'latency': constant(0.001)},
+            'eu-west-1': {'latency': constant(0.02)},
+        }).install(pool)
+
+        report = run_benchmark(
+            fan_out_scenario(pool, 'get_all_buckets'),
+            calls=10,
+            concurrency=2
+        )
+
+        assert report.calls == 10
+        assert report.errors == 0
+        assert report.p50 >= 0.02
+        assert report.throughput > 0
+
+    def test_hedge_scenario_cuts_tail_latency(self):
+        pool = instant_pool()
+        RegionSimulator({
+            'us-east-1': {'latency': constant(0.2)},
+            'eu-west-1': {'latency': constant(0.001)},
+        }).install(pool)
+
+        report = run_benchmark(
+            hedge_scenario(pool, 'get_all_buckets', primary='us-east-1',
+                           secondary='eu-west-1', delay=0.01),
+            calls=4,
+            concurrency=2
+        )
+
+        assert report.p99 < 0.2
+
+    def test_errors_are_reported(self):
+        pool = instant_pool()
+        RegionSimulator({'us-east-1': {'error_rate': 1}}).install(pool)
+
+        report = run_benchmark(
+            mixin_scenario(
+                type('Mixin', (object,), {'s3': pool})(),
+                [('s3', 'us-east-1', 'get_all_buckets', None)]
+            ),
+            calls=3,
+            concurrency=1
+        )
+
+        assert report.errors == 3
+        assert 'errors: 3' in str(report)
@@ -0,0 +1,36 @@
+import pytest
+
+from mangrove.stats import LatencyWindow
+
+
+class TestLatencyWindow:
+    def test_percentile_without_samples_is_none(self):
+        window = LatencyWindow()
+
+        assert window.percentile(95) is None
+        assert window.mean() is None
+
+    def test_percentile_uses_nearest_rank(self):
+        window = LatencyWindow()
+        for value in range(1, 101):
+            window.add(value)
+
+        assert window.percentile(50) == 50
+        assert window.percentile(95) == 95
+        assert window.percentile(100) == 100
+        assert window.percentile(0) == 1
+
+    def test_window_only_keeps_latest_samples(self):
+        window = LatencyWindow(size=2)
+        for value in (10, 1, 2):
+            window.add(value)
+
+        assert len(window) == 2
+        assert window.percentile(100) == 2
+        assert window.mean() == 1.5
+
+    def test_percentile_out_of_bounds_raises(self):
+        window = LatencyWindow()
+
+        with pytest.raises(ValueError):
+            window.percentile(101)